@@ -0,0 +1,73 @@
+"""System tool output parser benchmark.
+
+Parses every output in `benchmarks/corpus`
+and reports the parse time per KB.
+
+    python -m benchmarks.bench_parsers --iterations 200
+    python -m benchmarks.bench_parsers --budget 500
+
+Exits with a non-zero status if parsing is slower
+than `--budget` microseconds per KB.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Callable
+
+from src.api.media_node.parsers import (parse_sinks, parse_wifi_interfaces,
+                                        parse_saved_connections,
+                                        parse_wifi_networks, parse_xrandr)
+
+CORPUS_DIR = Path(__file__).parent/"corpus"
+
+
+class ArgsNamespace(argparse.Namespace):
+    # pylint: disable=too-few-public-methods
+    iterations: int
+    budget: float | None
+
+
+# corpus file and the parser of its command output,
+# the results are checked by `tests/test_parsers.py`
+CASES: list[tuple[str, Callable[[str], object]]] = [
+    ("xrandr_multi_monitor.txt", parse_xrandr),
+    ("nmcli_wifi_list.txt", parse_wifi_networks),
+    ("nmcli_connection_show.txt", parse_saved_connections),
+    ("nmcli_device_status.txt", parse_wifi_interfaces),
+    ("pacmd_list_sinks.txt", parse_sinks),
+]
+
+
+def parse_arguments() -> ArgsNamespace:
+    parser = argparse.ArgumentParser(
+        description="System tool output parser benchmark")
+    parser.add_argument("-n", "--iterations", type=int, default=200,
+                        help="parses per corpus file")
+    parser.add_argument("-b", "--budget", type=float, default=None,
+                        help="fail above this many microseconds per KB")
+    return parser.parse_args(namespace=ArgsNamespace())
+
+
+def main(args: ArgsNamespace) -> int:
+    failed = False
+    print(f"{'':<28} {'KB':>7} {'us/parse':>10} {'us/KB':>8} {'MB/s':>7}")
+    for file, parse in CASES:
+        output = (CORPUS_DIR/file).read_text("utf-8")
+        size_kb = len(output.encode()) / 1024
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            parse(output)
+        per_parse = (time.perf_counter() - start) / args.iterations
+        per_kb = per_parse * 1e6 / size_kb
+        print(f"{file:<28} {size_kb:>7.1f} {per_parse * 1e6:>10.1f} "
+              f"{per_kb:>8.2f} {size_kb / 1024 / per_parse:>7.1f}")
+        if args.budget is not None and per_kb > args.budget:
+            print(f"{file:<28} over budget ({args.budget} us/KB)")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_arguments()))
@@ -0,0 +1,229 @@
+"""VLC Remote Control and /media-player latency benchmark.
+
+Runs every `VLCRemoteControl` / `AsyncVLCRemoteControl` method 
+and every read-only or non-persisting `/media-player` endpoint 
+against `FakeVLCServer` and reports commands/sec, p50 and p99.
+
+    python -m benchmarks.bench_player --iterations 1000 --delay 0
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from benchmarks.fake_vlc import FakeVLCServer
+from src.core.vlcrc import VLCRemoteControl
+from src.core.vlcrc_async import AsyncVLCRemoteControl
+
+
+class ArgsNamespace(argparse.Namespace):
+    # pylint: disable=too-few-public-methods
+    iterations: int
+    delay: float
+    skip_endpoints: bool
+
+
+def report(name: str, latencies: list[float]) -> None:
+    total = sum(latencies)
+    p50 = statistics.median(latencies)
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    print(f"{name:<40} {len(latencies) / total:>10.0f} "
+          f"{p50 * 1000:>9.3f} {p99 * 1000:>9.3f}")
+
+
+def header(title: str) -> None:
+    print(f"\n{title}")
+    print(f"{'':<40} {'cmd/s':>10} {'p50, ms':>9} {'p99, ms':>9}")
+
+
+def sync_methods(rc: VLCRemoteControl) -> dict[str, Callable[[], object]]:
+    media = Path(__file__)
+    return {
+        "exec('status')": lambda: rc.exec("status"),
+        "add": lambda: rc.add(media),
+        "play": rc.play,
+        "stop": rc.stop,
+        "next": rc.next,
+        "prev": rc.prev,
+        "goto": lambda: rc.goto(1),
+        "clear": rc.clear,
+        "status": rc.status,
+        "pause": rc.pause,
+        "seek": lambda: rc.seek(10),
+        "get_volume": rc.get_volume,
+        "set_volume": lambda: rc.set_volume(128),
+        "get_adev": rc.get_adev,
+        "set_adev": lambda: rc.set_adev("pulse"),
+    }
+
+
+def async_methods(rc: AsyncVLCRemoteControl
+                  ) -> dict[str, Callable[[], Awaitable[object]]]:
+    media = Path(__file__)
+    return {
+        "exec('status')": lambda: rc.exec("status"),
+        "add": lambda: rc.add(media),
+        "play": rc.play,
+        "stop": rc.stop,
+        "next": rc.next,
+        "prev": rc.prev,
+        "goto": lambda: rc.goto(1),
+        "clear": rc.clear,
+        "status": rc.status,
+        "pause": rc.pause,
+        "seek": lambda: rc.seek(10),
+        "get_volume": rc.get_volume,
+        "set_volume": lambda: rc.set_volume(128),
+        "get_adev": rc.get_adev,
+        "set_adev": lambda: rc.set_adev("pulse"),
+    }
+
+
+def bench_sync(rc: VLCRemoteControl, iterations: int) -> None:
+    for name, method in sync_methods(rc).items():
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            method()
+            latencies.append(time.perf_counter() - start)
+        report(name, latencies)
+
+
+async def bench_async(rc: AsyncVLCRemoteControl, iterations: int) -> None:
+    for name, method in async_methods(rc).items():
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await method()
+            latencies.append(time.perf_counter() - start)
+        report(name, latencies)
+
+
+async def asgi_request(app, method: str, path: str,
+                       body: object = None) -> int:
+    """Call an ASGI app in-process and return the response status."""
+    raw = b"" if body is None else json.dumps(body).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "scheme": "http",
+        "server": ("127.0.0.1", 5000), "client": ("127.0.0.1", 1),
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(raw)).encode())],
+    }
+    messages = [{"type": "http.request", "body": raw, "more_body": False}]
+    status = 0
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+        return {}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+ENDPOINTS = [
+    ("GET", "/media-player/status", None),
+    ("GET", "/media-player/volume", None),
+    ("GET", "/media-player/health", None),
+    ("GET", "/media-player/audio-devices", None),
+    ("POST", "/media-player/play", None),
+    ("POST", "/media-player/stop", None),
+    ("POST", "/media-player/next", None),
+    ("POST", "/media-player/previous", None),
+    ("POST", "/media-player/goto", 1),
+    ("POST", "/media-player/clear", None),
+    ("POST", "/media-player/pause", None),
+    ("POST", "/media-player/seek", 10),
+    ("POST", "/media-player/batch", {"steps": [
+        {"command": "clear"}, {"command": "goto", "value": 1},
+        {"command": "play"}]}),
+]
+
+
+async def bench_endpoint(app, method: str, path: str, body: object,
+                         iterations: int) -> None:
+    latencies = []
+    status = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        status = await asgi_request(app, method, path, body)
+        latencies.append(time.perf_counter() - start)
+    report(f"{method} {path} [{status}]", latencies)
+
+
+async def bench_endpoints(port: int, iterations: int) -> None:
+    """Benchmark `ENDPOINTS`. Importing the router loads
+    the app config, which creates `resources` if needed."""
+    # pylint: disable=import-outside-toplevel
+    from fastapi import FastAPI
+    from src.api.media_player.config import vlc_rc
+    from src.api.media_player.router import router
+    from src.api.media_player.service import poller
+
+    vlc_rc.port = port
+    app = FastAPI()
+    app.include_router(router)
+    await app.router.startup()
+    await poller.update()
+    try:
+        for method, path, body in ENDPOINTS:
+            # coalesced setters wait for their window, don't run them long
+            count = 20 if path.endswith("/seek") else iterations
+            await bench_endpoint(app, method, path, body, count)
+    finally:
+        await app.router.shutdown()
+        vlc_rc.close()
+
+
+def parse_arguments() -> ArgsNamespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="bench_player", description="VLC RC latency benchmark")
+    parser.add_argument("-n", "--iterations", type=int, default=1000,
+                        help="Calls per method [1000]")
+    parser.add_argument("-d", "--delay", type=float, default=0.0,
+                        help="Fake VLC response delay in seconds [0.0]")
+    parser.add_argument("--skip-endpoints", action="store_true",
+                        help="Only benchmark the RC clients")
+    return parser.parse_args(namespace=ArgsNamespace())
+
+
+async def main(args: ArgsNamespace) -> None:
+    async with FakeVLCServer(port=0, delay=args.delay) as server:
+        host, port = server.host, server.port
+
+        header("VLCRemoteControl (connection per command)")
+        rc = VLCRemoteControl(host, port, timeout=1.0)
+        await asyncio.to_thread(bench_sync, rc, args.iterations)
+
+        header("VLCRemoteControl (persistent)")
+        rc = VLCRemoteControl(host, port, timeout=1.0, persistent=True)
+        await asyncio.to_thread(bench_sync, rc, args.iterations)
+        rc.close()
+
+        header("AsyncVLCRemoteControl")
+        async_rc = AsyncVLCRemoteControl(host, port, timeout=1.0)
+        await bench_async(async_rc, args.iterations)
+        async_rc.close()
+
+        if not args.skip_endpoints:
+            header("/media-player endpoints")
+            await bench_endpoints(port, args.iterations)
+
+        print(f"\nconnections: {server.connections}, "
+              f"commands: {server.commands}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_arguments()))
@@ -0,0 +1,224 @@
+"""Fake VLC Remote Control server.
+
+Speaks the same line protocol as `vlc --extraintf oldrc --rc-fake-tty`, 
+so `src/core/vlcrc.py` can be measured and tested without a real VLC.
+
+    python -m benchmarks.fake_vlc --port 50000 --delay 0.001
+"""
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+
+
+class ArgsNamespace(argparse.Namespace):
+    # pylint: disable=too-few-public-methods
+    address: str
+    port: int
+    delay: float
+    no_prompt: bool
+    multi_client: bool
+
+
+@dataclass
+class PlayerState:
+    # one field per value the RC interface reports
+    # pylint: disable=too-many-instance-attributes
+    playlist: list[str] = field(default_factory=list)
+    current: int = 0
+    state: str = "stopped"
+    volume: int = 256
+    time: int = 0
+    length: int = 600
+    device: str = "pulse"
+    devices: dict[str, str] = field(default_factory=lambda: {
+        "pulse": "PulseAudio sound server",
+        "alsa": "ALSA audio output",
+    })
+
+
+class FakeVLCServer:
+    """Asyncio server emulating the VLC RC interface."""
+    # settings and counters inspected by the tests and benchmarks
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 50000,
+                 delay: float = 0.0, prompt: bool = True,
+                 single_client: bool = True) -> None:
+        """Initialize FakeVLCServer.
+
+        Args:
+            host (str, optional): Address to listen on.
+            port (int, optional): Port to listen on. 0 picks a free port.
+            delay (float, optional): 
+                Seconds to wait before answering each command. 
+                Defaults to 0.0.
+            prompt (bool, optional): 
+                Print the "> " prompt like `--rc-fake-tty`. 
+                Defaults to True.
+            single_client (bool, optional): 
+                Serve one connection at a time like VLC does. 
+                Defaults to True.
+        """
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.prompt = prompt
+        self.player = PlayerState()
+        self.commands = 0
+        self.connections = 0
+        self._client_lock = asyncio.Lock() if single_client else None
+        self._server: asyncio.Server | None = None
+        self._handlers: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    def _write(self, writer: asyncio.StreamWriter, lines: list[str]) -> None:
+        data = "".join(f"{line}\r\n" for line in lines)
+        if self.prompt:
+            data += "> "
+        writer.write(data.encode())
+
+    def execute(self, line: str) -> list[str]:
+        """Run a command against the fake player and return output lines."""
+        # pylint: disable=too-many-return-statements,too-many-branches
+        player = self.player
+        command, _, arg = line.strip().partition(" ")
+        if command == "add":
+            player.playlist.append(arg)
+            player.current = len(player.playlist) - 1
+            player.state = "playing"
+            return []
+        if command in ("play", "stop", "pause"):
+            states = {"play": "playing", "stop": "stopped"}
+            if command == "pause":
+                paused = player.state == "paused"
+                player.state = "playing" if paused else "paused"
+            else:
+                player.state = states[command]
+            return []
+        if command in ("next", "prev"):
+            step = 1 if command == "next" else -1
+            if player.playlist:
+                player.current = (player.current + step) % len(player.playlist)
+            return []
+        if command == "goto":
+            player.current = max(int(arg or 1) - 1, 0)
+            return []
+        if command == "clear":
+            player.playlist.clear()
+            player.state = "stopped"
+            return []
+        if command == "seek":
+            player.time = int(arg or 0)
+            return []
+        if command == "get_time":
+            return [str(player.time)]
+        if command == "get_length":
+            return [str(player.length)]
+        if command == "volume":
+            if arg:
+                player.volume = int(arg)
+                return []
+            return [f"( audio volume: {player.volume} )"]
+        if command == "status":
+            lines = []
+            if player.playlist:
+                item = player.playlist[player.current % len(player.playlist)]
+                lines.append(f"( new input: {item} )")
+            lines.append(f"( audio volume: {player.volume} )")
+            lines.append(f"( state {player.state} )")
+            return lines
+        if command == "adev":
+            if arg:
+                player.device = arg
+                return []
+            lines = ["+----[ Audio Device ]"]
+            for device_id, name in player.devices.items():
+                mark = " *" if device_id == player.device else ""
+                lines.append(f"| {device_id} - {name}{mark}")
+            lines.append("+----[ end of Audio Device ]")
+            return lines
+        return [f"Unknown command `{command}'. Type `help' for help."]
+
+    async def _session(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._write(writer, ["VLC media player 3.0.18 Vetinari",
+                             "Command Line Interface initialized. "
+                             "Type `help' for help."])
+        await writer.drain()
+        while line := await reader.readline():
+            self.commands += 1
+            if line.strip() in (b"quit", b"shutdown"):
+                break
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            self._write(writer, self.execute(line.decode()))
+            await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        self._handlers[asyncio.current_task()] = writer
+        try:
+            if self._client_lock:
+                async with self._client_lock:
+                    await self._session(reader, writer)
+            else:
+                await self._session(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            handlers = list(self._handlers.items())
+            for _, writer in handlers:
+                writer.close()
+            await asyncio.gather(*[task for task, _ in handlers],
+                                 return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "FakeVLCServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+
+def parse_arguments() -> ArgsNamespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="fake_vlc", description="Fake VLC Remote Control server")
+    parser.add_argument("-a", "--address", type=str, default="127.0.0.1",
+                        help="Address to listen on [127.0.0.1]")
+    parser.add_argument("-p", "--port", type=int, default=50000,
+                        help="Port to listen on [50000]")
+    parser.add_argument("-d", "--delay", type=float, default=0.0,
+                        help="Response delay in seconds [0.0]")
+    parser.add_argument("--no-prompt", action="store_true",
+                        help="Don't print the '> ' prompt")
+    parser.add_argument("--multi-client", action="store_true",
+                        help="Serve several connections at once")
+    return parser.parse_args(namespace=ArgsNamespace())
+
+
+async def main(args: ArgsNamespace) -> None:
+    server = FakeVLCServer(args.address, args.port, args.delay,
+                           not args.no_prompt, not args.multi_client)
+    await server.start()
+    print(f"Fake VLC RC listening on {server.host}:{server.port}")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_arguments()))
@@ -1,61 +1,281 @@
-from fastapi import APIRouter, UploadFile, HTTPException
-from fastapi.responses import FileResponse
+import errno
+import mimetypes
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Request, Response, Header
+from fastapi.concurrency import run_in_threadpool
 
 from src.constants import AppDir
+from src.core.etag import make_etag, check_etag
+from src.core.fileresponse import RangeFileResponse
+from src.core.mediaindex import MediaEntry
 from src.api.media_files.constants import MIMEType
+from src.api.media_files.service import media_index, uploads, blobs
 from src.api.media_files.schemas import (AvailableFilesSchema,
+                                         MediaFileSchema,
+                                         BlobSchema,
+                                         LinkFileSchema,
                                          UploadOutSchema,
+                                         UploadCreateSchema,
+                                         UploadStateSchema,
                                          DeletedFilesSchema)
-from src.core.filesys import (get_dir_files, del_files_from_dir,
-                              get_dir_size, check_dir_files,
-                              aio_save_files_to_dir)
+from src.core.filesys import (secure_filename, aio_stream_files_to_dir,
+                              aio_del_files_from_dir)
 
 
 router = APIRouter(prefix="/media-files", tags=["media files"])
 
+# the body is parsed by the endpoint, it is only documented here
+upload_body = {"requestBody": {"required": True, "content": {
+    "multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["files"],
+        "properties": {"files": {
+            "type": "array",
+            "items": {"type": "string", "format": "binary"}
+        }}
+    }}
+}}}
+append_body = {"requestBody": {"required": True, "content": {
+    "application/offset+octet-stream": {"schema": {
+        "type": "string", "format": "binary"
+    }}
+}}}
 
-@router.get("/")
-def available_files() -> AvailableFilesSchema:
-    files = get_dir_files(AppDir.MEDIA.value)
+
+def media_file(entry: MediaEntry) -> MediaFileSchema:
+    return MediaFileSchema(
+        name=entry.name,
+        sizeBytes=entry.size,
+        modified=datetime.fromtimestamp(entry.mtime_ns / 1e9, timezone.utc),
+        mimeType=entry.mime_type,
+        sha256=entry.sha256
+    )
+
+
+def upload_headers(upload: dict) -> dict[str, str]:
+    return {"Upload-Offset": str(upload["received"]),
+            "Upload-Length": str(upload["length"]),
+            "Cache-Control": "no-store"}
+
+
+def upload_state(upload: dict) -> UploadStateSchema:
+    return UploadStateSchema(
+        id=upload["id"],
+        filename=upload["name"],
+        sizeBytes=upload["length"],
+        offsetBytes=upload["received"],
+        complete=upload["received"] == upload["length"]
+    )
+
+
+@router.on_event("startup")
+async def start_media_index() -> None:
+    await uploads.start()
+    await media_index.start()
+
+
+@router.on_event("shutdown")
+async def stop_media_index() -> None:
+    await media_index.stop()
+
+
+@router.get("/", responses={
+    304: {"description": "Files not modified"}
+})
+def available_files(request: Request,
+                    response: Response) -> AvailableFilesSchema:
+    etag = make_etag(media_index.revision)
+    if not_modified := check_etag(request, response, etag):
+        return not_modified
+    entries = media_index.entries()
     return AvailableFilesSchema(
-        totalFiles=len(files),
-        totalSizeBytes=get_dir_size(AppDir.MEDIA.value),
-        list=files
+        totalFiles=len(entries),
+        totalSizeBytes=media_index.total_size,
+        list=[entry.name for entry in entries],
+        hashes={entry.name: entry.sha256
+                for entry in entries if entry.sha256}
     )
 
 
-@router.post("/")
-async def upload_files(files: list[UploadFile]) -> UploadOutSchema:
-    accepted_files: list[UploadFile] = []
-    rejected_files: list[UploadFile] = []
+@router.get("/index", responses={
+    304: {"description": "Files not modified"}
+})
+def indexed_files(request: Request,
+                  response: Response) -> list[MediaFileSchema]:
+    etag = make_etag(media_index.revision)
+    if not_modified := check_etag(request, response, etag):
+        return not_modified
+    return [media_file(entry) for entry in media_index.entries()]
+
+
+@router.post("/", openapi_extra=upload_body, responses={
+    400: {"description": "Invalid multipart body"}
+})
+async def upload_files(request: Request) -> UploadOutSchema:
     file_types = [member.value for member in MIMEType]
-    for file in files:
-        if file.content_type.lower() in file_types:
-            accepted_files.append(file)
-        else:
-            rejected_files.append(file)
-    await aio_save_files_to_dir(accepted_files, AppDir.MEDIA.value)
-    return UploadOutSchema(accepted=[i.filename for i in accepted_files],
-                           rejected=[i.filename for i in rejected_files])
+
+    def accept(filename: str, content_type: str) -> str | None:
+        if content_type.lower() in file_types:
+            return secure_filename(filename) or None
+        return None
+
+    try:
+        files = await aio_stream_files_to_dir(request, AppDir.MEDIA.value,
+                                              accept, publish=blobs.publish)
+    except ValueError as error:
+        raise HTTPException(400, str(error)) from error
+    accepted = [file for file in files if file.path]
+    await run_in_threadpool(media_index.update,
+                            *(file.path.name for file in accepted))
+    return UploadOutSchema(
+        accepted=[file.filename for file in accepted],
+        rejected=[file.filename for file in files if not file.path])
 
 
 @router.delete("/")
-def delete_files(files: list[str]) -> DeletedFilesSchema:
-    dir_files = check_dir_files(files, AppDir.MEDIA.value)
-    del_files_from_dir(dir_files.available, AppDir.MEDIA.value)
+async def delete_files(files: list[str]) -> DeletedFilesSchema:
+    dir_files = await aio_del_files_from_dir(files, AppDir.MEDIA.value)
+    await run_in_threadpool(media_index.update, *dir_files.available)
     return DeletedFilesSchema(
         deleted=dir_files.available,
         missing=dir_files.missing
     )
 
 
-@router.get("/download/{filename}", responses={
-    200: {"description": "File successfully downloaded"},
-    404: {"description": "File not found"}
+@router.post("/uploads", status_code=201, responses={
+    201: {"description": "Upload created, see the Location header"},
+    400: {"description": "Invalid filename"},
+    415: {"description": "Unsupported file type"},
+    507: {"description": "Not enough free space"}
+})
+async def create_upload(upload: UploadCreateSchema, request: Request,
+                        response: Response) -> UploadStateSchema:
+    if upload.mimeType.lower() not in [member.value for member in MIMEType]:
+        raise HTTPException(415, "Unsupported file type")
+    if not (name := secure_filename(upload.filename)):
+        raise HTTPException(400, "Invalid filename")
+    try:
+        state = await run_in_threadpool(uploads.create, name,
+                                        upload.sizeBytes, upload.mimeType)
+    except OSError as error:
+        if error.errno == errno.ENOSPC:
+            raise HTTPException(507, "Not enough free space") from error
+        raise
+    if state["received"] == state["length"]:
+        await run_in_threadpool(media_index.update, name)
+    response.headers.update(upload_headers(state))
+    response.headers["Location"] = str(
+        request.url_for("upload_status", upload_id=state["id"]))
+    return upload_state(state)
+
+
+@router.api_route("/uploads/{upload_id}", methods=["GET", "HEAD"],
+                  responses={404: {"description": "Upload not found"}})
+def upload_status(upload_id: str, response: Response) -> UploadStateSchema:
+    if (upload := uploads.get(upload_id)) is None:
+        raise HTTPException(404, "Upload not found")
+    response.headers.update(upload_headers(upload))
+    return upload_state(upload)
+
+
+@router.patch("/uploads/{upload_id}", status_code=204, responses={
+    204: {"description": "Data appended, see the Upload-Offset header"},
+    404: {"description": "Upload not found"},
+    409: {"description": "Offset mismatch or upload in progress"},
+    413: {"description": "Data exceeds the upload length"},
+    415: {"description": "Expected application/offset+octet-stream"}
+}, openapi_extra=append_body)
+async def append_upload(upload_id: str, request: Request,
+                        upload_offset: int = Header(ge=0)) -> Response:
+    content_type = request.headers.get("content-type", "")
+    if content_type.split(";")[0].strip() \
+            != "application/offset+octet-stream":
+        raise HTTPException(415, "Expected application/offset+octet-stream")
+    if (upload := uploads.get(upload_id)) is None:
+        raise HTTPException(404, "Upload not found")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and upload_offset + int(length) > upload["length"]:
+        raise HTTPException(413, "Data exceeds the upload length")
+    try:
+        upload = await uploads.append(upload_id, upload_offset,
+                                      request.stream())
+    except FileNotFoundError as error:
+        raise HTTPException(404, "Upload not found") from error
+    except BlockingIOError as error:
+        raise HTTPException(409, "Upload in progress") from error
+    except ValueError as error:
+        headers = upload_headers(uploads.get(upload_id) or upload)
+        raise HTTPException(409, str(error), headers) from error
+    if upload["received"] == upload["length"]:
+        await run_in_threadpool(media_index.update, upload["name"])
+    return Response(status_code=204, headers=upload_headers(upload))
+
+
+@router.delete("/uploads/{upload_id}", status_code=204, responses={
+    404: {"description": "Upload not found"},
+    409: {"description": "Upload in progress"}
+})
+def cancel_upload(upload_id: str) -> Response:
+    try:
+        uploads.cancel(upload_id)
+    except FileNotFoundError as error:
+        raise HTTPException(404, "Upload not found") from error
+    except BlockingIOError as error:
+        raise HTTPException(409, "Upload in progress") from error
+    return Response(status_code=204)
+
+
+@router.api_route("/blobs/{sha256}", methods=["GET", "HEAD"], responses={
+    404: {"description": "No file with this content"}
+})
+def stored_blob(sha256: str) -> BlobSchema:
+    sha256 = sha256.lower()
+    try:
+        stat = blobs.stat(sha256)
+    except ValueError as error:
+        raise HTTPException(404, str(error)) from error
+    if stat is None:
+        raise HTTPException(404, "No file with this content")
+    return BlobSchema(
+        sha256=sha256,
+        sizeBytes=stat.st_size,
+        files=[entry.name for entry in media_index.find(sha256)]
+    )
+
+
+@router.post("/link", status_code=201, responses={
+    201: {"description": "File created from the stored content"},
+    400: {"description": "Invalid filename"},
+    404: {"description": "No file with this content"},
+    415: {"description": "Unsupported file type"}
 })
-def download_file(filename: str) -> FileResponse:
-    if (AppDir.MEDIA.value/filename).exists():
-        return FileResponse(AppDir.MEDIA.value/filename, 200)
+def link_file(link: LinkFileSchema) -> MediaFileSchema:
+    if not (name := secure_filename(link.filename)):
+        raise HTTPException(400, "Invalid filename")
+    mime_type = mimetypes.guess_type(name)[0]
+    if mime_type not in [member.value for member in MIMEType]:
+        raise HTTPException(415, "Unsupported file type")
+    try:
+        blobs.link(link.sha256.lower(), AppDir.MEDIA.value/name)
+    except (ValueError, FileNotFoundError) as error:
+        raise HTTPException(404, "No file with this content") from error
+    media_index.update(name)
+    if (entry := media_index.get(name)) is None:
+        raise HTTPException(404, "No file with this content")
+    return media_file(entry)
+
+
+@router.api_route("/download/{filename}", methods=["GET", "HEAD"],
+                  responses={
+                      200: {"description": "File successfully downloaded"},
+                      206: {"description": "Requested ranges of the file"},
+                      304: {"description": "File not modified"},
+                      404: {"description": "File not found"},
+                      416: {"description": "Range not satisfiable"}
+                  })
+def download_file(filename: str) -> RangeFileResponse:
+    if (AppDir.MEDIA.value/filename).is_file():
+        return RangeFileResponse(AppDir.MEDIA.value/filename)
     raise HTTPException(404, "File not found")
 
 
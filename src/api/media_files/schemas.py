@@ -1,10 +1,32 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
 
 
 class AvailableFilesSchema(BaseModel):
     totalFiles: int
     totalSizeBytes: float
     list: list[str]
+    hashes: dict[str, str]
+
+
+class MediaFileSchema(BaseModel):
+    name: str
+    sizeBytes: int
+    modified: datetime
+    mimeType: Optional[str] = None
+    sha256: Optional[str] = None
+
+
+class BlobSchema(BaseModel):
+    sha256: str
+    sizeBytes: int
+    files: list[str]
+
+
+class LinkFileSchema(BaseModel):
+    filename: str
+    sha256: str
 
 
 class UploadOutSchema(BaseModel):
@@ -15,3 +37,17 @@ class UploadOutSchema(BaseModel):
 class DeletedFilesSchema(BaseModel):
     deleted: list[str]
     missing: list[str]
+
+
+class UploadCreateSchema(BaseModel):
+    filename: str
+    sizeBytes: int = Field(ge=0)
+    mimeType: str
+
+
+class UploadStateSchema(BaseModel):
+    id: str
+    filename: str
+    sizeBytes: int
+    offsetBytes: int
+    complete: bool
@@ -0,0 +1,10 @@
+from src.config import state_store
+from src.constants import AppDir
+from src.core.blobstore import BlobStore
+from src.core.mediaindex import MediaIndex
+from src.core.uploads import ResumableUploads
+
+blobs = BlobStore(AppDir.BLOBS.value)
+media_index = MediaIndex(state_store, AppDir.MEDIA.value, blobs)
+uploads = ResumableUploads(state_store, AppDir.UPLOADS.value,
+                           AppDir.MEDIA.value, publish=blobs.publish)
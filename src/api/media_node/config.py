@@ -1,9 +1,16 @@
+import os
 import uuid
+import tempfile
+from typing import Any
 
+from src.config import state_store
 from src.constants import AppDir
-from src.core.syscmd import SysCmdExec
-from src.core.configmgr import ConfigManager
-from src.api.media_node.schemas import ConfigSchema
+from src.core.syscmd import SysCmdExec, CommandCache
+from src.core.statestore import DISPLAYS, StateTransaction
+from src.api.media_node.parsers import (parse_display_config,
+                                        display_config_args)
+from src.api.media_node.schemas import (ConfigSchema, DisplayConfig,
+                                        DisplayPosition, DisplayResolution)
 
 config_path = AppDir.CONFIGS.value/"media_node.ini"
 xrandr_config = AppDir.CONFIGS.value/"xrandr.txt"
@@ -15,7 +22,74 @@ default_config = {
         volume=50
     ).model_dump()
 }
-config_manager = ConfigManager(config_path, default_config)
+config_manager = state_store.settings("media_node", config_path,
+                                      default_config)
+
+# read-only commands and the TTL (in seconds) of their cached output
+list_sinks_args = ["pacmd", "list-sinks"]
+xrandr_args = ["sudo", "xrandr"]
+device_status_args = ["sudo", "nmcli", "-t", "device", "status"]
+connections_args = ["sudo", "nmcli", "-t", "connection", "show"]
+command_cache = CommandCache({
+    tuple(list_sinks_args): 2.0,
+    tuple(xrandr_args): 5.0,
+    tuple(device_status_args): 2.0,
+})
+
+
+def display_to_row(display: DisplayConfig) -> dict[str, Any]:
+    """Convert a display configuration to a state store row."""
+    row = {"name": display.name, "rotation": display.rotation,
+           "reflect": display.reflect, "is_primary": display.primary}
+    if display.resolution:
+        row["width"] = display.resolution.width
+        row["height"] = display.resolution.height
+    if display.position:
+        row["x"], row["y"] = display.position.x, display.position.y
+    return row
+
+
+def display_from_row(row: dict[str, Any]) -> DisplayConfig:
+    """Convert a state store row to a display configuration."""
+    display = DisplayConfig(name=row["name"], rotation=row["rotation"],
+                            reflect=row["reflect"],
+                            primary=bool(row["is_primary"]))
+    if row["width"] is not None and row["height"] is not None:
+        display.resolution = DisplayResolution(width=row["width"],
+                                               height=row["height"])
+    if row["x"] is not None and row["y"] is not None:
+        display.position = DisplayPosition(x=row["x"], y=row["y"])
+    return display
+
+
+def export_display_config(transaction: StateTransaction) -> None:
+    """Write the display configuration to `xrandr.txt`,
+    one xrandr command per line."""
+    lines = [" ".join(display_config_args(display_from_row(row)))
+             for row in transaction.displays()]
+    fd, temp_path = tempfile.mkstemp(prefix=f".{xrandr_config.name}.",
+                                     dir=xrandr_config.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, xrandr_config)
+    except OSError:
+        os.unlink(temp_path)
+        raise
+
+
+state_store.add_exporter(DISPLAYS, export_display_config)
+with state_store.transaction() as migration:
+    if not migration.meta("migrated:displays"):
+        if xrandr_config.exists():
+            displays = map(parse_display_config,
+                           xrandr_config.read_text("utf-8").splitlines())
+            migration.replace_displays(
+                [display_to_row(display) for display in displays if display])
+        migration.set_meta("migrated:displays", 1)
+
 node_config = ConfigSchema.model_validate(config_manager.load_section())
 
 if node_config.audioDevice:
@@ -0,0 +1,200 @@
+"""Parsers of system tool output."""
+import re
+
+from src.api.media_node.schemas import (AudioDeviceSchema,
+                                        WifiInterfaceSchema,
+                                        SavedWifiConnectionSchema,
+                                        WifiNetworkSchema, ConnectedDisplay,
+                                        DisplayPosition, DisplayResolution,
+                                        DisplayConfig)
+
+SINK_REGEX = re.compile(r"^\s*(\*?)\s*index: (\d+)\n\s*name: <(.*)>", re.M)
+SINK_VOLUME_REGEX = re.compile(r"^\s*volume: .*?(\d+)%", re.M)
+VOLUME_REGEX = re.compile(r"(\d+)%")
+XRANDR_OUTPUT_REGEX = re.compile(
+    r"(\S+) connected( primary)? (\d+)x(\d+)\+(\d+)\+(\d+) ([^(]*)\(")
+XRANDR_MODE_REGEX = re.compile(r"\s+(\d+x\d+\w*)")
+XRANDR_ROTATIONS = ("normal", "left", "inverted", "right")
+WIRELESS_TYPE = "802-11-wireless"
+
+
+def split_terse(line: str) -> list[str]:
+    """Split a line of `nmcli -t` output into unescaped fields."""
+    if "\\" not in line:
+        return line.split(":")
+    # nmcli escapes only "\\" and ":", swap them for control characters
+    # that can't appear in the output, split, then restore
+    line = line.replace("\\\\", "\x00").replace("\\:", "\x01")
+    return [field.replace("\x01", ":").replace("\x00", "\\")
+            for field in line.split(":")]
+
+
+def parse_sinks(output: str) -> tuple[list[AudioDeviceSchema],
+                                      AudioDeviceSchema | None,
+                                      int | None]:
+    """Parse `pacmd list-sinks` output.
+
+    Args:
+        output (str): The command output.
+
+    Returns:
+        tuple:
+            All sinks, the default sink (or None)
+            and the volume percent of the default sink (or None).
+    """
+    sinks, default, volume = [], None, None
+    matches = list(SINK_REGEX.finditer(output))
+    for i, match in enumerate(matches):
+        sink = AudioDeviceSchema(id=match.group(2), name=match.group(3))
+        sinks.append(sink)
+        if match.group(1):
+            default = sink
+            end = len(output)
+            if i + 1 < len(matches):
+                end = matches[i+1].start()
+            if level := SINK_VOLUME_REGEX.search(output, match.end(), end):
+                volume = int(level.group(1))
+    return sinks, default, volume
+
+
+def parse_volume(output: str) -> int | None:
+    """Parse `pactl get-sink-volume` output (first channel percent)."""
+    match = VOLUME_REGEX.search(output)
+    return int(match.group(1)) if match else None
+
+
+def parse_wifi_interfaces(output: str) -> list[WifiInterfaceSchema]:
+    """Parse `nmcli -t device status` output."""
+    result = []
+    for line in output.splitlines():
+        fields = split_terse(line)
+        if len(fields) >= 3 and fields[1] == "wifi":
+            result.append(WifiInterfaceSchema(name=fields[0],
+                                              status=fields[2]))
+    return result
+
+
+def _wireless_connections(output: str) -> list[list[str]]:
+    # NAME:UUID:TYPE:DEVICE
+    result = []
+    for line in output.splitlines():
+        fields = split_terse(line)
+        if len(fields) >= 4 and fields[2] == WIRELESS_TYPE:
+            result.append(fields)
+    return result
+
+
+def parse_saved_connections(output: str) -> list[SavedWifiConnectionSchema]:
+    """Parse `nmcli -t connection show` output."""
+    return [SavedWifiConnectionSchema(ssid=fields[0], interface=fields[3])
+            for fields in _wireless_connections(output)]
+
+
+def parse_wireless_uuids(output: str) -> dict[str, str]:
+    """Map UUIDs of Wi-Fi connections in `nmcli -t connection show`
+    output to their names."""
+    return {fields[1]: fields[0] for fields in _wireless_connections(output)}
+
+
+def parse_wifi_networks(output: str) -> list[WifiNetworkSchema]:
+    """Parse `nmcli -t device wifi list` output."""
+    result = []
+    for line in output.splitlines():
+        # IN-USE:BSSID:SSID:MODE:CHAN:RATE:SIGNAL:BARS:SECURITY
+        fields = split_terse(line)
+        if len(fields) != 9 or not fields[4].isdigit() \
+                or not fields[6].isdigit():
+            continue
+        result.append(WifiNetworkSchema(
+            connected=fields[0] == "*",
+            bssid=fields[1],
+            ssid=fields[2],
+            mode=fields[3],
+            chan=int(fields[4]),
+            rate=fields[5],
+            signal=int(fields[6]),
+            bars=fields[7],
+            security=fields[8].split()
+        ))
+    return result
+
+
+def parse_xrandr(output: str) -> list[ConnectedDisplay]:
+    """Parse `xrandr` output.
+
+    A line based state machine: an output header line starts
+    a display, the indented mode lines below it add resolutions.
+    Connected outputs without an active mode are skipped.
+    """
+    result = []
+    display = None
+    for line in output.splitlines():
+        if line[:1].isspace():
+            if display and (mode := XRANDR_MODE_REGEX.match(line)):
+                display.resolutions.append(mode.group(1))
+            continue
+
+        display = None
+        match = XRANDR_OUTPUT_REGEX.match(line)
+        if not match:
+            continue
+        name, primary, width, height, x, y, transform = match.groups()
+        words = transform.split()
+        rotation = "normal"
+        if words and words[0] in XRANDR_ROTATIONS:
+            rotation = words.pop(0)
+        display = ConnectedDisplay(
+            name=name,
+            primary=bool(primary),
+            resolution=DisplayResolution(width=width, height=height),
+            position=DisplayPosition(x=x, y=y),
+            rotation=rotation,
+            reflect=" ".join(words) or "normal",
+            resolutions=[]
+        )
+        result.append(display)
+    return result
+
+
+def parse_display_config(line: str) -> DisplayConfig | None:
+    """Parse an `xrandr --output` command line, as stored
+    in `xrandr.txt`. Returns None if it has no output name."""
+    words = line.split()
+    options: dict[str, str | None] = {}
+    for i, word in enumerate(words):
+        if word == "--primary":
+            options[word] = None
+        elif word.startswith("--") and i + 1 < len(words):
+            options[word] = words[i+1]
+    if not options.get("--output"):
+        return None
+
+    display = DisplayConfig(name=options["--output"],
+                            rotation=options.get("--rotation"),
+                            reflect=options.get("--reflect"),
+                            primary="--primary" in options)
+    if "--mode" in options:
+        width, height = options["--mode"].split("x")
+        display.resolution = DisplayResolution(width=width, height=height)
+    if "--pos" in options:
+        x, y = options["--pos"].split("x")
+        display.position = DisplayPosition(x=x, y=y)
+    return display
+
+
+def display_config_args(display: DisplayConfig) -> list[str]:
+    """The `xrandr` command that applies a display configuration."""
+    args = ["sudo", "xrandr", "--output", display.name]
+    if display.resolution:
+        width, height = display.resolution.width, display.resolution.height
+        args.extend(["--mode", f"{width}x{height}"])
+    if display.rotation:
+        args.extend(["--rotation", display.rotation])
+    if display.position:
+        x, y = display.position.x, display.position.y
+        args.extend(["--pos", f"{x}x{y}"])
+    if display.reflect:
+        args.extend(["--reflect", display.reflect])
+    if display.primary:
+        args.append("--primary")
+    return args
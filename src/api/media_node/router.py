@@ -1,21 +1,32 @@
-import re
 import uuid
+import asyncio
 import shutil
 import socket
 import zipfile
-from fastapi import APIRouter, HTTPException, Response, UploadFile, Body
+from fastapi import APIRouter, HTTPException, Request, Response, Body
+from fastapi.concurrency import run_in_threadpool
 
 from src.constants import AppDir
 from src.core.syscmd import SysCmdExec
-from src.core.filesys import aio_save_files_to_dir
-from src.api.media_node.config import config_manager, xrandr_config
+from src.core.filesys import aio_stream_files_to_dir
+from src.config import state_store
+from src.api.media_node.config import (config_manager, command_cache,
+                                       list_sinks_args, xrandr_args,
+                                       device_status_args, connections_args,
+                                       display_to_row, display_from_row)
+from src.api.media_node.service import (audio_state, wifi_state,
+                                        delete_wifi_connections)
+from src.api.media_node.parsers import (parse_sinks, parse_volume,
+                                        parse_wifi_interfaces,
+                                        parse_saved_connections,
+                                        parse_xrandr, display_config_args)
 from src.api.media_node.schemas import (ConfigSchema, AudioDeviceSchema,
                                         WifiInterfaceSchema,
                                         SavedWifiConnectionSchema,
+                                        DeletedWifiConnectionSchema,
                                         ConnectWifiNetworkSchema,
-                                        WifiNetworkSchema,
-                                        ConnectedDisplay, DisplayPosition,
-                                        DisplayResolution, DisplayConfig)
+                                        WifiNetworkSchema, WifiScanSchema,
+                                        ConnectedDisplay, DisplayConfig)
 
 
 router = APIRouter(prefix="/media-node", tags=["media node"])
@@ -25,15 +36,26 @@ system_responses = {
     500: {"description": "Command execution failed"}
 }
 
+# the body is parsed by the endpoint, it is only documented here
+static_upload_body = {"requestBody": {"required": True, "content": {
+    "multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["file"],
+        "properties": {"file": {"type": "string", "format": "binary"}}
+    }}
+}}}
 
-def xrandr_to_dict(xrandr_args: list[str]) -> dict[str, str]:
-    result = {}
-    for i, word in enumerate(xrandr_args):
-        if word in ["sudo", "xrandr", "--primary"]:
-            result.update({word: None})
-        elif "--" in word:
-            result.update({word: xrandr_args[i+1]})
-    return result
+
+@router.on_event("startup")
+async def start_state_watchers() -> None:
+    audio_state.start()
+    wifi_state.start()
+
+
+@router.on_event("shutdown")
+async def stop_state_watchers() -> None:
+    await audio_state.stop()
+    await wifi_state.stop()
 
 
 @router.get("/name")
@@ -64,27 +86,42 @@ def change_hostname() -> str:
 
 
 @router.post("/poweroff", responses={**system_responses})
-def system_poweroff() -> Response:
+async def system_poweroff() -> Response:
     args = ["sudo", "shutdown", "now"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=200 if command.success else 500)
 
 
 @router.post("/reboot", responses={**system_responses})
-def system_reboot() -> Response:
+async def system_reboot() -> Response:
     args = ["sudo", "shutdown", "-r", "now"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=200 if command.success else 500)
 
 
-@router.post("/static-upload", responses={
+@router.post("/static-upload", openapi_extra=static_upload_body, responses={
     200: {"description": "File successfully uploaded"},
     400: {"description": "Accept only .zip files"}
 })
-async def static_upload(file: UploadFile) -> Response:
-    file.filename = "archive.zip"
-    archive = AppDir.STATIC.value/file.filename
-    await aio_save_files_to_dir([file], AppDir.STATIC.value)
+async def static_upload(request: Request) -> Response:
+    archive = AppDir.STATIC.value/"archive.zip"
+
+    accepted = []
+
+    def accept(filename: str, content_type: str) -> str | None:
+        # pylint: disable=unused-argument
+        # only the first file is saved
+        if accepted:
+            return None
+        accepted.append(filename)
+        return archive.name
+
+    try:
+        await aio_stream_files_to_dir(request, AppDir.STATIC.value, accept)
+    except ValueError as error:
+        raise HTTPException(400, str(error)) from error
+    if not accepted:
+        raise HTTPException(400, "No file uploaded")
 
     if not zipfile.is_zipfile(archive):
         archive.unlink()
@@ -105,48 +142,53 @@ async def static_upload(file: UploadFile) -> Response:
     200: {"description": "Audio devices retrieved successfully"},
     500: {"description": "Failed to retrieve audio devices"}
 })
-def audio_devices() -> list[AudioDeviceSchema]:
-    command = SysCmdExec.run(["pacmd", "list-sinks"])
+async def audio_devices() -> list[AudioDeviceSchema]:
+    if audio_state.ready:
+        return audio_state.sinks
+
+    command = await command_cache.run(list_sinks_args)
     if not command.success:
         raise HTTPException(500, "Command execution failed")
 
-    result = []
-    devices = re.findall(r"index: (\d+)\n.*name: <(.*)>", command.output)
-    try:
-        for d in devices:
-            result.append(AudioDeviceSchema(id=d[0], name=d[1]))
-    except IndexError as e:
-        raise HTTPException(500, "Failed to retrieve audio devices") from e
-    return result
+    return parse_sinks(command.output)[0]
 
 
 @router.get("/audio/default-device", responses={
     200: {"description": "Default Audio device retrieved successfully"},
     500: {"description": "Failed to retrieve default audio device"}
 })
-def default_audio_device() -> AudioDeviceSchema:
-    command = SysCmdExec.run(["pacmd", "list-sinks"])
+async def default_audio_device() -> AudioDeviceSchema:
+    if audio_state.ready:
+        if audio_state.default is None:
+            raise HTTPException(500, "Failed to retrieve default audio device")
+        return audio_state.default
+
+    command = await command_cache.run(list_sinks_args)
     if not command.success:
         raise HTTPException(500, "Command execution failed")
 
-    device = re.search(r"\* index: (\d+)\n.*name: <(.+)>", command.output)
-    try:
-        return AudioDeviceSchema(id=device.group(1), name=device.group(2))
-    except (IndexError, AttributeError) as e:
-        message = "Failed to retrieve default audio device"
-        raise HTTPException(500, message) from e
+    device = parse_sinks(command.output)[1]
+    if device is None:
+        raise HTTPException(500, "Failed to retrieve default audio device")
+    return device
 
 
 @router.post("/audio/default-device", responses={
     200: {"description": "Default audio device set successfully"},
     500: {"description": "Command execution failed"}
 })
-def set_default_audio_device(device: str = Body()) -> Response:
-    command = SysCmdExec.run(["pacmd", "set-default-sink", device])
+async def set_default_audio_device(device: str = Body()) -> Response:
+    args = ["pacmd", "set-default-sink", device]
+    command = await SysCmdExec.aio_run(args)
+    command_cache.invalidate(list_sinks_args)
     if not command.success:
         raise HTTPException(500, "Command execution failed")
+    if audio_state.ready:
+        # don't let a read right after this one see the old default
+        await audio_state.refresh()
     data = ConfigSchema(audioDevice=device)
-    config_manager.save_section(data.model_dump(exclude_none=True))
+    await run_in_threadpool(config_manager.save_section,
+                            data.model_dump(exclude_none=True))
     return Response(status_code=200)
 
 
@@ -154,11 +196,15 @@ def set_default_audio_device(device: str = Body()) -> Response:
     200: {"description": "Current audio volume retrieved successfully"},
     500: {"description": "Failed to retrieve current audio volume"}
 })
-def audio_volume() -> int:
-    command = SysCmdExec.run(["pactl", "get-sink-volume", "@DEFAULT_SINK@"])
-    if not command.success:
+async def audio_volume(request: Request) -> int:
+    if audio_state.ready and audio_state.volume is not None:
+        return audio_state.volume
+
+    args = ["pactl", "get-sink-volume", "@DEFAULT_SINK@"]
+    command = await SysCmdExec.aio_run(args, request=request)
+    volume_level = parse_volume(command.output) if command.success else None
+    if volume_level is None:
         raise HTTPException(500, "Failed to retrieve current audio volume")
-    volume_level = int(command.output.strip().split()[4][:-1])
     return volume_level
 
 
@@ -166,13 +212,16 @@ def audio_volume() -> int:
     200: {"description": "Audio volume set successfully"},
     500: {"description": "Failed to set audio volume"}
 })
-def set_audio_volume(level: int = Body(ge=0, le=150)) -> Response:
+async def set_audio_volume(level: int = Body(ge=0, le=150)) -> Response:
     args = ["pactl", "set-sink-volume", "@DEFAULT_SINK@", f"{level}%"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     if not command.success:
         raise HTTPException(500, "Failed to set audio volume")
+    if audio_state.ready:
+        audio_state.volume = level
     data = ConfigSchema(volume=level)
-    config_manager.save_section(data.model_dump(exclude_none=True))
+    await run_in_threadpool(config_manager.save_section,
+                            data.model_dump(exclude_none=True))
     return Response(status_code=200)
 
 
@@ -181,15 +230,15 @@ def set_audio_volume(level: int = Body(ge=0, le=150)) -> Response:
     204: {"description": "No Wi-Fi interfaces found"},
     500: {"description": "Failed to retrieve list of Wi-Fi interfaces"}
 })
-def wifi_interfaces() -> list[WifiInterfaceSchema]:
-    command = SysCmdExec.run(["sudo", "nmcli", "-t", "device", "status"])
-    if not command.success:
-        raise HTTPException(500, "Command execution failed")
-
-    result = re.findall(r"(\S.+)(?:\:wifi\:)(.+?):", command.output)
-    if not result:
-        return Response(status_code=204)
-    return [WifiInterfaceSchema(name=i[0], status=i[1]) for i in result]
+async def wifi_interfaces() -> list[WifiInterfaceSchema]:
+    if wifi_state.ready:
+        result = wifi_state.interfaces
+    else:
+        command = await command_cache.run(device_status_args)
+        if not command.success:
+            raise HTTPException(500, "Command execution failed")
+        result = parse_wifi_interfaces(command.output)
+    return result if result else Response(status_code=204)
 
 
 @router.get("/wifi/saved-connections", responses={
@@ -197,34 +246,31 @@ def wifi_interfaces() -> list[WifiInterfaceSchema]:
     204: {"description": "No Wi-Fi connections found"},
     500: {"description": "Failed to retrieve Wi-Fi connections"}
 })
-def saved_wifi_connections() -> list[SavedWifiConnectionSchema]:
-    command = SysCmdExec.run(["sudo", "nmcli", "-t", "connection", "show"])
-    if not command.success:
-        raise HTTPException(500, "Command execution failed")
-
-    result = []
-    for line in command.output.splitlines():
-        if "wireless" in line:
-            data = [i.strip() for i in line.split(":")]
-            item = SavedWifiConnectionSchema(ssid=data[0], interface=data[3])
-            result.append(item)
+async def saved_wifi_connections(
+        request: Request) -> list[SavedWifiConnectionSchema]:
+    if wifi_state.ready:
+        result = wifi_state.connections
+    else:
+        command = await SysCmdExec.aio_run(connections_args, request=request)
+        if not command.success:
+            raise HTTPException(500, "Command execution failed")
+        result = parse_saved_connections(command.output)
     return result if result else Response(status_code=204)
 
 
-@router.delete("/wifi/saved-connections", responses={**system_responses})
-def delete_saved_wifi_connections() -> Response:
-    command = SysCmdExec.run(["sudo", "nmcli", "-t", "connection", "show"])
-    if not command.success:
+@router.delete("/wifi/saved-connections", responses={
+    200: {"description": "Deletion result of every Wi-Fi connection"},
+    204: {"description": "No Wi-Fi connections found"},
+    500: {"description": "Failed to retrieve Wi-Fi connections"}
+})
+async def delete_saved_wifi_connections(
+) -> list[DeletedWifiConnectionSchema]:
+    result = await delete_wifi_connections()
+    if result is None:
         raise HTTPException(500, "Command execution failed")
-
-    for line in command.output.splitlines():
-        if "wireless" in line:
-            connection_uuid = [i.strip() for i in line.split(":")][1]
-            delete_connection = SysCmdExec.run(["sudo", "nmcli", "connection",
-                                                "delete", connection_uuid])
-            if not delete_connection.success:
-                raise HTTPException(500, f"Failed to delete {connection_uuid}")
-    return Response(status_code=200)
+    if wifi_state.ready:
+        await wifi_state.refresh()
+    return result if result else Response(status_code=204)
 
 
 @router.get("/wifi/{interface}/networks", responses={
@@ -232,37 +278,37 @@ def delete_saved_wifi_connections() -> Response:
     204: {"description": "No available Wi-Fi networks found"},
     500: {"description": "Failed to retrieve Wi-Fi networks"}
 })
-def available_wifi_networks(interface: str) -> list[WifiNetworkSchema]:
-    command = SysCmdExec.run(["sudo", "nmcli", "-t", "device",
-                              "wifi", "list", "ifname", interface])
-    if not command.success:
-        raise HTTPException(500, "Command execution failed")
+async def available_wifi_networks(
+        interface: str, refresh: bool = False) -> list[WifiNetworkSchema]:
+    scan = wifi_state.scans.get(interface)
+    if scan is None or scan.scannedAt is None:
+        # only the first scan of an interface is waited for
+        success = await asyncio.shield(wifi_state.scan(interface))
+        if not success:
+            raise HTTPException(500, "Command execution failed")
+        scan = wifi_state.scans[interface]
+    elif refresh:
+        wifi_state.scan(interface, rescan="yes")
+    return scan.networks if scan.networks else Response(status_code=204)
+
+
+@router.get("/wifi/{interface}/scan", responses={
+    200: {"description": "Last Wi-Fi scan retrieved successfully"}
+})
+async def wifi_scan(interface: str) -> WifiScanSchema:
+    return wifi_state.scans.get(interface, WifiScanSchema(interface=interface))
 
-    result: list[WifiNetworkSchema] = []
-    for line in command.output.splitlines():
-        data = re.search(
-            r"(?P<connected>\*| )"
-            r":(?P<bssid>(?:..\\:){5}..)"
-            r":(?P<ssid>.*?)"
-            r":(?P<mode>.*?)"
-            r":(?P<chan>\d+)"
-            r":(?P<rate>.*?)"
-            r":(?P<signal>\d+)"
-            r":(?P<bars>.*?)"
-            r":(?P<security>.+)", line)
-        if data:
-            network = data.groupdict()
-            network["connected"] = network["connected"] == "*"
-            network["bssid"] = network["bssid"].replace("\\", "")
-            network["chan"] = int(network["chan"])
-            network["signal"] = int(network["signal"])
-            network["security"] = network["security"].split(" ")
-            result.append(WifiNetworkSchema(**network))
-    return result if result else Response(status_code=204)
+
+@router.post("/wifi/{interface}/scan", status_code=202, responses={
+    202: {"description": "Wi-Fi scan started"}
+})
+async def start_wifi_scan(interface: str) -> WifiScanSchema:
+    wifi_state.scan(interface, rescan="yes")
+    return wifi_state.scans[interface]
 
 
 @router.post("/wifi/connect", responses={**system_responses})
-def connect_wifi_network(data: ConnectWifiNetworkSchema) -> Response:
+async def connect_wifi_network(data: ConnectWifiNetworkSchema) -> Response:
     connect_args = ["sudo", "nmcli", "device", "wifi", "connect", data.ssid]
 
     if data.password:
@@ -271,29 +317,36 @@ def connect_wifi_network(data: ConnectWifiNetworkSchema) -> Response:
     if data.interface:
         connect_args.extend(["ifname", data.interface])
 
-    connect = SysCmdExec.run(connect_args)
+    connect = await SysCmdExec.aio_run(connect_args)
+    command_cache.invalidate(device_status_args)
     if not connect.success:
         raise HTTPException(500, "Failed to connect interface")
 
-    enable_autoconnect = SysCmdExec.run(["sudo", "nmcli", "connection",
-                                         "modify", data.ssid,
-                                         "connection.autoconnect", "yes"])
+    enable_autoconnect = await SysCmdExec.aio_run(
+        ["sudo", "nmcli", "connection", "modify", data.ssid,
+         "connection.autoconnect", "yes"])
     if not enable_autoconnect.success:
         raise HTTPException(500, "Failed to enable autoconnect")
+    if wifi_state.ready:
+        await wifi_state.refresh()
     return Response(status_code=200)
 
 
 @router.post("/wifi/disconnect", responses={**system_responses})
-def disconnect_wifi_network(ssid: str = Body()) -> Response:
-    disconnect = SysCmdExec.run(["sudo", "nmcli", "connection", "down", ssid])
+async def disconnect_wifi_network(ssid: str = Body()) -> Response:
+    disconnect = await SysCmdExec.aio_run(["sudo", "nmcli", "connection",
+                                           "down", ssid])
+    command_cache.invalidate(device_status_args)
     if not disconnect.success:
         raise HTTPException(500, "Failed to disconnect interface")
 
-    disable_autoconnect = SysCmdExec.run(["sudo", "nmcli", "connection",
-                                          "modify", ssid,
-                                          "connection.autoconnect", "no"])
+    disable_autoconnect = await SysCmdExec.aio_run(
+        ["sudo", "nmcli", "connection", "modify", ssid,
+         "connection.autoconnect", "no"])
     if not disable_autoconnect.success:
         raise HTTPException(500, "Failed to disable autoconnect")
+    if wifi_state.ready:
+        await wifi_state.refresh()
     return Response(status_code=200)
 
 
@@ -302,112 +355,35 @@ def disconnect_wifi_network(ssid: str = Body()) -> Response:
     204: {"description": "No connected displays found"},
     500: {"description": "Failed to retrieve list of connected displays"}
 })
-def connected_displays() -> list[ConnectedDisplay]:
-    command = SysCmdExec.run(["sudo", "xrandr"])
+async def connected_displays() -> list[ConnectedDisplay]:
+    command = await command_cache.run(xrandr_args)
     if not command.success:
         raise HTTPException(500, "Command execution failed")
 
-    regex = (r"(.+)\s(?:connected)(.*)\s(\d+x\d+)\+(\d+\+\d+)\s(.*?)\(.+\n"
-             r"((\s+\d+x\d+\w*\s+.*\n)+)")
-    data: list[tuple[str]] = re.findall(regex, command.output)
-    result = []
-    for i in data:
-        # i[0] - display name, i[1] - is primary?, i[2] - resolution
-        # i[3] - position, i[4] - rotation and reflect, i[5] - resolutions
-        width, height = map(int, i[2].split("x"))
-        x, y = map(int, i[3].split("+"))
-        if i[4]:
-            rotation, reflect = i[4].split()[0], " ".join(i[4].split()[1:])
-        else:
-            rotation, reflect = "normal", "normal"
-        result.append(ConnectedDisplay(
-            name=i[0],
-            primary=bool(i[1]),
-            resolution=DisplayResolution(width=width, height=height),
-            position=DisplayPosition(x=x, y=y),
-            rotation=rotation,
-            reflect=reflect,
-            resolutions=[s.split()[0] for s in i[5].splitlines()]
-        ))
+    result = parse_xrandr(command.output)
     return result if result else Response(status_code=204)
 
 
 @router.get("/displays/config", response_model_exclude_none=True,
             responses={**system_responses})
 def displays_config() -> list[DisplayConfig]:
-    if not xrandr_config.exists():
-        return Response(status_code=204)
-
-    xrandr_data = xrandr_config.read_text("utf-8")
-    if not xrandr_data:
-        return Response(status_code=204)
-
-    result = []
-    for line in xrandr_data.splitlines():
-        args = xrandr_to_dict(line.split())
-        display = DisplayConfig(name=args["--output"])
-
-        display.primary = "--primary" in args
-        if "--resolution" in args:
-            width, height = args["--mode"].split("x")
-            display.resolution.width, display.resolution.height = width, height
-        if "--rotation" in args:
-            display.rotation = args["--rotation"]
-        if "--position" in args:
-            x, y = args["--position"].split("x")
-            display.position = DisplayPosition(x=x, y=y)
-        if "--reflect" in args:
-            display.reflect = args["--reflect"]
-        result.append(display)
-
-    return result
+    result = [display_from_row(row) for row in state_store.displays()]
+    return result if result else Response(status_code=204)
+
+
+def save_display_config(display: DisplayConfig) -> None:
+    with state_store.transaction() as transaction:
+        transaction.save_display(display_to_row(display))
 
 
 @router.post("/displays/config", responses={**system_responses})
-def set_display_config(display: DisplayConfig) -> Response:
-    args = ["sudo", "xrandr", "--output", display.name]
-    if display.resolution:
-        width, height = display.resolution.width, display.resolution.height
-        args.extend(["--mode", f"{width}x{height}"])
-    if display.rotation:
-        args.extend(["--rotation", display.rotation])
-    if display.position:
-        x, y = display.position.x, display.position.y
-        args.extend(["--pos", f"{x}x{y}"])
-    if display.reflect:
-        args.extend(["--reflect", display.reflect])
-    if display.primary:
-        args.append("--primary")
-
-    command = SysCmdExec.run(args)
+async def set_display_config(display: DisplayConfig) -> Response:
+    command = await SysCmdExec.aio_run(display_config_args(display))
+    command_cache.invalidate(xrandr_args)
     if not command.success:
         raise HTTPException(500, "Command execution failed")
 
-    if not xrandr_config.exists():
-        xrandr_config.write_text(" ".join(args), "utf-8")
-        return Response(status_code=200)
-
-    xrandr_data = xrandr_config.read_text("utf-8")
-    if display.name not in xrandr_data:
-        xrandr_data = f'{" ".join(args)}\n{xrandr_data}'
-        xrandr_config.write_text(xrandr_data, "utf-8")
-        return Response(status_code=200)
-
-    stored_args = []
-    xrandr_data = xrandr_data.splitlines()
-    for line in xrandr_data:
-        if display.name in line:
-            stored_args = line.split()
-            xrandr_data.remove(line)
-            break
-
-    merged_args = xrandr_to_dict(stored_args) | xrandr_to_dict(args)
-    merged_args = [f"{k} {v}" if v else k for (k, v) in merged_args.items()]
-    if display.primary:
-        xrandr_data = [i.replace(" --primary", "")
-                       if " --primary" in i else i for i in xrandr_data]
-    xrandr_data.insert(0, " ".join(merged_args))
-    xrandr_config.write_text("\n".join(xrandr_data), "utf-8")
+    await run_in_threadpool(save_display_config, display)
     return Response(status_code=200)
 
 
@@ -417,17 +393,9 @@ def set_display_config(display: DisplayConfig) -> Response:
     404: {"description": "Display configuration not found"}
 })
 def delete_display_config(display_name: str = Body()) -> Response:
-    if not xrandr_config.exists():
-        return Response(status_code=204)
-
-    xrandr_data = xrandr_config.read_text("utf-8")
-    if display_name not in xrandr_data:
-        raise HTTPException(404, "Display configuration not found")
-
-    xrandr_data = xrandr_data.splitlines()
-    for line in xrandr_data:
-        if display_name in line:
-            xrandr_data.remove(line)
-            xrandr_config.write_text("\n".join(xrandr_data), "utf-8")
-            break
+    with state_store.transaction() as transaction:
+        if not transaction.displays():
+            return Response(status_code=204)
+        if not transaction.delete_display(display_name):
+            raise HTTPException(404, "Display configuration not found")
     return Response(status_code=200)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Annotated, Literal, Optional
 from pydantic import BaseModel, Field, StringConstraints
 
@@ -28,6 +29,12 @@ class SavedWifiConnectionSchema(BaseModel):
     interface: str
 
 
+class DeletedWifiConnectionSchema(BaseModel):
+    ssid: str
+    uuid: str
+    deleted: bool
+
+
 class ToggleWifiInterfaceSchema(BaseModel):
     name: str
     state: bool
@@ -45,6 +52,13 @@ class WifiNetworkSchema(BaseModel):
     security: list[str]
 
 
+class WifiScanSchema(BaseModel):
+    interface: str
+    scannedAt: Optional[datetime] = None
+    scanning: bool = False
+    networks: list[WifiNetworkSchema] = []
+
+
 class ConnectWifiNetworkSchema(BaseModel):
     ssid: str
     password: Optional[str] = None
@@ -0,0 +1,279 @@
+import re
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from subprocess import PIPE, DEVNULL
+from asyncio.subprocess import Process
+from contextlib import suppress
+
+from src.core.syscmd import SysCmdExec
+from src.api.media_node.config import (command_cache, list_sinks_args,
+                                       device_status_args, connections_args)
+from src.api.media_node.parsers import (parse_sinks, parse_wifi_interfaces,
+                                        parse_saved_connections,
+                                        parse_wireless_uuids,
+                                        parse_wifi_networks)
+from src.api.media_node.schemas import (AudioDeviceSchema,
+                                        WifiInterfaceSchema,
+                                        SavedWifiConnectionSchema,
+                                        DeletedWifiConnectionSchema,
+                                        WifiScanSchema)
+
+logger = logging.getLogger(__name__)
+
+
+async def delete_wifi_connections(
+) -> list[DeletedWifiConnectionSchema] | None:
+    """Delete all saved Wi-Fi connections with a single nmcli call.
+
+    nmcli keeps going when a deletion fails, the connections 
+    that are still listed afterwards are reported as not deleted.
+
+    Returns:
+        list[DeletedWifiConnectionSchema] | None: 
+            The result for every connection, 
+            or None if the connections can't be listed.
+    """
+    listing = await SysCmdExec.aio_run(connections_args)
+    if not listing.success:
+        return None
+    wireless = parse_wireless_uuids(listing.output)
+    if not wireless:
+        return []
+
+    args = ["sudo", "nmcli", "connection", "delete"]
+    for connection_uuid in wireless:
+        args.extend(["uuid", connection_uuid])
+    delete = await SysCmdExec.aio_run(args, timeout=60)
+    command_cache.invalidate(device_status_args)
+
+    remaining = set()
+    if not delete.success:
+        listing = await SysCmdExec.aio_run(connections_args)
+        remaining = (set(parse_wireless_uuids(listing.output))
+                     if listing.success else set(wireless))
+    return [DeletedWifiConnectionSchema(
+                ssid=ssid, uuid=connection_uuid,
+                deleted=connection_uuid not in remaining)
+            for connection_uuid, ssid in wireless.items()]
+
+
+class EventWatcher(ABC):
+    """
+    Runs a long-lived command that reports state changes line by line
+    and calls `refresh` once per burst of events. The command is
+    restarted with exponential backoff when it ends.
+    """
+
+    subscribe_args: list[str] = []
+
+    def __init__(self, debounce: float = 0.05,
+                 max_backoff: float = 30.0) -> None:
+        self.debounce = debounce
+        self.max_backoff = max_backoff
+        self.synced = False
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._process: Process | None = None
+
+    def is_event(self, line: str) -> bool:  # pylint: disable=unused-argument
+        """Whether an output line of the command reports a change."""
+        return True
+
+    @abstractmethod
+    async def refresh(self) -> bool:
+        """Re-read the state. Returns False if it can't be read."""
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def ready(self) -> bool:
+        """The in-memory state is in sync and kept up to date."""
+        return self.synced and self.running
+
+    async def _refresh_dirty(self) -> None:
+        # events arriving while the refresh runs trigger one more pass
+        while self._dirty:
+            await asyncio.sleep(self.debounce)
+            self._dirty = False
+            try:
+                await self.refresh()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to refresh %s",
+                                 type(self).__name__)
+
+    def _schedule_refresh(self) -> None:
+        self._dirty = True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_dirty())
+
+    async def _watch(self) -> None:
+        program, *args = self.subscribe_args
+        self._process = await asyncio.create_subprocess_exec(
+            program, *args, stdout=PIPE, stderr=DEVNULL,
+            start_new_session=True)
+        try:
+            # changes before the subscription are unknown, so resync
+            await self.refresh()
+            async for line in self._process.stdout:
+                if self.is_event(line.decode(errors="replace").strip()):
+                    self._schedule_refresh()
+            await self._process.wait()
+        finally:
+            # don't leave the command running when restarting
+            if self._process.returncode is None:
+                await SysCmdExec.terminate(self._process)
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while self._task is asyncio.current_task():
+            try:
+                await self._watch()
+                if self._task is not asyncio.current_task():
+                    break
+                if self.synced:
+                    backoff = 1.0
+                logger.warning("Event subscription ended: %s",
+                               " ".join(self.subscribe_args))
+            except OSError as error:
+                logger.warning("Event subscription failed: %s", error)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # e.g. a parser error in refresh, keep watching
+                logger.exception("Event subscription failed: %s",
+                                 " ".join(self.subscribe_args))
+            self.synced = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def start(self) -> None:
+        """Start watching events."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop watching events."""
+        task, self._task = self._task, None
+        if self._process and self._process.returncode is None:
+            await SysCmdExec.terminate(self._process)
+        for item in (task, self._refresh_task):
+            if item:
+                item.cancel()
+                with suppress(asyncio.CancelledError):
+                    await item
+        self.synced = False
+
+
+class AudioStateWatcher(EventWatcher):
+    """
+    Keeps an in-memory model of the PulseAudio sinks, the default sink
+    and its volume, updated from `pactl subscribe` events.
+    """
+
+    subscribe_args = ["pactl", "subscribe"]
+    event_regex = re.compile(r"^Event '\w+' on (?:sink|server)(?: #-?\d+)?$")
+
+    def __init__(self, debounce: float = 0.05,
+                 max_backoff: float = 30.0) -> None:
+        super().__init__(debounce, max_backoff)
+        self.sinks: list[AudioDeviceSchema] = []
+        self.default: AudioDeviceSchema | None = None
+        self.volume: int | None = None
+
+    def is_event(self, line: str) -> bool:
+        return bool(self.event_regex.match(line))
+
+    async def refresh(self) -> bool:
+        command_cache.invalidate(list_sinks_args)
+        command = await command_cache.run(list_sinks_args, timeout=5)
+        if not command.success:
+            self.synced = False
+            return False
+        self.sinks, self.default, self.volume = parse_sinks(command.output)
+        self.synced = True
+        return True
+
+
+class WifiStateWatcher(EventWatcher):
+    """
+    Keeps the Wi-Fi interfaces, saved connections and the last scan
+    of every interface in memory, updated from `nmcli monitor` events.
+    Scans run as background jobs.
+    """
+
+    subscribe_args = ["sudo", "nmcli", "monitor"]
+
+    def __init__(self, debounce: float = 0.2,
+                 max_backoff: float = 30.0) -> None:
+        super().__init__(debounce, max_backoff)
+        self.interfaces: list[WifiInterfaceSchema] = []
+        self.connections: list[SavedWifiConnectionSchema] = []
+        self.scans: dict[str, WifiScanSchema] = {}
+        self._scan_tasks: dict[str, asyncio.Task] = {}
+
+    async def refresh(self) -> bool:
+        command_cache.invalidate(device_status_args)
+        devices, connections = await asyncio.gather(
+            command_cache.run(device_status_args, timeout=10),
+            SysCmdExec.aio_run(connections_args, timeout=10))
+        if not devices.success or not connections.success:
+            self.synced = False
+            return False
+        self.interfaces = parse_wifi_interfaces(devices.output)
+        self.connections = parse_saved_connections(connections.output)
+        self.synced = True
+        # the connected network may have changed, NetworkManager's
+        # last scan results are re-read without rescanning
+        for interface in list(self.scans):
+            self.scan(interface, rescan="no")
+        return True
+
+    async def _scan(self, interface: str, rescan: str) -> bool:
+        args = ["sudo", "nmcli", "-t", "device", "wifi", "list",
+                "--rescan", rescan, "ifname", interface]
+        try:
+            command = await SysCmdExec.aio_run(args, timeout=30)
+        finally:
+            self.scans[interface].scanning = False
+        scan = self.scans[interface]
+        if command.success:
+            scan.networks = parse_wifi_networks(command.output)
+            scan.scannedAt = datetime.now(timezone.utc)
+        elif scan.scannedAt is None:
+            # don't remember interfaces that were never scanned
+            del self.scans[interface]
+        return command.success
+
+    def scan(self, interface: str, rescan: str = "auto") -> asyncio.Task:
+        """Start a scan job unless one is already running.
+
+        Args:
+            interface (str): The Wi-Fi interface name.
+            rescan (str, optional):
+                nmcli `--rescan` value: "yes", "no" or "auto".
+                Defaults to "auto".
+
+        Returns:
+            asyncio.Task: The running job, its result is True on success.
+        """
+        task = self._scan_tasks.get(interface)
+        if task is None or task.done():
+            scan = self.scans.setdefault(
+                interface, WifiScanSchema(interface=interface))
+            scan.scanning = True
+            task = asyncio.create_task(self._scan(interface, rescan))
+            self._scan_tasks[interface] = task
+        return task
+
+    async def stop(self) -> None:
+        await super().stop()
+        for task in self._scan_tasks.values():
+            task.cancel()
+        self._scan_tasks.clear()
+
+
+audio_state = AudioStateWatcher()
+wifi_state = WifiStateWatcher()
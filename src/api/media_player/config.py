@@ -1,8 +1,8 @@
 import logging
+from src.config import app_config, state_store
 from src.constants import AppDir
-from src.core.vlcrc import VLCRemoteControl
+from src.core.vlcrc_async import AsyncVLCRemoteControl
 from src.core.syscmd import SysCmdExec
-from src.core.configmgr import ConfigManager
 from src.api.media_player.schemas import ConfigSchema
 from src.api.media_player.constants import (PlaybackOption,
                                             VideoOutputModule,
@@ -18,12 +18,18 @@ default_config = {
         audioOutput=AudioOutputModule.AUTO,
         audioDevice="",
         playback=PlaybackOption.LOOP.value,
-        imageDuration=10
+        imageDuration=10,
+        statusInterval=1.0,
+        coalesceWindow=0.15
     ).model_dump()
 }
-config_manager = ConfigManager(config_path, default_config)
+config_manager = state_store.settings("media_player", config_path,
+                                      default_config)
 vlc_config = ConfigSchema.model_validate(config_manager.load_section())
-vlc_rc = VLCRemoteControl("127.0.0.1", 50000)
+vlc_rc = AsyncVLCRemoteControl("127.0.0.1", 50000)
+if app_config.workers > 1:
+    # VLC serves one RC client at a time, workers must not keep it idle
+    vlc_rc.pool.idle_timeout = 0
 
 if vlc_config.autostart:
     args = ["systemctl", "--user", "start", "media-player.service"]
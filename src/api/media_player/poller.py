@@ -0,0 +1,133 @@
+import re
+import time
+import asyncio
+import logging
+from contextlib import suppress
+
+from src.core.vlcrc_async import AsyncVLCRemoteControl
+from src.api.media_player.schemas import PlayerStateSchema
+
+logger = logging.getLogger(__name__)
+
+
+def volume_to_percent(value: int) -> int:
+    """Convert VLC volume (0-320) to volume percent (0-125)."""
+    return int((value / 320) * 125)
+
+
+class PlayerStatePoller:
+    """
+    Polls VLC in the background and keeps a parsed player state 
+    in memory, so readers never talk to VLC directly.
+    """
+
+    def __init__(self, rc: AsyncVLCRemoteControl,
+                 interval: float = 1.0) -> None:
+        self.rc = rc
+        self.interval = interval
+        self.snapshot = PlayerStateSchema(available=False)
+        self.updated_at = 0.0
+        self._task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+        self._subscribers: set[asyncio.Queue[PlayerStateSchema]] = set()
+
+    @staticmethod
+    def _parse_int(data: list[str]) -> int | None:
+        for item in data:
+            with suppress(ValueError):
+                return int(item.strip())
+        return None
+
+    async def update(self) -> PlayerStateSchema:
+        """Query VLC once and replace the snapshot."""
+        async with self.rc.session() as session:
+            status = await session.status()
+            play_time = await session.exec("get_time")
+            length = await session.exec("get_length")
+            devices = await session.get_adev()
+            # VLC serves one RC client at a time. Reused every interval,
+            # the connection would never idle out and other clients
+            # (`init_vlc_audio.py`, the vlcrc command line) never get in.
+            session.close()
+
+        snapshot = PlayerStateSchema(available=status.success)
+        for line in status.data if status.success else []:
+            if match := re.search(r"new input: (.+) \)", line):
+                snapshot.item = match.group(1)
+            elif match := re.search(r"audio volume: (\d+)", line):
+                snapshot.volume = volume_to_percent(int(match.group(1)))
+            elif match := re.search(r"\( state (\w+) \)", line):
+                snapshot.state = match.group(1)
+        if play_time.success:
+            snapshot.time = self._parse_int(play_time.data)
+        if length.success:
+            snapshot.length = self._parse_int(length.data)
+        for device in devices:
+            # VLC marks the active audio device with an asterisk
+            if device.name.endswith(" *"):
+                snapshot.audioDevice = device.id
+
+        changed = snapshot != self.snapshot
+        self.snapshot = snapshot
+        self.updated_at = time.monotonic()
+        if changed:
+            self._publish(snapshot)
+        return snapshot
+
+    def _publish(self, snapshot: PlayerStateSchema) -> None:
+        for queue in self._subscribers:
+            # keep only the latest state for slow subscribers
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    def subscribe(self) -> "asyncio.Queue[PlayerStateSchema]":
+        """Get a queue that receives the snapshot whenever it changes."""
+        queue: asyncio.Queue[PlayerStateSchema] = asyncio.Queue(1)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[PlayerStateSchema]") -> None:
+        self._subscribers.discard(queue)
+
+    async def _run(self) -> None:
+        # the loop condition, not only cancellation, ends polling:
+        # asyncio.wait_for may swallow a cancel request on Python < 3.12
+        while self._task is asyncio.current_task():
+            try:
+                await self.update()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to update player state")
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            self._wake.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start background polling."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop background polling."""
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            self._wake.set()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def refresh(self) -> None:
+        """Poll again without waiting for the rest of the interval."""
+        self._wake.set()
+
+    async def state(self) -> PlayerStateSchema:
+        """Return the latest snapshot with its age. 
+        If polling isn't running, VLC is queried directly."""
+        if not self.running:
+            await self.update()
+        age = int((time.monotonic() - self.updated_at) * 1000)
+        return self.snapshot.model_copy(update={"ageMs": age})
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Body, HTTPException, Response
+import asyncio
+from contextlib import suppress
+from fastapi import (APIRouter, Body, HTTPException, Request, Response,
+                     WebSocket, WebSocketDisconnect)
 
-from src.constants import AppDir
-from src.core.vlcrc import VLCRemoteControl
+from src.core.vlcrc_async import AsyncVLCRemoteControl
 from src.core.syscmd import SysCmdExec
+from src.core.etag import make_etag, check_etag
+from src.api.media_player import service
 from src.api.media_player.config import config_manager, vlc_rc
-from src.api.media_player.schemas import ConfigSchema
+from src.api.media_player.service import poller
+from src.api.media_player.schemas import (ConfigSchema, PlayerBatchSchema,
+                                          PlayerBatchResultSchema,
+                                          PlayerStateSchema,
+                                          PlayerHealthSchema)
 
 router = APIRouter(prefix="/media-player", tags=["media player"])
 
@@ -19,101 +27,137 @@ player_responses = {
 }
 
 
-@router.get("/config")
-def player_config() -> ConfigSchema:
+@router.on_event("startup")
+async def start_state_poller() -> None:
+    poller.start()
+
+
+@router.on_event("shutdown")
+async def stop_state_poller() -> None:
+    await poller.stop()
+
+
+@router.get("/config", responses={
+    304: {"description": "Config not modified"}
+})
+def player_config(request: Request, response: Response) -> ConfigSchema:
+    etag = make_etag(config_manager.revision)
+    if not_modified := check_etag(request, response, etag):
+        return not_modified
     return ConfigSchema.model_validate(config_manager.load_section())
 
 
 @router.post("/config")
 def set_player_config(data: ConfigSchema) -> Response:
     config_manager.save_section(data.model_dump(exclude_none=True))
+    if data.statusInterval:
+        poller.interval = data.statusInterval
+    if data.coalesceWindow is not None:
+        service.coalescer.window = data.coalesceWindow
     return Response(status_code=200)
 
 
 @router.post("/start-service", responses={**service_responses})
-def start_player() -> Response:
+async def start_player() -> Response:
     args = ["systemctl", "--user", "start", "media-player.service"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=200 if command.success else 500)
 
 
 @router.post("/stop-service", responses={**service_responses})
-def stop_player() -> Response:
+async def stop_player() -> Response:
     args = ["systemctl", "--user", "stop", "media-player.service"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=200 if command.success else 500)
 
 
 @router.post("/restart-service", responses={**service_responses})
-def restart_player() -> Response:
+async def restart_player() -> Response:
     args = ["systemctl", "--user", "restart", "media-player.service"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=200 if command.success else 500)
 
 
 @router.post("/play", responses={**player_responses})
-def play() -> Response:
-    return Response(status_code=200 if vlc_rc.play() else 503)
+async def play() -> Response:
+    return Response(status_code=200 if await vlc_rc.play() else 503)
 
 
 @router.post("/stop", responses={**player_responses})
-def stop() -> Response:
-    return Response(status_code=200 if vlc_rc.stop() else 503)
+async def stop() -> Response:
+    return Response(status_code=200 if await vlc_rc.stop() else 503)
 
 
 @router.post("/next", responses={**player_responses})
-def next_item() -> Response:
-    return Response(status_code=200 if vlc_rc.next() else 503)
+async def next_item() -> Response:
+    return Response(status_code=200 if await vlc_rc.next() else 503)
 
 
 @router.post("/previous", responses={**player_responses})
-def previous_item() -> Response:
-    return Response(status_code=200 if vlc_rc.prev() else 503)
+async def previous_item() -> Response:
+    return Response(status_code=200 if await vlc_rc.prev() else 503)
 
 
 @router.post("/goto", responses={**player_responses})
-def goto_index(index: int = Body(gt=0)) -> Response:
-    return Response(status_code=200 if vlc_rc.goto(index) else 503)
+async def goto_index(index: int = Body(gt=0)) -> Response:
+    return Response(status_code=200 if await vlc_rc.goto(index) else 503)
 
 
 @router.post("/clear", responses={**player_responses})
-def clear_playlist() -> Response:
-    return Response(status_code=200 if vlc_rc.clear() else 503)
+async def clear_playlist() -> Response:
+    return Response(status_code=200 if await vlc_rc.clear() else 503)
 
 
 @router.get("/status", responses={
     200: {"description": "Playlist status retrieved successfully"},
     503: {"description": "Failed to retrieve playlist status"}
 })
-def playlist_status() -> list[str]:
-    response = vlc_rc.status()
-    if response.success:
-        return [i for i in response.data if "new input:" not in i]
+async def playlist_status() -> PlayerStateSchema:
+    state = await poller.state()
+    if state.available:
+        return state
     raise HTTPException(503, "Failed to retrieve playlist status")
 
 
+@router.get("/health")
+async def player_health() -> PlayerHealthSchema:
+    breaker = vlc_rc.breaker
+    retry_in = breaker.retry_in()
+    return PlayerHealthSchema(
+        available=breaker.allow(),
+        circuit=breaker.state.value,
+        failures=breaker.failures,
+        lastError=breaker.last_error or None,
+        retryInMs=None if retry_in is None else int(retry_in * 1000)
+    )
+
+
 @router.post("/pause", responses={**player_responses})
-def toggle_pause() -> Response:
-    return Response(status_code=200 if vlc_rc.pause() else 503)
+async def toggle_pause() -> Response:
+    return Response(status_code=200 if await vlc_rc.pause() else 503)
 
 
 @router.get("/volume", responses={
     200: {"description": "Current volume level retrieved successfully"},
     503: {"description": "Failed to retrieve volume level"}
 })
-def volume_level() -> int:
-    value = vlc_rc.get_volume()
-    if value == -1:
+async def volume_level() -> int:
+    state = await poller.state()
+    if state.volume is None:
         raise HTTPException(503, "Failed to retrieve volume level")
-    return int((value / 320) * 125)
+    return state.volume
 
 
 @router.post("/volume", responses={**player_responses})
-def set_volume(percent: int = Body(ge=0, le=125)) -> Response:
-    value = int((percent / 125) * 320)
-    if vlc_rc.set_volume(value):
-        data = ConfigSchema(volume=str(value))
-        config_manager.save_section(data.model_dump(exclude_none=True))
+async def set_volume(percent: int = Body(ge=0, le=125)) -> Response:
+    if await service.coalesced("volume", percent):
+        return Response(status_code=200)
+    return Response(status_code=503)
+
+
+@router.post("/seek", responses={**player_responses})
+async def seek(position: int = Body(ge=0)) -> Response:
+    if await service.coalesced("seek", position):
         return Response(status_code=200)
     return Response(status_code=503)
 
@@ -122,18 +166,16 @@ def set_volume(percent: int = Body(ge=0, le=125)) -> Response:
     200: {"description": "Audio devices retrieved"},
     503: {"description": "Failed to retrieve audio devices"}
 })
-def audio_devices() -> list[VLCRemoteControl.AudioDevice]:
-    devices = vlc_rc.get_adev()
+async def audio_devices() -> list[AsyncVLCRemoteControl.AudioDevice]:
+    devices = await vlc_rc.get_adev()
     if devices:
         return devices
     return Response(status_code=503)
 
 
 @router.post("/default-audio-device", responses={**player_responses})
-def set_default_audio_device(device_id: str = Body()) -> Response:
-    if vlc_rc.set_adev(device_id):
-        data = ConfigSchema(audioDevice=device_id)
-        config_manager.save_section(data.model_dump(exclude_none=True))
+async def set_default_audio_device(device_id: str = Body()) -> Response:
+    if await service.coalesced("audio-device", device_id):
         return Response(status_code=200)
     return Response(status_code=503)
 
@@ -143,10 +185,69 @@ def set_default_audio_device(device_id: str = Body()) -> Response:
     404: {"description": "Playlist not found"},
     503: {"description": "Command execution failed"}
 })
-def change_playlist(playlist_name: str = Body()) -> Response:
-    playlist = AppDir.PLAYLISTS.value/f"{playlist_name}.m3u"
-    if not playlist.is_file():
-        raise HTTPException(404, "Playlist not found")
-    if vlc_rc.clear() and vlc_rc.add(playlist):
-        return Response(status_code=200)
+async def change_playlist(playlist_name: str = Body()) -> Response:
+    try:
+        if await service.change_playlist(vlc_rc, playlist_name):
+            return Response(status_code=200)
+    except FileNotFoundError as e:
+        raise HTTPException(404, "Playlist not found") from e
     raise HTTPException(503, "Command execution failed")
+
+
+@router.post("/batch", responses={
+    200: {"description": "Batch executed, see per-step results"}
+})
+async def run_batch(batch: PlayerBatchSchema) -> PlayerBatchResultSchema:
+    results = []
+    async with vlc_rc.session() as session:
+        for step in batch.steps:
+            result = await service.run_step(session, step)
+            results.append(result)
+            if not result.success and batch.stopOnError:
+                break
+    return PlayerBatchResultSchema(
+        success=all(i.success for i in results) and
+        len(results) == len(batch.steps),
+        results=results
+    )
+
+
+@router.websocket("/ws")
+async def player_socket(websocket: WebSocket) -> None:
+    """
+    Push player state changes and accept player commands.
+
+    Server messages: `{"type": "state" | "diff", "data": {...}}` 
+    and `{"type": "result" | "error", "id": ..., ...}` replies.
+    Client messages: `{"id": ..., "command": ..., "value": ...}`.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict) -> None:
+        # state pushes and replies must not interleave on the socket
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def reply(message: str) -> None:
+        with suppress(WebSocketDisconnect):
+            await send(await service.handle_message(message))
+
+    updates = poller.subscribe()
+    sender = asyncio.create_task(service.push_state(send, updates))
+    replies: set[asyncio.Task] = set()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            # setters wait for the coalescing window, keep reading
+            # so that newer values can replace them meanwhile
+            task = asyncio.create_task(reply(message))
+            replies.add(task)
+            task.add_done_callback(replies.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        for task in replies:
+            task.cancel()
+        poller.unsubscribe(updates)
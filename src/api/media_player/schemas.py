@@ -1,10 +1,14 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 
 from src.api.media_player.constants import (AudioOutputModule,
                                             VideoOutputModule,
                                             PlaybackOption)
 
+PlayerCommand = Literal["play", "stop", "next", "previous", "goto", "clear",
+                        "pause", "volume", "seek", "audio-device",
+                        "change-playlist"]
+
 
 class ConfigSchema(BaseModel, use_enum_values=True):
     autostart: Optional[bool] = None
@@ -14,6 +18,8 @@ class ConfigSchema(BaseModel, use_enum_values=True):
     audioDevice: Optional[str] = None
     playback: Optional[str] = None
     imageDuration: Optional[float] = None
+    statusInterval: Optional[float] = Field(default=None, gt=0)
+    coalesceWindow: Optional[float] = Field(default=None, ge=0)
 
     @field_validator("playback")
     @classmethod
@@ -26,3 +32,43 @@ class ConfigSchema(BaseModel, use_enum_values=True):
                 f"{', '.join(options)} separated by spaces."
             )
         return " ".join(value)
+
+
+class PlayerStepSchema(BaseModel):
+    command: PlayerCommand
+    value: Optional[int | str] = None
+
+
+class PlayerBatchSchema(BaseModel):
+    steps: list[PlayerStepSchema] = Field(min_length=1)
+    stopOnError: bool = False
+
+
+class PlayerStepResultSchema(BaseModel):
+    command: PlayerCommand
+    success: bool
+    detail: Optional[str] = None
+
+
+class PlayerBatchResultSchema(BaseModel):
+    success: bool
+    results: list[PlayerStepResultSchema]
+
+
+class PlayerStateSchema(BaseModel):
+    available: bool
+    state: Optional[str] = None
+    item: Optional[str] = None
+    volume: Optional[int] = None
+    time: Optional[int] = None
+    length: Optional[int] = None
+    audioDevice: Optional[str] = None
+    ageMs: int = 0
+
+
+class PlayerHealthSchema(BaseModel):
+    available: bool
+    circuit: str
+    failures: int
+    lastError: Optional[str] = None
+    retryInMs: Optional[int] = None
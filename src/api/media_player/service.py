@@ -0,0 +1,170 @@
+import json
+import asyncio
+import logging
+from functools import partial
+from typing import Awaitable, Callable
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+from src.constants import AppDir
+from src.core.vlcrc_async import AsyncVLCRemoteControl
+from src.core.coalescer import Coalescer
+from src.api.media_player.config import config_manager, vlc_config, vlc_rc
+from src.api.media_player.poller import PlayerStatePoller
+from src.api.media_player.schemas import (ConfigSchema, PlayerStepSchema,
+                                          PlayerStepResultSchema,
+                                          PlayerStateSchema)
+
+logger = logging.getLogger(__name__)
+
+
+def percent_to_volume(percent: int) -> int:
+    """Convert volume percent (0-125) to VLC volume (0-320)."""
+    return int((percent / 125) * 320)
+
+
+async def set_volume(rc: AsyncVLCRemoteControl, percent: int) -> bool:
+    """Set the player volume and save it to the player config."""
+    value = percent_to_volume(percent)
+    if not await rc.set_volume(value):
+        return False
+    data = ConfigSchema(volume=str(value))
+    await run_in_threadpool(config_manager.save_section,
+                            data.model_dump(exclude_none=True))
+    return True
+
+
+async def set_audio_device(rc: AsyncVLCRemoteControl,
+                           device_id: str) -> bool:
+    """Set the player audio device and save it to the player config."""
+    if not await rc.set_adev(device_id):
+        return False
+    data = ConfigSchema(audioDevice=device_id)
+    await run_in_threadpool(config_manager.save_section,
+                            data.model_dump(exclude_none=True))
+    return True
+
+
+async def change_playlist(rc: AsyncVLCRemoteControl,
+                          playlist_name: str) -> bool:
+    """Replace the current playlist.
+
+    Raises:
+        FileNotFoundError: If the playlist does not exist.
+    """
+    playlist = AppDir.PLAYLISTS.value/f"{playlist_name}.m3u"
+    if not playlist.is_file():
+        raise FileNotFoundError("Playlist not found")
+    return await rc.clear() and await rc.add(playlist)
+
+
+async def seek(rc: AsyncVLCRemoteControl, position: int) -> bool:
+    """Seek to the specified position in seconds."""
+    return await rc.seek(position)
+
+
+setters = {
+    "volume": set_volume,
+    "seek": seek,
+    "audio-device": set_audio_device,
+}
+coalescer = Coalescer(0.15 if vlc_config.coalesceWindow is None
+                      else vlc_config.coalesceWindow)
+
+
+async def coalesced(command: str, value: int | str) -> bool:
+    """
+    Apply an idempotent setter ("volume", "seek", "audio-device") 
+    through the coalescing window: if newer values arrive 
+    within the window, only the latest one is sent to VLC and saved.
+    """
+    return await coalescer.submit(command, value,
+                                  partial(setters[command], vlc_rc))
+
+
+async def run_step(rc: AsyncVLCRemoteControl, step: PlayerStepSchema,
+                   coalesce: bool = False) -> PlayerStepResultSchema:
+    """Execute a single player operation.
+
+    Args:
+        rc (AsyncVLCRemoteControl): Client or session to use.
+        step (PlayerStepSchema): The operation.
+        coalesce (bool, optional): 
+            Pass setters through the coalescing window 
+            of the shared client. Defaults to False.
+    """
+    commands = {
+        "play": rc.play,
+        "stop": rc.stop,
+        "next": rc.next,
+        "previous": rc.prev,
+        "clear": rc.clear,
+        "pause": rc.pause,
+    }
+    try:
+        if step.command in commands:
+            success = await commands[step.command]()
+        elif step.command == "goto":
+            success = await rc.goto(int(step.value))
+        elif step.command in setters:
+            if step.command == "audio-device":
+                value = str(step.value)
+            else:
+                value = int(step.value)
+                if step.command == "volume" and not 0 <= value <= 125:
+                    raise ValueError("Value must be between 0 and 125")
+                if step.command == "seek" and value < 0:
+                    raise ValueError("Position must not be negative")
+            if coalesce:
+                success = await coalesced(step.command, value)
+            else:
+                success = await setters[step.command](rc, value)
+        else:
+            success = await change_playlist(rc, str(step.value))
+    except (TypeError, ValueError, FileNotFoundError) as error:
+        return PlayerStepResultSchema(command=step.command, success=False,
+                                      detail=str(error) or "Invalid value")
+    poller.refresh()
+    return PlayerStepResultSchema(
+        command=step.command, success=success,
+        detail=None if success else "Command execution failed")
+
+
+poller = PlayerStatePoller(vlc_rc, vlc_config.statusInterval or 1.0)
+
+
+def state_diff(old: dict, new: dict) -> dict:
+    """Return the keys of `new` whose values differ from `old`."""
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+
+async def push_state(send: Callable[[dict], Awaitable[None]],
+                     updates: "asyncio.Queue[PlayerStateSchema]") -> None:
+    """Send the full player state, then only the changed fields."""
+    exclude = {"ageMs"}
+    sent = (await poller.state()).model_dump(exclude=exclude)
+    await send({"type": "state", "data": sent})
+    while True:
+        state = (await updates.get()).model_dump(exclude=exclude)
+        diff = state_diff(sent, state)
+        if diff:
+            await send({"type": "diff", "data": diff})
+            sent = state
+
+
+async def handle_message(message: str) -> dict:
+    """Run a player command received over the WebSocket.
+
+    Expects `{"id": ..., "command": ..., "value": ...}`, 
+    the `id` is echoed back in the reply.
+    """
+    request_id = None
+    try:
+        data = json.loads(message)
+        if isinstance(data, dict):
+            request_id = data.pop("id", None)
+        step = PlayerStepSchema.model_validate(data)
+    except (ValueError, ValidationError) as error:
+        return {"type": "error", "id": request_id, "detail": str(error)}
+    result = await run_step(vlc_rc, step, coalesce=True)
+    return {"type": "result", "id": request_id, "data": result.model_dump()}
@@ -1,5 +1,5 @@
+from src.config import state_store
 from src.constants import AppDir
-from src.core.configmgr import ConfigManager
 from src.api.playlists.schemas import ConfigSchema
 
 config_path = AppDir.CONFIGS.value/"playlists.ini"
@@ -8,4 +8,5 @@ default_config = {
         defaultPlaylist=""
     ).model_dump()
 }
-config_manager = ConfigManager(config_path, default_config)
+config_manager = state_store.settings("playlists", config_path,
+                                      default_config)
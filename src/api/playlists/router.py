@@ -1,9 +1,10 @@
 from pathlib import Path
-from fastapi import APIRouter, Body, HTTPException, Response
+from fastapi import APIRouter, Body, HTTPException, Request, Response
 
 from src.constants import AppDir
-from src.core.filesys import (get_dir_files, del_files_from_dir,
-                              check_dir_files)
+from src.core.etag import dir_etag, check_etag
+from src.core.filesys import (get_dir_files, check_dir_files,
+                              aio_del_files_from_dir)
 from src.api.playlists.config import config_manager
 from src.api.playlists.service import playlist_content, create_playlist
 from src.api.playlists.schemas import (PlaylistSchema, ConfigSchema,
@@ -14,12 +15,18 @@ router = APIRouter(prefix="/playlists", tags=["playlists"])
 
 @router.get("/", responses={
     200: {"description": "Playlists retrieved successfully"},
-    204: {"description": "No playlists available"}
+    204: {"description": "No playlists available"},
+    304: {"description": "Playlists not modified"}
 })
-def available_playlists() -> list[str]:
+def available_playlists(request: Request, response: Response) -> list[str]:
+    etag = dir_etag(AppDir.PLAYLISTS.value)
+    if not_modified := check_etag(request, response, etag):
+        return not_modified
     files = get_dir_files(AppDir.PLAYLISTS.value, suffix=False)
     files.sort()
-    return files if len(files) > 0 else Response(status_code=204)
+    if len(files) == 0:
+        return Response(status_code=204, headers=response.headers)
+    return files
 
 
 @router.post("/", responses={
@@ -37,10 +44,9 @@ def new_playlist(playlist: PlaylistSchema) -> PlaylistSchema:
 
 
 @router.delete("/")
-def delete_playlists(files: list[str]) -> DeletedPlaylistsSchema:
+async def delete_playlists(files: list[str]) -> DeletedPlaylistsSchema:
     files = [f"{file}.m3u" for file in files]
-    dir_files = check_dir_files(files, AppDir.PLAYLISTS.value)
-    del_files_from_dir(dir_files.available, AppDir.PLAYLISTS.value)
+    dir_files = await aio_del_files_from_dir(files, AppDir.PLAYLISTS.value)
     return DeletedPlaylistsSchema(
         deleted=[Path(file).stem for file in dir_files.available],
         missing=[Path(file).stem for file in dir_files.missing]
@@ -0,0 +1,90 @@
+from pathlib import Path
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+
+from src.config import state_store
+from src.constants import AppDir
+from src.core.syscmd import SysCmdExec
+from src.core.filesys import get_dir_files
+from src.api.media_player import service as player_service
+from src.api.media_node.config import config_manager as node_config
+from src.api.media_node.config import (command_cache, xrandr_args,
+                                       display_to_row, display_from_row)
+from src.api.media_node.parsers import display_config_args
+from src.api.media_player.config import config_manager as player_config
+from src.api.playlists.config import config_manager as playlists_config
+from src.api.web_browser.config import config_manager as browser_config
+from src.api.provisioning.schemas import (NodeStateSchema, NodeConfigSchema,
+                                          PlayerConfigSchema,
+                                          BrowserConfigSchema)
+
+router = APIRouter(prefix="/provisioning", tags=["provisioning"])
+
+
+@router.get("/", response_model_exclude_none=True)
+def node_state() -> NodeStateSchema:
+    playlist = playlists_config.load_section().get("defaultPlaylist")
+    return NodeStateSchema(
+        mediaNode=NodeConfigSchema.model_validate(node_config.load_section()),
+        mediaPlayer=PlayerConfigSchema.model_validate(
+            player_config.load_section()),
+        webBrowser=BrowserConfigSchema.model_validate(
+            browser_config.load_section()),
+        defaultPlaylist=Path(playlist).stem if playlist else "",
+        displays=[display_from_row(row) for row in state_store.displays()]
+    )
+
+
+def save_node_state(data: NodeStateSchema) -> None:
+    """Save the settings of every area in a single transaction."""
+    with state_store.transaction() as transaction:
+        for manager, config in ((node_config, data.mediaNode),
+                                (player_config, data.mediaPlayer),
+                                (browser_config, data.webBrowser)):
+            if config is not None:
+                transaction.save_section(
+                    manager.area, config.model_dump(exclude_none=True))
+
+        if data.defaultPlaylist is not None:
+            playlist_path = ""
+            if data.defaultPlaylist:
+                playlist_path = (AppDir.PLAYLISTS.value
+                                 / f"{data.defaultPlaylist}.m3u").as_posix()
+            transaction.save_section(playlists_config.area,
+                                     {"defaultPlaylist": playlist_path})
+
+        if data.displays is not None:
+            transaction.replace_displays(
+                [display_to_row(display) for display in data.displays])
+
+
+@router.post("/", responses={
+    200: {"description": "Node state updated"},
+    404: {"description": "Playlist not found"},
+    500: {"description": "Display configuration saved but not applied"}
+})
+async def provision(data: NodeStateSchema) -> Response:
+    if data.defaultPlaylist:
+        playlists = get_dir_files(AppDir.PLAYLISTS.value, suffix=False)
+        if data.defaultPlaylist not in playlists:
+            raise HTTPException(404, "Playlist not found")
+    if data.webBrowser and data.webBrowser.webPage == "":
+        data.webBrowser.webPage = "about:blank"
+
+    await run_in_threadpool(save_node_state, data)
+
+    if data.mediaPlayer:
+        if data.mediaPlayer.statusInterval:
+            player_service.poller.interval = data.mediaPlayer.statusInterval
+        if data.mediaPlayer.coalesceWindow is not None:
+            player_service.coalescer.window = data.mediaPlayer.coalesceWindow
+
+    if data.displays:
+        failed = False
+        for display in data.displays:
+            command = await SysCmdExec.aio_run(display_config_args(display))
+            failed = failed or not command.success
+        command_cache.invalidate(xrandr_args)
+        if failed:
+            raise HTTPException(500, "Failed to apply display configuration")
+    return Response(status_code=200)
@@ -0,0 +1,15 @@
+from typing import Optional
+from pydantic import BaseModel
+
+from src.api.media_node.schemas import ConfigSchema as NodeConfigSchema
+from src.api.media_node.schemas import DisplayConfig
+from src.api.media_player.schemas import ConfigSchema as PlayerConfigSchema
+from src.api.web_browser.schemas import ConfigSchema as BrowserConfigSchema
+
+
+class NodeStateSchema(BaseModel):
+    mediaNode: Optional[NodeConfigSchema] = None
+    mediaPlayer: Optional[PlayerConfigSchema] = None
+    webBrowser: Optional[BrowserConfigSchema] = None
+    defaultPlaylist: Optional[str] = None
+    displays: Optional[list[DisplayConfig]] = None
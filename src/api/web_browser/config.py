@@ -1,6 +1,6 @@
+from src.config import state_store
 from src.constants import AppDir
 from src.core.syscmd import SysCmdExec
-from src.core.configmgr import ConfigManager
 from src.api.web_browser.schemas import ConfigSchema
 
 config_path = AppDir.CONFIGS.value/"web_browser.ini"
@@ -10,7 +10,8 @@ default_config = {
         webPage="about:blank"
     ).model_dump()
 }
-config_manager = ConfigManager(config_path, default_config)
+config_manager = state_store.settings("web_browser", config_path,
+                                      default_config)
 browser_config = ConfigSchema.model_validate(config_manager.load_section())
 
 if browser_config.autostart:
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Request, Response
 
 from src.core.syscmd import SysCmdExec
+from src.core.etag import make_etag, check_etag
 from src.api.web_browser.config import config_manager
 from src.api.web_browser.schemas import ConfigSchema
 
@@ -13,8 +14,13 @@ service_responses = {
 }
 
 
-@router.get("/config")
-def web_browser_config() -> ConfigSchema:
+@router.get("/config", responses={
+    304: {"description": "Config not modified"}
+})
+def web_browser_config(request: Request, response: Response) -> ConfigSchema:
+    etag = make_etag(config_manager.revision)
+    if not_modified := check_etag(request, response, etag):
+        return not_modified
     return ConfigSchema.model_validate(config_manager.load_section())
 
 
@@ -28,23 +34,23 @@ def set_web_browser_config(data: ConfigSchema) -> Response:
 
 @router.post("/start-service",
              status_code=204, responses={**service_responses})
-def start_web_browser() -> Response:
+async def start_web_browser() -> Response:
     args = ["systemctl", "--user", "start", "web-browser.service"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=204 if command.success else 500)
 
 
 @router.post("/stop-service",
              status_code=204, responses={**service_responses})
-def stop_web_browser() -> Response:
+async def stop_web_browser() -> Response:
     args = ["systemctl", "--user", "stop", "web-browser.service"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=204 if command.success else 500)
 
 
 @router.post("/restart-service",
              status_code=204, responses={**service_responses})
-def restart_web_browser() -> Response:
+async def restart_web_browser() -> Response:
     args = ["systemctl", "--user", "restart", "web-browser.service"]
-    command = SysCmdExec.run(args)
+    command = await SysCmdExec.aio_run(args)
     return Response(status_code=204 if command.success else 500)
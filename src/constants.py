@@ -4,8 +4,10 @@ from pathlib import Path
 
 class AppDir(Enum):
     BASE = Path(__file__).parent.parent/"resources"
+    BLOBS = BASE/"blobs"
     CONFIGS = BASE/"configs"
     MEDIA = BASE/"media"
     PLAYLISTS = BASE/"playlists"
     STATIC = BASE/"static"
     STATIC_PUBLIC = BASE/"static/public"
+    UPLOADS = BASE/"uploads"
@@ -0,0 +1,205 @@
+"""Content-Addressed Blob Store."""
+import os
+import re
+import time
+import fcntl
+import hashlib
+import logging
+import secrets
+import threading
+from pathlib import Path
+from contextlib import contextmanager, suppress
+from typing import Iterable, Iterator
+
+from src.core.etag import RACY_MTIME_NS
+
+logger = logging.getLogger(__name__)
+
+DIGEST_REGEX = re.compile(r"[0-9a-f]{64}")
+# shared by all links of a blob, its content must not change
+BLOB_MODE = 0o444
+
+
+class BlobStore:
+    """
+    Files stored once under their SHA-256 digest and published
+    under any number of names as hard links to the blob.
+
+    A blob is removed once no name links to it anymore. Where
+    hard links aren't supported, files are published as they are
+    and the store stays empty.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.linkable = True
+        self._lock = threading.Lock()
+        self._inodes: dict[int, str] = {}
+        self._scanned: tuple[int, int] | None = None
+
+    def path(self, digest: str) -> Path:
+        """Path of a blob.
+
+        Raises:
+            ValueError: the digest isn't a hex SHA-256 digest.
+        """
+        if not DIGEST_REGEX.fullmatch(digest):
+            raise ValueError("Invalid SHA-256 digest")
+        return self.directory/digest
+
+    def stat(self, digest: str) -> os.stat_result | None:
+        """Stat a blob, None if it isn't stored."""
+        try:
+            return self.path(digest).stat()
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # links are counted and changed by one process at a time
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.directory/".lock",
+                     os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _link(self, blob: Path, path: Path) -> None:
+        """Replace `path` by a link to `blob` atomically."""
+        with suppress(FileNotFoundError):
+            if path.samefile(blob):
+                return
+        temp_path = path.with_name(f".{path.name}.{secrets.token_hex(4)}")
+        os.link(blob, temp_path)
+        try:
+            os.replace(temp_path, path)
+        except OSError:
+            temp_path.unlink()
+            raise
+
+    def _disable(self, error: OSError) -> None:
+        if self.linkable:
+            logger.warning("Media files are not deduplicated, "
+                           "hard links are not supported: %s", error)
+        self.linkable = False
+
+    def publish(self, temp_path: Path, path: Path, digest: str) -> None:
+        """Move a complete file to `path`, the content
+        is stored only once if it is already in the store."""
+        os.chmod(temp_path, BLOB_MODE)
+        blob = self.path(digest)
+        with self._locked():
+            if self.linkable:
+                try:
+                    os.link(temp_path, blob)
+                except FileExistsError:
+                    self._link(blob, path)
+                    os.unlink(temp_path)
+                    return
+                except OSError as error:
+                    self._disable(error)
+            os.replace(temp_path, path)
+
+    def link(self, digest: str, path: Path) -> None:
+        """Publish a stored blob under `path`.
+
+        Raises:
+            FileNotFoundError: the blob isn't stored.
+        """
+        blob = self.path(digest)
+        with self._locked():
+            self._link(blob, path)
+
+    def adopt(self, path: Path, digest: str, stat: os.stat_result) -> bool:
+        """Store a file that was added without the store,
+        replaced by a link if its content is already stored.
+        The file is made read-only (`BLOB_MODE`) like every blob.
+
+        Args:
+            path (Path): the file.
+
+            digest (str): SHA-256 digest of the file.
+
+            stat (os.stat_result): the stat the digest was taken for.
+
+        Returns:
+            bool:
+                Whether the file is stored, False if it changed
+                meanwhile or hard links aren't supported.
+        """
+        blob = self.path(digest)
+        with self._locked():
+            current = path.stat()
+            if (current.st_ino, current.st_size, current.st_mtime_ns) \
+                    != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+                return False
+            os.chmod(path, BLOB_MODE)
+            try:
+                os.link(path, blob)
+            except FileExistsError:
+                self._link(blob, path)
+                return True
+            except OSError as error:
+                os.chmod(path, stat.st_mode & 0o7777)
+                self._disable(error)
+                return False
+            # written before it was read-only, e.g. through a file
+            # still open, the lock keeps the blob unused until checked
+            with open(blob, "rb") as file:
+                if hashlib.file_digest(file, "sha256").hexdigest() \
+                        != digest:
+                    blob.unlink()
+                    os.chmod(path, stat.st_mode & 0o7777)
+                    return False
+        return True
+
+    def release(self, digests: Iterable[str]) -> None:
+        """Remove the given blobs if no name links to them anymore."""
+        with self._locked():
+            for digest in set(digests):
+                with suppress(FileNotFoundError):
+                    blob = self.path(digest)
+                    if blob.stat().st_nlink <= 1:
+                        blob.unlink()
+
+    def collect(self) -> None:
+        """Remove all blobs no name links to."""
+        digests: list[str] = []
+        with suppress(FileNotFoundError), os.scandir(self.directory) as it:
+            digests = [item.name for item in it
+                       if DIGEST_REGEX.fullmatch(item.name)]
+        self.release(digests)
+
+    def digest_of(self, stat: os.stat_result) -> str | None:
+        """The digest of a file linked to a blob, None otherwise."""
+        if not self.linkable or stat.st_nlink < 2:
+            return None
+        with self._lock:
+            digest = self._inodes.get(stat.st_ino)
+            if digest is None:
+                self._scan()
+                digest = self._inodes.get(stat.st_ino)
+        if digest is None:
+            return None
+        # the inode may have been reused since the scan
+        blob = self.stat(digest)
+        if blob is None or blob.st_ino != stat.st_ino:
+            return None
+        return digest
+
+    def _scan(self) -> None:
+        try:
+            stat = self.directory.stat()
+        except FileNotFoundError:
+            return
+        # a blob added within the timestamp granularity
+        # can leave the mtime unchanged
+        if (stat.st_ino, stat.st_mtime_ns) == self._scanned \
+                and time.time_ns() - stat.st_mtime_ns >= RACY_MTIME_NS:
+            return
+        self._scanned = stat.st_ino, stat.st_mtime_ns
+        with os.scandir(self.directory) as it:
+            self._inodes = {item.inode(): item.name for item in it
+                            if DIGEST_REGEX.fullmatch(item.name)}
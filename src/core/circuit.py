@@ -0,0 +1,126 @@
+"""Circuit Breaker."""
+import time
+import asyncio
+import logging
+from enum import Enum
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+
+
+class CircuitOpenError(ConnectionError):
+    """The service is not contacted while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Track failures of a remote service and fail fast while it is down.
+
+    After `threshold` consecutive failures the circuit opens: 
+    callers should stop contacting the service, 
+    and `probe` is run in the background with exponential backoff 
+    until it succeeds and the circuit closes again.
+    """
+    # settings plus the state reported by the health endpoint
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, probe: Callable[[], Awaitable[bool]],
+                 threshold: int = 3, min_backoff: float = 0.5,
+                 max_backoff: float = 30.0) -> None:
+        """Initialize CircuitBreaker.
+
+        Args:
+            probe (Callable[[], Awaitable[bool]]): 
+                Coroutine function checking whether 
+                the service is available again.
+            threshold (int, optional): 
+                Consecutive failures before the circuit opens. 
+                Defaults to 3.
+            min_backoff (float, optional): 
+                First probe delay in seconds. Defaults to 0.5.
+            max_backoff (float, optional): 
+                Maximum probe delay in seconds. Defaults to 30.0.
+        """
+        self.probe = probe
+        self.threshold = threshold
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.last_error = ""
+        self.next_probe_at: float | None = None
+        self._probe_task: asyncio.Task | None = None
+
+    def allow(self) -> bool:
+        """Check whether the service may be contacted."""
+        return self.state == CircuitState.CLOSED
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """Call the service through the circuit. 
+        An `OSError` counts as a failure, any result as a success.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            OSError: If the call failed.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.last_error)
+        try:
+            result = await func(*args)
+        except OSError as error:
+            self.record_failure(error)
+            raise
+        self.record_success()
+        return result
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state == CircuitState.OPEN:
+            self._close()
+
+    def record_failure(self, error: Exception) -> None:
+        self.failures += 1
+        self.last_error = str(error)
+        if (self.state == CircuitState.CLOSED
+                and self.failures >= self.threshold):
+            self._open()
+
+    def _open(self) -> None:
+        logger.warning("Circuit opened after %s failures: %s",
+                       self.failures, self.last_error)
+        self.state = CircuitState.OPEN
+        self._probe_task = asyncio.create_task(self._probe_loop())
+
+    def _close(self) -> None:
+        logger.info("Circuit closed, service is available")
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.next_probe_at = None
+        if self._probe_task and self._probe_task is not asyncio.current_task():
+            self._probe_task.cancel()
+        self._probe_task = None
+
+    async def _probe_loop(self) -> None:
+        backoff = self.min_backoff
+        while self.state == CircuitState.OPEN:
+            self.next_probe_at = time.monotonic() + backoff
+            await asyncio.sleep(backoff)
+            with suppress(Exception):
+                if await self.probe():
+                    self._close()
+                    return
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def retry_in(self) -> float | None:
+        """Seconds until the next probe, if the circuit is open."""
+        if self.next_probe_at is None:
+            return None
+        return max(self.next_probe_at - time.monotonic(), 0.0)
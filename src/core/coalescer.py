@@ -0,0 +1,70 @@
+"""Latest-wins Command Coalescing."""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class Coalescer:
+    """
+    Coalesce rapid calls of idempotent setters.
+
+    Calls submitted for the same key within `window` seconds 
+    are merged: only the latest value is applied, 
+    and every caller receives the result of that single call.
+    """
+    # a single entry point, `submit`
+    # pylint: disable=too-few-public-methods
+
+    @dataclass
+    class Pending:
+        """Calls waiting for the window to close."""
+        value: Any
+        apply: Callable[[Any], Awaitable[Any]]
+        future: asyncio.Future
+        task: asyncio.Task | None = field(default=None)
+
+    def __init__(self, window: float = 0.15) -> None:
+        """Initialize Coalescer.
+
+        Args:
+            window (float, optional): 
+                Time in seconds to wait for newer values 
+                before applying. Defaults to 0.15.
+        """
+        self.window = window
+        self._pending: dict[Hashable, Coalescer.Pending] = {}
+
+    async def _flush(self, key: Hashable) -> None:
+        await asyncio.sleep(self.window)
+        pending = self._pending.pop(key)
+        try:
+            pending.future.set_result(await pending.apply(pending.value))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            pending.future.set_exception(error)
+
+    async def submit(self, key: Hashable, value: Any,
+                     apply: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Schedule `apply(value)` and wait for the applied result.
+
+        Args:
+            key (Hashable): Setter identifier, e.g. "volume".
+            value (Any): Value to set.
+            apply (Callable[[Any], Awaitable[Any]]): 
+                Coroutine function performing the actual call.
+
+        Returns:
+            Any: Result of `apply` called with the latest value.
+        """
+        if self.window <= 0:
+            return await apply(value)
+
+        pending = self._pending.get(key)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+            pending = Coalescer.Pending(value, apply, future)
+            pending.task = asyncio.create_task(self._flush(key))
+            self._pending[key] = pending
+        else:
+            pending.value, pending.apply = value, apply
+        # callers may go away, the latest value must still be applied
+        return await asyncio.shield(pending.future)
@@ -1,19 +1,46 @@
 """Configuration Manager."""
+import os
+import fcntl
+import atexit
+import logging
+import weakref
+import tempfile
+import threading
 import configparser
 from pathlib import Path
-from contextlib import suppress
-from typing import Any, TypeAlias
+from functools import partial
+from contextlib import suppress, contextmanager
+from typing import Any, Callable, Iterator, TypeAlias
 
 ConfigDict: TypeAlias = dict[str, dict[str, Any]]
 
+logger = logging.getLogger(__name__)
+
 
 class ConfigManager:
     """
     A class to manage configuration files 
     using the `configparser` module.
+
+    Parsed data is kept in memory and the file is only re-read 
+    when its mtime, inode or size changed, so external edits 
+    (e.g. by provisioning scripts) are still picked up.
+
+    Files are replaced atomically (temp file, fsync, rename). 
+    With a `write_delay`, saves are applied in memory at once 
+    and written to disk in one batch after the delay.
+
+    Read-modify-write cycles hold an `flock` on `<path>.lock`, 
+    so several processes can share a file. The lock file also 
+    stores a change counter, available as `version`.
     """
+    # parsed file, cache, pending writes and lock state
+    # pylint: disable=too-many-instance-attributes
+
+    _instances: "weakref.WeakSet[ConfigManager]" = weakref.WeakSet()
 
-    def __init__(self, path: Path, default_data: ConfigDict = None) -> None:
+    def __init__(self, path: Path, default_data: ConfigDict = None,
+                 write_delay: float = 0.0) -> None:
         """Initialize a new ConfigManager instance.
 
         Args:
@@ -23,12 +50,84 @@ class ConfigManager:
                 If provided and the file at `path` doesn't exist,
                 a new config file will be created with this data.
                 Defaults to None.
+
+            write_delay (float, optional):
+                Seconds to hold saved changes in memory before 
+                writing them to disk, 0 writes on every save. 
+                Defaults to 0.0.
         """
         self.path = path
-        self.config = configparser.ConfigParser()
-        self.config.optionxform = lambda option: option
-        if not path.exists() and default_data:
-            self.save(default_data)
+        self.lock_path = path.with_name(f"{path.name}.lock")
+        self.write_delay = write_delay
+        self.version = 0
+        self.config = self._new_parser()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stamp: tuple[int, int, int] | None = None
+        self._cache: dict[tuple[str | None, bool], Any] = {}
+        self._pending: list[Callable[[], None]] = []
+        self._timer: threading.Timer | None = None
+        self._lock_fd: int | None = None
+        ConfigManager._instances.add(self)
+        if default_data:
+            with self._lock, self._file_lock(exclusive=True):
+                if not path.exists():
+                    self.save(default_data)
+                    self.flush()
+
+    @staticmethod
+    def _new_parser() -> configparser.ConfigParser:
+        config = configparser.ConfigParser()
+        config.optionxform = lambda option: option
+        return config
+
+    def _file_stamp(self) -> tuple[int, int, int] | None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[int]:
+        """Hold an flock on the lock file, yields its descriptor."""
+        if self._lock_fd is not None:
+            # already held by this manager (under `self._lock`)
+            yield self._lock_fd
+            return
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_fd = fd
+            yield fd
+        finally:
+            self._lock_fd = None
+            os.close(fd)
+
+    @staticmethod
+    def _read_counter(fd: int) -> int:
+        with suppress(ValueError):
+            return int(os.pread(fd, 32, 0))
+        return 0
+
+    def _read_config(self) -> None:
+        """Re-read the file if it changed since the last read or write."""
+        stamp = self._file_stamp()
+        if self._loaded and stamp == self._stamp:
+            return
+        # a shared lock keeps the file and the counter consistent
+        with self._file_lock(exclusive=False) as lock_fd:
+            stamp = self._file_stamp()
+            config = self._new_parser()
+            config.read(self.path)
+            self.version = self._read_counter(lock_fd)
+        self.config = config
+        self._stamp = stamp
+        self._loaded = True
+        self._cache.clear()
+        # changes not written yet are applied on top of the file
+        for operation in self._pending:
+            operation()
 
     def _convert_value(self, value: str) -> int | float | bool | str:
         """
@@ -62,8 +161,86 @@ class ConfigManager:
         return result
 
     def _write_config(self) -> None:
-        with open(self.path, "w", encoding="utf-8") as file:
-            self.config.write(file)
+        """Atomically replace the file with the in-memory config. 
+        Must be called with the exclusive file lock held."""
+        directory = self.path.parent
+        fd, temp_path = tempfile.mkstemp(prefix=f".{self.path.name}.",
+                                         suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                self.config.write(file)
+                file.flush()
+                os.fsync(file.fileno())
+            with suppress(FileNotFoundError):
+                os.chmod(temp_path, self.path.stat().st_mode)
+            os.replace(temp_path, self.path)
+        except OSError:
+            with suppress(OSError):
+                os.unlink(temp_path)
+            # make the next read resync with the file
+            self._loaded = False
+            raise
+        # persist the rename itself
+        with suppress(OSError):
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        self._stamp = self._file_stamp()
+        self._loaded = True
+        self._pending.clear()
+        self.version = self._read_counter(self._lock_fd) + 1
+        os.ftruncate(self._lock_fd, 0)
+        os.pwrite(self._lock_fd, str(self.version).encode(), 0)
+
+    def _apply(self, operation: Callable[[], None]) -> None:
+        """Apply a change in memory and write it now or after the delay."""
+        operation()
+        self._cache.clear()
+        self._pending.append(operation)
+        if self.write_delay > 0:
+            if self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return
+        try:
+            self._write_config()
+        except OSError:
+            # the change is rejected, forget it
+            self._pending.clear()
+            raise
+
+    def flush(self) -> None:
+        """Write pending changes to disk.
+
+        If the file was changed by someone else in the meantime, 
+        it is re-read and the pending changes are applied on top.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            try:
+                with self._file_lock(exclusive=True):
+                    self._read_config()
+                    self._write_config()
+            except OSError:
+                logger.exception("Failed to write %s", self.path)
+
+    def changed_on_disk(self) -> bool:
+        """Whether the file changed since this manager read or wrote it."""
+        with self._lock:
+            return not self._loaded or self._file_stamp() != self._stamp
+
+    @classmethod
+    def flush_all(cls) -> None:
+        """Write pending changes of every ConfigManager to disk."""
+        for manager in list(cls._instances):
+            manager.flush()
 
     def _section_exists(self, section_name: str) -> bool:
         return (section_name in self.config.sections()
@@ -85,7 +262,16 @@ class ConfigManager:
             dict[str, Any]: 
                 A dictionary containing the section's values.
         """
-        self.config.read(self.path)
+        with self._lock:
+            self._read_config()
+            key = (section, convert_values)
+            if key not in self._cache:
+                self._cache[key] = self._load_section(section,
+                                                      convert_values)
+            return dict(self._cache[key])
+
+    def _load_section(self, section: str,
+                      convert_values: bool) -> dict[str, Any]:
         if not self._section_exists(section):
             return {}
 
@@ -100,7 +286,7 @@ class ConfigManager:
                 k: self._convert_value(v)
                 for k, v in result.items()
             }
-        return result
+        return dict(result)
 
     def load(self, convert_values: bool = False) -> ConfigDict:
         """Load the entire configuration file.
@@ -113,7 +299,15 @@ class ConfigManager:
             ConfigDict: 
                 A dictionary containing all sections and their values.
         """
-        self.config.read(self.path)
+        with self._lock:
+            self._read_config()
+            key = (None, convert_values)
+            if key not in self._cache:
+                self._cache[key] = self._load(convert_values)
+            return {name: dict(values)
+                    for name, values in self._cache[key].items()}
+
+    def _load(self, convert_values: bool) -> ConfigDict:
         result: ConfigDict = {}
 
         for section in self.config.items():
@@ -147,20 +341,23 @@ class ConfigManager:
                 Whether to overwrite an existing section. 
                 Defaults to False.
         """
-        self.config.read(self.path)
+        with self._lock, self._file_lock(exclusive=True):
+            self._read_config()
+            self._apply(partial(self._save_section, dict(data),
+                                section, overwrite))
+
+    def _save_section(self, data: dict, section: str,
+                      overwrite: bool) -> None:
         if not self._section_exists(section):
             self.config.add_section(section)
 
         if overwrite:
             self.config[section] = data
+        elif section == self.config.default_section:
+            self.config[section] = dict(self.config[section]) | data
         else:
-            if section == self.config.default_section:
-                self.config[section] = dict(self.config[section]) | data
-            else:
-                self.config[section] = self._filter_default_dict(
-                    self.config.defaults(), data)
-
-        self._write_config()
+            self.config[section] = self._filter_default_dict(
+                self.config.defaults(), data)
 
     def save(self, data: ConfigDict, overwrite_sections: bool = False,
              overwrite_config: bool = False) -> None:
@@ -180,13 +377,22 @@ class ConfigManager:
                 Whether to overwrite the entire configuration file.
                 Defaults to False.
         """
+        data = {section: dict(values) for section, values in data.items()}
+        with self._lock, self._file_lock(exclusive=True):
+            if not overwrite_config:
+                self._read_config()
+            self._apply(partial(self._save, data, overwrite_sections,
+                                overwrite_config))
+
+    def _save(self, data: ConfigDict, overwrite_sections: bool,
+              overwrite_config: bool) -> None:
         if overwrite_config:
+            # sections missing from `data` are dropped
+            self.config = self._new_parser()
             for section, values in data.items():
                 self.config[section] = values
-            self._write_config()
             return
 
-        self.config.read(self.path)
         for section, values in data.items():
             if not self._section_exists(section):
                 self.config.add_section(section)
@@ -202,4 +408,6 @@ class ConfigManager:
                     self.config.defaults(), self.config[section])
                 self.config[section] = tmp_dict | values
 
-        self._write_config()
+
+# runs on a normal exit of the app, each worker and the scripts
+atexit.register(ConfigManager.flush_all)
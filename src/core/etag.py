@@ -0,0 +1,82 @@
+"""HTTP Entity Tags."""
+import os
+import time
+from pathlib import Path
+from fastapi import Request, Response
+
+# changes within the timestamp granularity of the file system
+# (2 seconds on FAT) can leave the mtime unchanged
+RACY_MTIME_NS = 2 * 10 ** 9
+
+
+def make_etag(*parts: object) -> str:
+    """Make an entity tag from the parts of a resource version."""
+    return f'"{"-".join(str(part) for part in parts)}"'
+
+
+def dir_etag(dir_path: Path) -> str | None:
+    """Entity tag of a directory listing from the inode and mtime.
+
+    Returns None if the directory doesn't exist, or was changed
+    too recently to tell a following change apart.
+    """
+    try:
+        stat = dir_path.stat()
+    except FileNotFoundError:
+        return None
+    if time.time_ns() - stat.st_mtime_ns < RACY_MTIME_NS:
+        return None
+    return make_etag(f"{stat.st_ino:x}", f"{stat.st_mtime_ns:x}")
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Entity tag of a file from the inode, size and mtime.
+
+    The tag is weak if the file was changed too recently
+    to tell a following change apart.
+    """
+    etag = make_etag(f"{stat.st_ino:x}", f"{stat.st_size:x}",
+                     f"{stat.st_mtime_ns:x}")
+    if time.time_ns() - stat.st_mtime_ns < RACY_MTIME_NS:
+        return f"W/{etag}"
+    return etag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the `If-None-Match` header of the request matches."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag
+               for tag in header.split(","))
+
+
+def check_etag(request: Request, response: Response,
+               etag: str | None) -> Response | None:
+    """Handle a conditional GET of a resource.
+
+    Args:
+        request (Request): The request.
+
+        response (Response):
+            The response of the endpoint, gets the ETag header.
+
+        etag (str | None):
+            The current entity tag, None if it is unknown.
+
+    Returns:
+        Response | None:
+            A 304 response to return instead if the client
+            already has this version, None otherwise.
+    """
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,228 @@
+"""Ranged File Responses."""
+import os
+import asyncio
+import secrets
+import mimetypes
+from pathlib import Path
+from functools import partial
+from email.utils import formatdate, parsedate_to_datetime
+
+import anyio
+from starlette.types import Receive, Scope, Send
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from src.core.etag import file_etag, etag_matches
+
+# more ranges are served as the whole file
+MAX_RANGES = 16
+ZEROCOPY_SEND = "http.response.zerocopysend"
+
+
+def parse_range(header: str, size: int) -> list[tuple[int, int]] | None:
+    """Parse a `Range` header.
+
+    Args:
+        header (str): the header value, e.g. "bytes=0-99,-100".
+        size (int): the file size.
+
+    Returns:
+        list[tuple[int, int]] | None:
+            the sorted and merged (start, end) ranges, `end`
+            excluded, an empty list if none is satisfiable,
+            or None if the header is invalid and has to be ignored.
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or specs.count(",") >= MAX_RANGES:
+        return None
+    ranges = []
+    for spec in specs.split(","):
+        first, dash, last = (part.strip() for part in spec.partition("-"))
+        if not dash or not (first or last) or any(
+                part and not part.isdecimal() for part in (first, last)):
+            return None
+        if not first:
+            # suffix range, the last bytes
+            start, end = max(size - int(last), 0), size
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = int(last) + 1 if last else size
+        end = min(end, size)
+        if start < end:
+            ranges.append((start, end))
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = merged[-1][0], max(merged[-1][1], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def modified_since(request: Request, mtime: float) -> bool:
+    """Whether the `If-Modified-Since` header is missing,
+    invalid or older than `mtime`."""
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return True
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return True
+    return int(mtime) > since
+
+
+class RangeFileResponse(Response):
+    """
+    A file response that handles conditional requests
+    (`If-None-Match`, `If-Modified-Since`) and byte ranges
+    (`Range`, `If-Range`), with a multipart body for several ranges.
+
+    The file is checked when the response is sent. The body is
+    sent with `os.sendfile` if the server supports the ASGI
+    zero-copy send extension, and read in chunks otherwise.
+    """
+
+    chunk_size = 1024 ** 2
+
+    def __init__(self, path: Path, media_type: str | None = None,
+                 headers: dict[str, str] | None = None) -> None:
+        self.path = path
+        self.file_type = (media_type or mimetypes.guess_type(path)[0]
+                          or "application/octet-stream")
+        super().__init__(headers=headers)
+        # length and type depend on the request,
+        # the empty body of `Response` has no length
+        del self.headers["Content-Length"]
+
+    def _select(self, request: Request, stat: os.stat_result,
+                etag: str,
+                last_modified: str) -> list[tuple[int, int]] | None:
+        """Check the conditions of the request, set the status code
+        and return the ranges to send (None for the whole file)."""
+        if "if-none-match" in request.headers:
+            fresh = etag_matches(request, etag)
+        else:
+            fresh = not modified_since(request, stat.st_mtime)
+        if fresh:
+            self.status_code = 304
+            return []
+        header = request.headers.get("range")
+        if not header or request.method != "GET":
+            return None
+        if_range = request.headers.get("if-range")
+        # If-Range uses the strong comparison
+        if if_range and if_range != etag and (
+                if_range != last_modified or etag.startswith("W/")):
+            return None
+        ranges = parse_range(header, stat.st_size)
+        if ranges is None:
+            return None
+        if not ranges:
+            self.status_code = 416
+            self.headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return []
+        self.status_code = 206
+        return ranges
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        try:
+            # the descriptor pins the version that is checked and sent
+            file = await asyncio.to_thread(open, self.path, "rb", 0)
+        except (FileNotFoundError, IsADirectoryError):
+            response = JSONResponse({"detail": "File not found"}, 404)
+            await response(scope, receive, send)
+            return
+        try:
+            stat = os.fstat(file.fileno())
+            etag = file_etag(stat)
+            last_modified = formatdate(stat.st_mtime, usegmt=True)
+            self.headers.update({"ETag": etag,
+                                 "Last-Modified": last_modified,
+                                 "Accept-Ranges": "bytes"})
+            request = Request(scope)
+            ranges = self._select(request, stat, etag, last_modified)
+            segments = self._segments(stat.st_size, ranges)
+            if request.method == "HEAD":
+                segments = []
+            await send({"type": "http.response.start",
+                        "status": self.status_code,
+                        "headers": self.raw_headers})
+            async with anyio.create_task_group() as task_group:
+                async def cancel_after(func) -> None:
+                    await func()
+                    task_group.cancel_scope.cancel()
+
+                # stop reading the file once the client is gone
+                task_group.start_soon(cancel_after, partial(
+                    self._send_segments, scope, send, file, segments))
+                await cancel_after(partial(self._wait_disconnect, receive))
+        finally:
+            file.close()
+
+    def _segments(self, size: int, ranges: list[tuple[int, int]] | None
+                  ) -> list[tuple[bytes, int, int]]:
+        """Split the body into (prefix, start, end) segments
+        and set the length and type headers."""
+        if ranges is None:
+            ranges = [(0, size)]
+        if len(ranges) <= 1:
+            segments = [(b"", start, end) for start, end in ranges]
+            if self.status_code == 206:
+                start, end = ranges[0]
+                self.headers["Content-Range"] = (
+                    f"bytes {start}-{end - 1}/{size}")
+            if self.status_code != 304:
+                self.headers["Content-Length"] = str(
+                    sum(end - start for start, end in ranges))
+            if self.status_code in (200, 206):
+                self.headers["Content-Type"] = self.file_type
+            return segments
+
+        boundary = secrets.token_hex(16)
+        segments = [(f"\r\n--{boundary}\r\n"
+                     f"Content-Type: {self.file_type}\r\n"
+                     f"Content-Range: bytes {start}-{end - 1}/{size}\r\n"
+                     f"\r\n".encode("latin-1"), start, end)
+                    for start, end in ranges]
+        segments.append((f"\r\n--{boundary}--\r\n".encode("latin-1"), 0, 0))
+        self.headers["Content-Length"] = str(
+            sum(len(prefix) + end - start for prefix, start, end in segments))
+        self.headers["Content-Type"] = (
+            f"multipart/byteranges; boundary={boundary}")
+        return segments
+
+    async def _send_segments(self, scope: Scope, send: Send, file,
+                             segments: list[tuple[bytes, int, int]]) -> None:
+        zero_copy = ZEROCOPY_SEND in scope.get("extensions", {})
+        for prefix, start, end in segments:
+            if prefix:
+                await send({"type": "http.response.body",
+                            "body": prefix, "more_body": True})
+            if zero_copy and end > start:
+                await send({"type": ZEROCOPY_SEND, "file": file,
+                            "offset": start, "count": end - start,
+                            "more_body": True})
+                continue
+            while start < end:
+                # not cancellable, the file is only closed
+                # once a read in progress has returned
+                chunk = await anyio.to_thread.run_sync(
+                    os.pread, file.fileno(),
+                    min(self.chunk_size, end - start), start)
+                if not chunk:
+                    # truncated while sending
+                    raise OSError(f"Unexpected end of {self.path}")
+                await send({"type": "http.response.body",
+                            "body": chunk, "more_body": True})
+                start += len(chunk)
+        await send({"type": "http.response.body",
+                    "body": b"", "more_body": False})
+
+    @staticmethod
+    async def _wait_disconnect(receive: Receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
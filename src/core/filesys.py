@@ -1,9 +1,18 @@
 """File and Directory Management Utilities."""
+import os
 import re
+import asyncio
+import hashlib
+import tempfile
 from pathlib import Path
 from dataclasses import dataclass
-import aiofiles
-from fastapi import UploadFile
+from contextlib import suppress
+from typing import Callable
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from multipart.multipart import (MultipartParser, MultipartParseError,
+                                 parse_options_header)
 
 
 @dataclass
@@ -12,6 +21,15 @@ class CheckedDir:
     missing: list[str]
 
 
+@dataclass
+class StreamedFile:
+    filename: str
+    content_type: str
+    path: Path | None = None
+    size: int = 0
+    sha256: str | None = None
+
+
 def secure_filename(filename: str, max_length: int = 255) -> str:
     """Replace invalid character(s) for a filename.
 
@@ -39,33 +57,6 @@ def secure_filename(filename: str, max_length: int = 255) -> str:
     return sanitized_filename
 
 
-def get_dir_size(dir_path: Path, units: int = 0) -> float:
-    """Return directory size (in bytes by default).
-
-    Args:
-        dir_path (str | Path): path to the directory.
-        units (int, optional): 
-            0 - Byte, 1 - KiB, 2 - MiB, 
-            3 - GiB, 4 - TiB. Defaults to 0.
-
-    Returns:
-        int | float: total size of the directory.
-    """
-    total_size = 0
-
-    if not dir_path.exists():
-        return total_size
-
-    # scan given directory and all subdirectories, recursively
-    for item in dir_path.glob("**/*"):
-        if item.is_file():
-            total_size += item.stat().st_size
-
-    if 0 < units < 5:
-        total_size = total_size / 1024 ** units
-    return total_size
-
-
 def get_dir_files(dir_path: Path, recursive: bool = False,
                   extensions: list = None, suffix: bool = True) -> list[str]:
     """Return a list of filenames for given directory.
@@ -96,11 +87,38 @@ def get_dir_files(dir_path: Path, recursive: bool = False,
     return [file.stem for file in files]
 
 
-def del_files_from_dir(files: list[str], dir_path: Path) -> None:
-    for file in files:
-        for item in dir_path.iterdir():
-            if item.is_file() and item.exists() and item.name == file:
-                item.unlink()
+def del_files_from_dir(files: list[str], dir_path: Path) -> CheckedDir:
+    """Delete files from a directory.
+
+    Every distinct name is unlinked directly, without scanning 
+    the directory or checking existence first. Names that aren't 
+    plain filenames (e.g. "../x") or aren't files count as missing.
+
+    Args:
+        files (list[str]): filenames to delete.
+        dir_path (Path): the directory.
+
+    Returns:
+        CheckedDir: deleted files as available, the rest as missing.
+    """
+    result = CheckedDir(available=[], missing=[])
+    for file in dict.fromkeys(files):
+        if file in ("", ".", "..") or os.sep in file:
+            result.missing.append(file)
+            continue
+        try:
+            os.unlink(dir_path/file)
+        except (FileNotFoundError, IsADirectoryError, PermissionError):
+            result.missing.append(file)
+        else:
+            result.available.append(file)
+    return result
+
+
+async def aio_del_files_from_dir(files: list[str],
+                                 dir_path: Path) -> CheckedDir:
+    """`del_files_from_dir` in the thread pool of the server."""
+    return await run_in_threadpool(del_files_from_dir, files, dir_path)
 
 
 def check_dir_files(files: list[str], dir_path: Path) -> CheckedDir:
@@ -113,21 +131,261 @@ def check_dir_files(files: list[str], dir_path: Path) -> CheckedDir:
     return result
 
 
-async def aio_save_files_to_dir(files: list[UploadFile], dir_path: Path,
-                                chunk_size: int = 25 * 1024 ** 2) -> None:
-    """Async file saving.
+def _write_all(fd: int, data: memoryview) -> None:
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def publish_file(temp_path: Path, path: Path, _: str) -> None:
+    """Move a complete temp file to its final path."""
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+class MultipartFileWriter:
+    """
+    Parses a `multipart/form-data` body chunk by chunk 
+    and writes the file parts straight to a directory.
+
+    The data of accepted parts is copied into one fixed-size 
+    buffer, which is written to the part's temp file whenever 
+    it fills up, and hashed with SHA-256 on the way. A part is 
+    published under its final name once it is complete, 
+    a partial upload never has a final name.
+    """
+    # parser callbacks share the state of the current part
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, boundary: bytes, dir_path: Path,
+                 accept: Callable[[str, str], str | None],
+                 buffer_size: int = 1024 ** 2,
+                 publish: Callable[[Path, Path, str], None] = publish_file
+                 ) -> None:
+        """Initialize a new MultipartFileWriter instance.
+
+        Args:
+            boundary (bytes): the multipart boundary.
+
+            dir_path (Path): destination directory.
+
+            accept (Callable[[str, str], str | None]): 
+                called with the filename and content type 
+                of every file part, returns the name to save 
+                the file as or None to skip it.
+
+            buffer_size (int, optional): 
+                write buffer size. Defaults to 1 megabyte.
+
+            publish (Callable[[Path, Path, str], None], optional): 
+                called with the temp path, the final path and the 
+                SHA-256 digest of a complete file to move it into 
+                place. Defaults to `publish_file`.
+        """
+        self.dir_path = dir_path
+        self.accept = accept
+        self.buffer_size = buffer_size
+        self.publish = publish
+        self.files: list[StreamedFile] = []
+        self.complete = False
+        # held back boundary bytes can be released on top of a write
+        self._buffer = bytearray(buffer_size + len(boundary) + 16)
+        self._view = memoryview(self._buffer)
+        self._fill = 0
+        self._written = 0
+        self._receiving = False
+        self._events: list[tuple[int, StreamedFile | None, str | None]] = []
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._headers: dict[bytes, bytes] = {}
+        self._file: StreamedFile | None = None
+        self._name: str | None = None
+        self._fd: int | None = None
+        self._temp_path: str | None = None
+        self._hash = hashlib.sha256()
+        self.parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_end": self._on_end,
+        })
+
+    # parser callbacks, part boundaries are queued as events
+    # and handled (with the file I/O) after every parser write
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[bytes(self._header_field).lower()] = bytes(
+            self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(
+            self._headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            # not a file
+            return
+        file = StreamedFile(
+            filename=options[b"filename"].decode("utf-8", "replace"),
+            content_type=self._headers.get(b"content-type",
+                                           b"").decode("latin-1"))
+        self.files.append(file)
+        if name := self.accept(file.filename, file.content_type):
+            self._receiving = True
+            self._events.append((self._fill, file, name))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._receiving:
+            size = end - start
+            self._view[self._fill:self._fill+size] = (
+                memoryview(data)[start:end])
+            self._fill += size
+
+    def _on_part_end(self) -> None:
+        if self._receiving:
+            self._receiving = False
+            self._events.append((self._fill, None, None))
+
+    def _on_end(self) -> None:
+        self.complete = True
+
+    async def write(self, chunk: bytes) -> None:
+        """Parse the next chunk of the body and write its file data."""
+        view = memoryview(chunk)
+        while view:
+            if self._fill >= self.buffer_size:
+                await self._write_out(self._fill)
+                self._fill = self._written = 0
+            size = self.buffer_size - self._fill
+            self.parser.write(view[:size])
+            view = view[size:]
+            events, self._events = self._events, []
+            for offset, file, name in events:
+                if file:
+                    self._written = offset
+                    await self._open(file, name)
+                else:
+                    await self._write_out(offset)
+                    await self._commit()
+
+    async def _open(self, file: StreamedFile, name: str) -> None:
+        self._file, self._name = file, name
+        self._hash = hashlib.sha256()
+        self._fd, self._temp_path = await asyncio.to_thread(
+            tempfile.mkstemp, prefix=f".{name}.", suffix=".part",
+            dir=self.dir_path)
+
+    async def _write_out(self, end: int) -> None:
+        if self._fd is not None and end > self._written:
+            await asyncio.to_thread(self._write_hashed,
+                                    self._view[self._written:end])
+            self._file.size += end - self._written
+        self._written = end
+
+    def _write_hashed(self, data: memoryview) -> None:
+        # hashlib releases the GIL, like the write
+        self._hash.update(data)
+        _write_all(self._fd, data)
+
+    def _finish(self, fd: int, temp_path: str, path: Path,
+                digest: str) -> None:
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.publish(Path(temp_path), path, digest)
+
+    async def _commit(self) -> None:
+        fd, self._fd = self._fd, None
+        path = self.dir_path/self._name
+        digest = self._hash.hexdigest()
+        await asyncio.to_thread(self._finish, fd, self._temp_path, path,
+                                digest)
+        self._file.path = path
+        self._file.sha256 = digest
+        self._temp_path = None
+
+    def abort(self) -> None:
+        """Remove the temp file of an unfinished part."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._temp_path is not None:
+            with suppress(FileNotFoundError):
+                os.unlink(self._temp_path)
+            self._temp_path = None
+
+
+async def aio_stream_files_to_dir(
+        request: Request, dir_path: Path,
+        accept: Callable[[str, str], str | None] | None = None,
+        buffer_size: int = 1024 ** 2,
+        publish: Callable[[Path, Path, str], None] = publish_file
+        ) -> list[StreamedFile]:
+    """Save the files of a `multipart/form-data` request 
+    while it is received, without spooling them first.
 
     Args:
-        files (list[UploadFile]): list of files.
+        request (Request): the request.
 
         dir_path (Path): destination directory.
 
-        chunk_size (int, optional): 
-            chunk size. Defaults to 25 megabytes.
+        accept (Callable[[str, str], str | None], optional): 
+            called with the filename and content type of every file, 
+            returns the name to save it as or None to skip it. 
+            Defaults to saving every file under its secure filename.
+
+        buffer_size (int, optional): 
+            write buffer size. Defaults to 1 megabyte.
+
+        publish (Callable[[Path, Path, str], None], optional): 
+            moves a complete file into place, 
+            see `MultipartFileWriter`. Defaults to `publish_file`.
+
+    Raises:
+        ValueError: 
+            the body isn't valid `multipart/form-data` 
+            or the client disconnected before sending all of it.
+
+    Returns:
+        list[StreamedFile]: 
+            all files of the request, `path` is None for skipped files.
     """
+    content_type, options = parse_options_header(
+        request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise ValueError("Expected a multipart/form-data body")
+
+    if accept is None:
+        def accept(filename: str, _: str) -> str | None:
+            return secure_filename(filename) or None
+
     dir_path.mkdir(parents=True, exist_ok=True)
-    for file in files:
-        path = Path(dir_path, secure_filename(file.filename))
-        async with aiofiles.open(path, "wb") as f:
-            while chunk := await file.read(chunk_size):
-                await f.write(chunk)
+    writer = MultipartFileWriter(boundary, dir_path, accept, buffer_size,
+                                 publish)
+    try:
+        async for chunk in request.stream():
+            await writer.write(chunk)
+        writer.parser.finalize()
+    except MultipartParseError as error:
+        raise ValueError(f"Invalid multipart body: {error}") from error
+    except ClientDisconnect as error:
+        raise ValueError("Incomplete multipart body") from error
+    finally:
+        writer.abort()
+    if not writer.complete:
+        raise ValueError("Incomplete multipart body")
+    return writer.files
@@ -0,0 +1,367 @@
+"""Media File Index."""
+import os
+import fcntl
+import asyncio
+import hashlib
+import logging
+import time
+import mimetypes
+import threading
+from stat import S_ISREG
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from contextlib import suppress
+
+from src.core.statestore import StateStore
+from src.core.blobstore import BlobStore
+from src.core.inotify import (Inotify, IN_ATTRIB, IN_CLOSE_WRITE,
+                              IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE,
+                              IN_DELETE, IN_DELETE_SELF, IN_MOVE_SELF,
+                              IN_Q_OVERFLOW, IN_IGNORED, IN_ONLYDIR)
+
+logger = logging.getLogger(__name__)
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR)
+RESYNC_MASK = IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF
+# a file is complete once closed after writing or moved in
+WRITTEN_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+# without such an event, once it is unchanged for this long
+SETTLE_NS = 30 * 10 ** 9
+
+
+@dataclass
+class MediaEntry:
+    name: str
+    size: int
+    mtime_ns: int
+    mime_type: str | None
+    sha256: str | None = None
+
+    def digest(self) -> int:
+        """A stable 64-bit hash of the entry."""
+        data = (f"{self.name}\0{self.size}\0{self.mtime_ns}"
+                f"\0{self.sha256}").encode()
+        return int.from_bytes(
+            hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+class MediaIndex:
+    """
+    Name, size, mtime and MIME type of the files in a directory,
+    kept in memory and persisted in the state store.
+
+    The index is updated by `update` after the API changed files,
+    by an inotify watch for all other changes (or by polling the
+    directory mtime where inotify isn't available) and reconciled
+    with the directory on start. Hidden files, like uploads in
+    progress, aren't indexed.
+
+    Totals are kept up to date with every change. `revision` is
+    derived from the indexed entries, so processes indexing
+    the same directory report the same revision.
+
+    With a blob store, the SHA-256 digest of a file is taken from
+    the blob it links to. Files added without the store are hashed
+    in the background once they are completely written and moved
+    into it, blobs are released when the last file linking to them
+    is removed. Such a file becomes a read-only link to its blob,
+    it can be replaced (e.g. renamed over) but not changed in place.
+    """
+    # entries, totals, and the watch and hashing state
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, store: StateStore, directory: Path,
+                 blobs: BlobStore | None = None,
+                 debounce: float = 0.1, poll_interval: float = 5.0) -> None:
+        self.store = store
+        self.directory = directory
+        self.blobs = blobs
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.total_size = 0
+        self._digest = 0
+        self._entries: dict[str, MediaEntry] = {}
+        self._lock = threading.Lock()
+        self._inotify: Inotify | None = None
+        self._changed: dict[str, int] = {}
+        self._writing: set[str] = set()
+        self._written: set[str] = set()
+        self._resync = False
+        self._sync_task: asyncio.Task | None = None
+        self._poll_task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._unhashed: set[str] = set()
+        self._hash_task: asyncio.Task | None = None
+        for row in store.media_files():
+            self._set(row["name"], MediaEntry(**row))
+
+    def _set(self, name: str, entry: MediaEntry | None) -> None:
+        old = self._entries.pop(name, None)
+        if old:
+            self.total_size -= old.size
+            self._digest ^= old.digest()
+        if entry:
+            self._entries[name] = entry
+            self.total_size += entry.size
+            self._digest ^= entry.digest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def revision(self) -> str:
+        """Changes whenever a file is added, removed or modified."""
+        with self._lock:
+            return f"{len(self._entries):x}-{self._digest:016x}"
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def entries(self) -> list[MediaEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def get(self, name: str) -> MediaEntry | None:
+        with self._lock:
+            return self._entries.get(name)
+
+    def _stat(self, name: str) -> MediaEntry | None:
+        if name.startswith(".") or "/" in name:
+            return None
+        try:
+            stat = (self.directory/name).stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+        return MediaEntry(name=name, size=stat.st_size,
+                          mtime_ns=stat.st_mtime_ns,
+                          mime_type=mimetypes.guess_type(name)[0],
+                          sha256=(self.blobs.digest_of(stat)
+                                  if self.blobs else None))
+
+    def find(self, sha256: str) -> list[MediaEntry]:
+        """The entries of the files with the given digest."""
+        with self._lock:
+            return [entry for entry in self._entries.values()
+                    if entry.sha256 == sha256]
+
+    def update(self, *names: str) -> None:
+        """Re-read the files with the given names (missing files
+        are removed) and persist the changed entries."""
+        with self._lock:
+            saved, deleted, released, unhashed = [], [], [], []
+            for name in set(names):
+                entry = self._stat(name)
+                old = self._entries.get(name)
+                if entry == old:
+                    continue
+                self._set(name, entry)
+                if entry:
+                    saved.append(asdict(entry))
+                else:
+                    deleted.append(name)
+                if old and old.sha256 and old.sha256 != (
+                        entry and entry.sha256):
+                    released.append(old.sha256)
+                if entry and not entry.sha256:
+                    unhashed.append(name)
+            if not saved and not deleted:
+                return
+            with self.store.transaction() as transaction:
+                transaction.save_media_files(saved)
+                transaction.delete_media_files(deleted)
+        if self.blobs and released:
+            self.blobs.release(released)
+        if self.blobs and self.blobs.linkable and unhashed and self._loop:
+            self._loop.call_soon_threadsafe(self._queue_hashing, unhashed)
+
+    def reconcile(self) -> None:
+        """Scan the directory once and update the entries that differ."""
+        scanned: dict[str, tuple[int, int]] = {}
+        with suppress(FileNotFoundError), os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.startswith("."):
+                    continue
+                with suppress(OSError):
+                    if item.is_file():
+                        stat = item.stat()
+                        scanned[item.name] = stat.st_size, stat.st_mtime_ns
+        with self._lock:
+            indexed = {name: (entry.size, entry.mtime_ns)
+                       for name, entry in self._entries.items()}
+        # the differing files are stat-ed again under the lock,
+        # changes made while scanning aren't undone
+        self.update(*(name for name in scanned.keys() | indexed.keys()
+                      if scanned.get(name) != indexed.get(name)))
+
+    def _queue_hashing(self, names: list[str]) -> None:
+        self._unhashed.update(names)
+        if self._hash_task is None or self._hash_task.done():
+            self._hash_task = asyncio.create_task(self._hash_files())
+
+    async def _hash_files(self) -> None:
+        unsettled: set[str] = set()
+        while (self._unhashed or unsettled) and self.blobs.linkable:
+            if not self._unhashed:
+                # files that may still be written are tried again
+                await asyncio.sleep(SETTLE_NS / 10 ** 9)
+                self._unhashed |= unsettled
+                unsettled = set()
+                continue
+            name = self._unhashed.pop()
+            if name in self._writing:
+                # queued again once it is closed
+                continue
+            try:
+                if not await asyncio.to_thread(self._adopt, name):
+                    unsettled.add(name)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to hash %s", name)
+            self._written.discard(name)
+
+    def _settled(self, name: str, stat: os.stat_result) -> bool:
+        """Whether a file is completely written."""
+        if name in self._written:
+            return True
+        return time.time_ns() - stat.st_mtime_ns >= SETTLE_NS
+
+    def _adopt(self, name: str) -> bool:
+        """Hash a file and move it into the blob store.
+        Returns False if the file may still be written."""
+        path = self.directory/name
+        with suppress(FileNotFoundError), open(path, "rb") as file:
+            try:
+                # one worker hashes a file, the others see it linked
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            stat = os.fstat(file.fileno())
+            if not self._settled(name, stat):
+                return False
+            if not self.blobs.digest_of(stat):
+                digest = hashlib.file_digest(file, "sha256").hexdigest()
+                # a file that changed meanwhile is tried again
+                if not self.blobs.adopt(path, digest, stat):
+                    return False
+            self.update(name)
+        return True
+
+    def _track_writes(self, masks: dict[str, int]) -> list[str]:
+        """Track the files being written from their inotify
+        events, returns the names of the completed ones."""
+        written = []
+        for name, mask in masks.items():
+            self._written.discard(name)
+            if mask & WRITTEN_MASK:
+                written.append(name)
+                self._writing.discard(name)
+            elif mask & IN_CREATE:
+                self._writing.add(name)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._writing.discard(name)
+        return written
+
+    def _read_events(self) -> None:
+        try:
+            events = self._inotify.read_events()
+        except OSError:
+            logger.exception("Failed to read inotify events")
+            events = []
+        for event in events:
+            if event.mask & RESYNC_MASK:
+                self._resync = True
+            elif event.name:
+                self._changed[event.name] = (
+                    self._changed.get(event.name, 0) | event.mask)
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync())
+
+    async def _sync(self) -> None:
+        # events arriving while syncing trigger one more pass
+        while self._changed or self._resync:
+            await asyncio.sleep(self.debounce)
+            masks, self._changed = self._changed, {}
+            resync, self._resync = self._resync, False
+            try:
+                if resync:
+                    self._unwatch()
+                    self._watch()
+                    await asyncio.to_thread(self.reconcile)
+                else:
+                    written = self._track_writes(masks)
+                    await asyncio.to_thread(self.update, *masks)
+                    # also if the entry didn't change when closed
+                    written = [name for name in written
+                               if (entry := self.get(name))
+                               and not entry.sha256]
+                    if self.blobs and self.blobs.linkable and written:
+                        self._written.update(written)
+                        self._queue_hashing(written)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to update the media index")
+
+    def _watch(self) -> None:
+        """Watch the directory with inotify, poll it as a fallback."""
+        try:
+            self._inotify = Inotify()
+            self._inotify.add_watch(self.directory, WATCH_MASK)
+        except OSError as error:
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+            logger.warning("Polling %s for changes: %s",
+                           self.directory, error)
+            if self._poll_task is None:
+                self._poll_task = asyncio.create_task(self._poll())
+            return
+        asyncio.get_running_loop().add_reader(self._inotify.fd,
+                                              self._read_events)
+
+    def _unwatch(self) -> None:
+        if self._inotify:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+
+    async def _poll(self) -> None:
+        # only catches files added, removed or renamed, as files
+        # changed in place keep the directory mtime
+        last = None
+        while True:
+            with suppress(FileNotFoundError):
+                stat = self.directory.stat()
+                stamp = stat.st_ino, stat.st_mtime_ns
+                if stamp != last:
+                    last = stamp
+                    try:
+                        await asyncio.to_thread(self.reconcile)
+                    except Exception:  # pylint: disable=broad-exception-caught
+                        logger.exception("Failed to update the media index")
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        """Start watching the directory and reconcile the index."""
+        self._loop = asyncio.get_running_loop()
+        if self.blobs:
+            # hashing resumes with the files left without a digest
+            self._queue_hashing([entry.name for entry in self.entries()
+                                 if not entry.sha256])
+            await asyncio.to_thread(self.blobs.collect)
+        self._watch()
+        if self._poll_task is None:
+            # the poller reconciles on its first pass
+            await asyncio.to_thread(self.reconcile)
+
+    async def stop(self) -> None:
+        """Stop watching the directory."""
+        self._unwatch()
+        for task in (self._sync_task, self._poll_task, self._hash_task):
+            if task:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._sync_task = self._poll_task = self._hash_task = None
@@ -0,0 +1,583 @@
+"""Node State Store."""
+import sqlite3
+import logging
+import secrets
+import threading
+from pathlib import Path
+from contextlib import contextmanager, suppress
+from typing import Any, Callable, Iterator, TypeAlias
+
+from src.core.configmgr import ConfigManager, ConfigDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SECTION = "DEFAULT"
+DISPLAYS = "displays"
+DISPLAY_COLUMNS = ("name", "width", "height", "rotation",
+                   "x", "y", "reflect", "is_primary")
+MEDIA_FILES = "media_files"
+MEDIA_FILE_COLUMNS = ("name", "size", "mtime_ns", "mime_type", "sha256")
+UPLOADS = "uploads"
+UPLOAD_COLUMNS = ("id", "name", "length", "received",
+                  "mime_type", "updated_ns")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) STRICT;
+CREATE TABLE IF NOT EXISTS settings (
+    area TEXT NOT NULL,
+    section TEXT NOT NULL,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('str', 'int', 'float', 'bool')),
+    value ANY NOT NULL,
+    PRIMARY KEY (area, section, key)
+) STRICT;
+CREATE TABLE IF NOT EXISTS displays (
+    name TEXT PRIMARY KEY,
+    ordinal INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    rotation TEXT,
+    x INTEGER,
+    y INTEGER,
+    reflect TEXT,
+    is_primary INTEGER NOT NULL DEFAULT 0
+) STRICT;
+CREATE INDEX IF NOT EXISTS displays_ordinal ON displays (ordinal);
+CREATE TABLE IF NOT EXISTS media_files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    mime_type TEXT
+) STRICT;
+CREATE TABLE IF NOT EXISTS uploads (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    received INTEGER NOT NULL DEFAULT 0,
+    mime_type TEXT,
+    updated_ns INTEGER NOT NULL
+) STRICT;
+"""
+# applied in order on top of SCHEMA, PRAGMA user_version
+# counts the migrations a database has
+MIGRATIONS = (
+    "ALTER TABLE media_files ADD COLUMN sha256 TEXT",
+)
+
+
+def _encode(value: Any) -> tuple[str, Any]:
+    if isinstance(value, bool):
+        return "bool", int(value)
+    if isinstance(value, int):
+        return "int", value
+    if isinstance(value, float):
+        return "float", value
+    return "str", str(value)
+
+
+def _decode(kind: str, value: Any) -> Any:
+    return bool(value) if kind == "bool" else value
+
+
+def _import_value(value: str) -> Any:
+    """Type an INI value if it converts back to the same text."""
+    for convert in (int, float):
+        with suppress(ValueError):
+            if str(converted := convert(value)) == value:
+                return converted
+    if value in ("True", "False"):
+        return value == "True"
+    return value
+
+
+class StateTransaction:
+    """
+    Reads and writes of the state store. Changes made within
+    `StateStore.transaction` are committed all at once.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+        self.changed: set[str] = set()
+
+    def meta(self, key: str) -> int | None:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: int) -> None:
+        self.connection.execute(
+            "INSERT INTO meta VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value))
+
+    def has_area(self, area: str) -> bool:
+        row = self.connection.execute(
+            "SELECT 1 FROM settings WHERE area = ? LIMIT 1",
+            (area,)).fetchone()
+        return row is not None
+
+    def _rows(self, area: str, section: str) -> dict[str, Any]:
+        rows = self.connection.execute(
+            "SELECT key, kind, value FROM settings "
+            "WHERE area = ? AND section = ? ORDER BY rowid",
+            (area, section))
+        return {key: _decode(kind, value) for key, kind, value in rows}
+
+    def section(self, area: str,
+                section: str = DEFAULT_SECTION) -> dict[str, Any]:
+        """Load a section of an area, other sections inherit
+        the "DEFAULT" values like with `configparser`."""
+        result = self._rows(area, section)
+        if section == DEFAULT_SECTION:
+            return result
+        defaults = self._rows(area, DEFAULT_SECTION)
+        return {key: value for key, value in result.items()
+                if key not in defaults or defaults[key] != value}
+
+    def sections(self, area: str) -> ConfigDict:
+        """Load all sections of an area."""
+        result: ConfigDict = {DEFAULT_SECTION: {}}
+        rows = self.connection.execute(
+            "SELECT section, key, kind, value FROM settings "
+            "WHERE area = ? ORDER BY rowid", (area,))
+        for section, key, kind, value in rows:
+            result.setdefault(section, {})[key] = _decode(kind, value)
+        defaults = result[DEFAULT_SECTION]
+        for section, values in result.items():
+            if section != DEFAULT_SECTION:
+                result[section] = {
+                    key: value for key, value in values.items()
+                    if key not in defaults or defaults[key] != value}
+        return result
+
+    def _upsert(self, area: str, section: str, data: dict) -> None:
+        self.connection.executemany(
+            "INSERT INTO settings VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (area, section, key) DO UPDATE "
+            "SET kind = excluded.kind, value = excluded.value",
+            [(area, section, key, *_encode(value))
+             for key, value in data.items()])
+        self.changed.add(area)
+
+    def _delete(self, area: str, section: str | None = None) -> None:
+        if section is None:
+            self.connection.execute(
+                "DELETE FROM settings WHERE area = ?", (area,))
+        else:
+            self.connection.execute(
+                "DELETE FROM settings WHERE area = ? AND section = ?",
+                (area, section))
+        self.changed.add(area)
+
+    def save_section(self, area: str, data: dict,
+                     section: str = DEFAULT_SECTION,
+                     overwrite: bool = False) -> None:
+        """Save a section, same semantics as
+        `ConfigManager.save_section`."""
+        if overwrite or section != DEFAULT_SECTION:
+            self._delete(area, section)
+        if not overwrite and section != DEFAULT_SECTION:
+            defaults = self._rows(area, DEFAULT_SECTION)
+            data = {key: value for key, value in data.items()
+                    if key not in defaults or defaults[key] != value}
+        self._upsert(area, section, data)
+
+    def save(self, area: str, data: ConfigDict,
+             overwrite_sections: bool = False,
+             overwrite_config: bool = False) -> None:
+        """Save several sections, same semantics as `ConfigManager.save`.
+        `overwrite_config` replaces the whole area."""
+        if overwrite_config:
+            self._delete(area)
+        for section, values in data.items():
+            if overwrite_sections:
+                self._delete(area, section)
+            self._upsert(area, section, values)
+
+    def displays(self) -> list[dict[str, Any]]:
+        """Load the configuration of all displays in xrandr order."""
+        rows = self.connection.execute(
+            f"SELECT {', '.join(DISPLAY_COLUMNS)} FROM displays "
+            "ORDER BY ordinal")
+        return [dict(zip(DISPLAY_COLUMNS, row)) for row in rows]
+
+    def save_display(self, display: dict[str, Any]) -> None:
+        """Merge the non-None values into the display configuration.
+        The display moves to the front, like the xrandr call
+        that applied it last."""
+        stored = self.connection.execute(
+            f"SELECT {', '.join(DISPLAY_COLUMNS)} FROM displays "
+            "WHERE name = ?", (display["name"],)).fetchone()
+        row = dict(zip(DISPLAY_COLUMNS, stored or ()))
+        row |= {key: value for key, value in display.items()
+                if value is not None}
+        if row.get("is_primary"):
+            self.connection.execute(
+                "UPDATE displays SET is_primary = 0 WHERE is_primary")
+        first = self.connection.execute(
+            "SELECT min(ordinal) FROM displays").fetchone()[0] or 0
+        self._insert_display(row, first - 1)
+
+    def _insert_display(self, row: dict[str, Any], ordinal: int) -> None:
+        values = [row.get(column) for column in DISPLAY_COLUMNS]
+        values[-1] = int(bool(values[-1]))
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO displays "
+            f"({', '.join(DISPLAY_COLUMNS)}, ordinal) "
+            f"VALUES ({', '.join('?' * len(DISPLAY_COLUMNS))}, ?)",
+            (*values, ordinal))
+        self.changed.add(DISPLAYS)
+
+    def replace_displays(self, displays: list[dict[str, Any]]) -> None:
+        """Replace the configuration of all displays."""
+        self.connection.execute("DELETE FROM displays")
+        for ordinal, display in enumerate(displays):
+            self._insert_display(display, ordinal)
+        self.changed.add(DISPLAYS)
+
+    def delete_display(self, name: str) -> bool:
+        """Delete a display configuration, False if it doesn't exist."""
+        cursor = self.connection.execute(
+            "DELETE FROM displays WHERE name = ?", (name,))
+        if cursor.rowcount == 0:
+            return False
+        self.changed.add(DISPLAYS)
+        return True
+
+    def media_files(self) -> list[dict[str, Any]]:
+        """Load the media file index."""
+        rows = self.connection.execute(
+            f"SELECT {', '.join(MEDIA_FILE_COLUMNS)} FROM media_files "
+            "ORDER BY rowid")
+        return [dict(zip(MEDIA_FILE_COLUMNS, row)) for row in rows]
+
+    def save_media_files(self, files: list[dict[str, Any]]) -> None:
+        """Add or update entries of the media file index."""
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO media_files "
+            f"({', '.join(MEDIA_FILE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(MEDIA_FILE_COLUMNS))})",
+            [tuple(file[column] for column in MEDIA_FILE_COLUMNS)
+             for file in files])
+        self.changed.add(MEDIA_FILES)
+
+    def delete_media_files(self, names: list[str]) -> None:
+        """Remove entries from the media file index."""
+        self.connection.executemany(
+            "DELETE FROM media_files WHERE name = ?",
+            [(name,) for name in names])
+        self.changed.add(MEDIA_FILES)
+
+    def uploads(self) -> list[dict[str, Any]]:
+        """Load the state of all uploads."""
+        rows = self.connection.execute(
+            f"SELECT {', '.join(UPLOAD_COLUMNS)} FROM uploads "
+            "ORDER BY rowid")
+        return [dict(zip(UPLOAD_COLUMNS, row)) for row in rows]
+
+    def upload(self, upload_id: str) -> dict[str, Any] | None:
+        """Load the state of an upload, None if it doesn't exist."""
+        row = self.connection.execute(
+            f"SELECT {', '.join(UPLOAD_COLUMNS)} FROM uploads "
+            "WHERE id = ?", (upload_id,)).fetchone()
+        return dict(zip(UPLOAD_COLUMNS, row)) if row else None
+
+    def save_upload(self, upload: dict[str, Any]) -> None:
+        """Add or update the state of an upload."""
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO uploads "
+            f"({', '.join(UPLOAD_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(UPLOAD_COLUMNS))})",
+            tuple(upload[column] for column in UPLOAD_COLUMNS))
+        self.changed.add(UPLOADS)
+
+    def delete_upload(self, upload_id: str) -> bool:
+        """Delete the state of an upload, False if it doesn't exist."""
+        cursor = self.connection.execute(
+            "DELETE FROM uploads WHERE id = ?", (upload_id,))
+        if cursor.rowcount == 0:
+            return False
+        self.changed.add(UPLOADS)
+        return True
+
+
+Exporter: TypeAlias = Callable[[StateTransaction], None]
+
+
+class StateStore:
+    """
+    Node state in an SQLite database: settings of every area
+    (the former INI files), the display configuration
+    and the media file index.
+
+    The database uses a WAL journal, so reads never wait
+    for a writer and several processes can share it. Every
+    thread gets its own connection. Each area has a version
+    that is bumped on every committed change of the area.
+
+    Exporters registered for an area are called when
+    a transaction that changed it is about to commit. They keep
+    the files read by other programs (systemd units, session
+    scripts) in sync, and as they run under the write lock,
+    files are written in the order of the commits.
+    """
+
+    def __init__(self, path: Path, busy_timeout: float = 5.0) -> None:
+        """Open the database, create it if it doesn't exist.
+
+        Args:
+            path (Path): Path to the database file.
+
+            busy_timeout (float, optional):
+                Seconds to wait for a writer in another process.
+                Defaults to 5.0.
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._exporters: dict[str, list[Exporter]] = {}
+        self._connection().executescript(SCHEMA)
+        self._migrate()
+        self.id = self.reader().meta("store_id")
+        if self.id is None:
+            with self.transaction() as transaction:
+                # tells versions of a re-created database apart
+                if transaction.meta("store_id") is None:
+                    transaction.set_meta("store_id", secrets.randbits(63))
+                self.id = transaction.meta("store_id")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # transactions are controlled explicitly
+            connection = sqlite3.connect(self.path,
+                                         timeout=self.busy_timeout,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _migrate(self) -> None:
+        connection = self._connection()
+        version_query = "PRAGMA user_version"
+        if connection.execute(version_query).fetchone()[0] \
+                >= len(MIGRATIONS):
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have migrated meanwhile
+            version = connection.execute(version_query).fetchone()[0]
+            for statement in MIGRATIONS[version:]:
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def add_exporter(self, area: str, exporter: Exporter) -> None:
+        """Call `exporter` with every transaction that changed `area`,
+        right before it is committed."""
+        self._exporters.setdefault(area, []).append(exporter)
+
+    def _export(self, transaction: StateTransaction) -> None:
+        # the store stays the source of truth, a failed export
+        # doesn't prevent the commit and is redone by the next one
+        for area in transaction.changed:
+            for exporter in self._exporters.get(area, []):
+                try:
+                    exporter(transaction)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logger.exception("Failed to export %s state", area)
+
+    @contextmanager
+    def transaction(self) -> Iterator[StateTransaction]:
+        """Run reads and writes in a single transaction, committed
+        if the block succeeds and rolled back if it raises."""
+        connection = self._connection()
+        # take the write lock at once, a deferred transaction
+        # can't be upgraded when another process wrote meanwhile
+        connection.execute("BEGIN IMMEDIATE")
+        transaction = StateTransaction(connection)
+        try:
+            yield transaction
+            for area in transaction.changed:
+                connection.execute(
+                    "INSERT INTO meta VALUES (?, 1) ON CONFLICT (key) "
+                    "DO UPDATE SET value = value + 1",
+                    (f"version:{area}",))
+            self._export(transaction)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def reader(self) -> StateTransaction:
+        """Read outside of a transaction,
+        every single statement reads a consistent snapshot."""
+        return StateTransaction(self._connection())
+
+    def version(self, area: str) -> int:
+        """The change counter of an area."""
+        return self.reader().meta(f"version:{area}") or 0
+
+    def section(self, area: str,
+                section: str = DEFAULT_SECTION) -> dict[str, Any]:
+        return self.reader().section(area, section)
+
+    def sections(self, area: str) -> ConfigDict:
+        return self.reader().sections(area)
+
+    def displays(self) -> list[dict[str, Any]]:
+        return self.reader().displays()
+
+    def media_files(self) -> list[dict[str, Any]]:
+        return self.reader().media_files()
+
+    def uploads(self) -> list[dict[str, Any]]:
+        return self.reader().uploads()
+
+    def upload(self, upload_id: str) -> dict[str, Any] | None:
+        return self.reader().upload(upload_id)
+
+    def settings(self, area: str, path: Path,
+                 default_data: ConfigDict = None) -> "StateSettings":
+        """Get the settings of an area, see `StateSettings`."""
+        return StateSettings(self, area, path, default_data)
+
+
+class StateSettings:
+    """
+    The settings of one area of a `StateStore`
+    with the interface of `ConfigManager`.
+
+    The store is the source of truth, the INI file at `path`
+    is an export for systemd `EnvironmentFile=` and is rewritten
+    with every commit that changes the area. An area missing from
+    the store is migrated from the file, or created from
+    `default_data`. Edits of the file (by hand or by provisioning
+    scripts) are imported into the store on the next read or write.
+
+    Exports are never held back: a held back export could overwrite
+    an edit, or a newer export of another worker, which would then
+    be imported as an edit.
+    """
+
+    def __init__(self, store: StateStore, area: str, path: Path,
+                 default_data: ConfigDict = None) -> None:
+        self.store = store
+        self.area = area
+        self.path = path
+        self.exporter = ConfigManager(path)
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._cache: dict[tuple[str | None, bool], Any] = {}
+        store.add_exporter(area, self.export)
+        with store.transaction() as transaction:
+            if not transaction.has_area(area):
+                data = default_data or {}
+                if path.exists():
+                    data = self._import(self.exporter.load())
+                transaction.save(area, data, overwrite_config=True)
+        if not path.exists():
+            self.export(store.reader())
+
+    @staticmethod
+    def _import(data: ConfigDict) -> ConfigDict:
+        return {section: {key: _import_value(value)
+                          for key, value in values.items()}
+                for section, values in data.items()}
+
+    def _import_edits(self) -> None:
+        """Import the INI file if it was changed outside of the store."""
+        if not self.exporter.changed_on_disk():
+            return
+        if not self.path.exists():
+            self.export(self.store.reader())
+            return
+        # also marks the file as read
+        data = self.exporter.load()
+        with self.store.transaction() as transaction:
+            current = {name: self._as_text(values, convert_values=False)
+                       for name, values
+                       in transaction.sections(self.area).items()}
+            # another worker's export is the committed state
+            if data != current:
+                logger.info("Importing the changes of %s", self.path)
+                transaction.save(self.area, self._import(data),
+                                 overwrite_config=True)
+
+    @property
+    def version(self) -> int:
+        """The change counter of the area."""
+        self._import_edits()
+        return self.store.version(self.area)
+
+    @property
+    def revision(self) -> str:
+        """The version, unique across re-created databases."""
+        return f"{self.store.id:x}.{self.version}"
+
+    def export(self, transaction: StateTransaction) -> None:
+        """Write the settings to the INI file."""
+        data = {name: self._as_text(values, convert_values=False)
+                for name, values in transaction.sections(self.area).items()}
+        self.exporter.save(data, overwrite_config=True)
+
+    def _cached(self, key: tuple[str | None, bool],
+                load: Callable[[], Any]) -> Any:
+        version = self.version
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            if key not in self._cache:
+                self._cache[key] = load()
+            return self._cache[key]
+
+    @staticmethod
+    def _as_text(values: dict[str, Any],
+                 convert_values: bool) -> dict[str, Any]:
+        if convert_values:
+            return dict(values)
+        return {key: str(value) for key, value in values.items()}
+
+    def load_section(self, section: str = DEFAULT_SECTION,
+                     convert_values: bool = False) -> dict[str, Any]:
+        """Load a section, values are strings like in the INI file
+        unless `convert_values` is set."""
+        values = self._cached(
+            (section, convert_values),
+            lambda: self._as_text(self.store.section(self.area, section),
+                                  convert_values))
+        return dict(values)
+
+    def load(self, convert_values: bool = False) -> ConfigDict:
+        """Load all sections."""
+        data = self._cached(
+            (None, convert_values),
+            lambda: {name: self._as_text(values, convert_values)
+                     for name, values
+                     in self.store.sections(self.area).items()})
+        return {name: dict(values) for name, values in data.items()}
+
+    def save_section(self, data: dict, section: str = DEFAULT_SECTION,
+                     overwrite: bool = False) -> None:
+        """Save a section, see `ConfigManager.save_section`."""
+        # the export must not overwrite an edit of the file
+        self._import_edits()
+        with self.store.transaction() as transaction:
+            transaction.save_section(self.area, data, section, overwrite)
+
+    def save(self, data: ConfigDict, overwrite_sections: bool = False,
+             overwrite_config: bool = False) -> None:
+        """Save several sections, see `ConfigManager.save`."""
+        self._import_edits()
+        with self.store.transaction() as transaction:
+            transaction.save(self.area, data, overwrite_sections,
+                             overwrite_config)
@@ -1,14 +1,33 @@
 """System Command Executor."""
+import os
+import time
+import signal
+import asyncio
 import logging
-from subprocess import run, TimeoutExpired, CalledProcessError
+from pathlib import Path
+from contextlib import suppress
+from subprocess import run, TimeoutExpired, CalledProcessError, PIPE
 from dataclasses import dataclass
+from asyncio.subprocess import Process
+from fastapi import Request
 
 logger = logging.getLogger(__name__)
 
 
 class SysCmdExec:
     """Executes system commands and provides the output."""
-    # pylint: disable=too-few-public-methods
+
+    # Maximum number of concurrently running commands per family
+    # (the executable name, `sudo` is skipped)
+    family_limits: dict[str, int] = {
+        "nmcli": 2,
+        "xrandr": 1,
+        "pacmd": 2,
+        "pactl": 2,
+        "systemctl": 2,
+    }
+    default_limit: int = 4
+    _semaphores: dict[str, asyncio.Semaphore] = {}
 
     @dataclass
     class Response:
@@ -51,3 +70,196 @@ class SysCmdExec:
             logger.warning("Command not found: %s\nError: %s",
                            args_string, error)
             return SysCmdExec.Response(False, str(error))
+
+    @staticmethod
+    def family(args: list[str]) -> str:
+        """Return the command family, e.g. "nmcli" for `sudo nmcli ...`."""
+        for arg in args:
+            if arg != "sudo":
+                return Path(arg).name
+        return ""
+
+    @staticmethod
+    def _semaphore(args: list[str]) -> asyncio.Semaphore:
+        family = SysCmdExec.family(args)
+        if family not in SysCmdExec._semaphores:
+            limit = SysCmdExec.family_limits.get(family,
+                                                 SysCmdExec.default_limit)
+            SysCmdExec._semaphores[family] = asyncio.Semaphore(limit)
+        return SysCmdExec._semaphores[family]
+
+    @staticmethod
+    async def terminate(process: Process) -> None:
+        """
+        Terminate the whole process group. SIGTERM first, 
+        so `sudo` can relay it to the command, then SIGKILL.
+        """
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            with suppress(ProcessLookupError, PermissionError):
+                os.killpg(process.pid, sig)
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(process.wait(), 1)
+                return
+
+    @staticmethod
+    async def _wait_disconnect(request: Request,
+                               interval: float = 0.5) -> None:
+        """Return once the client of `request` has disconnected."""
+        while not await request.is_disconnected():
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    async def aio_run(args: list[str], timeout: float = None,
+                      request: Request = None) -> "SysCmdExec.Response":
+        """Executes a system command without blocking the event loop.
+
+        The number of concurrently running commands 
+        of the same family is limited (see `family_limits`). 
+        On timeout, client disconnect or cancellation 
+        the whole process group is killed.
+
+        Args:
+            args (list[str]): 
+                A list of strings representing the command
+                and its arguments.
+            timeout (float, optional): 
+                The maximum time (in seconds) to wait 
+                for the command to complete. Defaults to None.
+            request (Request, optional): 
+                Kill the command if this request's client disconnects.
+                Defaults to None.
+
+        Returns:
+            SysCmdExec.Response: 
+                An object containing the result 
+                of the command execution.
+        """
+        args_string = " ".join(args)
+        async with SysCmdExec._semaphore(args):
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *args, stdout=PIPE, stderr=PIPE, start_new_session=True)
+            except FileNotFoundError as error:
+                logger.warning("Command not found: %s\nError: %s",
+                               args_string, error)
+                return SysCmdExec.Response(False, str(error))
+
+            communicate = asyncio.ensure_future(process.communicate())
+            waiters = {communicate}
+            if request is not None:
+                waiters.add(asyncio.ensure_future(
+                    SysCmdExec._wait_disconnect(request)))
+            try:
+                await asyncio.wait(waiters, timeout=timeout,
+                                   return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters - {communicate}:
+                    waiter.cancel()
+                aborted = not communicate.done()
+                if aborted:
+                    await SysCmdExec.terminate(process)
+                    communicate.cancel()
+
+        if aborted:
+            if request is not None and await request.is_disconnected():
+                message = f"Client disconnected: {args_string}"
+            else:
+                message = (f"Command '{args_string}' timed out "
+                           f"after {timeout} seconds")
+            logger.warning("Command aborted: %s\nError: %s",
+                           args_string, message)
+            return SysCmdExec.Response(False, message)
+
+        stdout, stderr = communicate.result()
+        stdout = stdout.decode(errors="replace")
+        stderr = stderr.decode(errors="replace")
+        if process.returncode != 0:
+            logger.warning("Command failed: %s. Return code: %s\nError: %s",
+                           args_string, process.returncode, stderr)
+            return SysCmdExec.Response(False, stderr)
+        logger.info("Command completed: %s", args_string)
+        return SysCmdExec.Response(True, stdout)
+
+
+class CommandCache:
+    """Caches the output of read-only system commands.
+
+    Every cached command has its own TTL. Concurrent callers 
+    of the same command share a single running process 
+    (single-flight). Commands without a TTL are passed through.
+
+    Args:
+        ttl (dict[tuple[str, ...], float]): 
+            Time to live (in seconds) of each cached command.
+    """
+
+    @dataclass
+    class Entry:
+        response: SysCmdExec.Response
+        expires: float
+
+    def __init__(self, ttl: dict[tuple[str, ...], float]) -> None:
+        self.ttl = ttl
+        self._entries: dict[tuple[str, ...], CommandCache.Entry] = {}
+        self._in_flight: dict[tuple[str, ...], asyncio.Future] = {}
+        self._generation: dict[tuple[str, ...], int] = {}
+
+    async def run(self, args: list[str],
+                  timeout: float = None) -> SysCmdExec.Response:
+        """Executes a command or returns its cached output.
+
+        Failed executions are not cached.
+
+        Args:
+            args (list[str]): 
+                A list of strings representing the command
+                and its arguments.
+            timeout (float, optional): 
+                The maximum time (in seconds) to wait 
+                for the command to complete. Defaults to None.
+
+        Returns:
+            SysCmdExec.Response: 
+                An object containing the result 
+                of the command execution.
+        """
+        key = tuple(args)
+        if key not in self.ttl:
+            return await SysCmdExec.aio_run(args, timeout)
+
+        entry = self._entries.get(key)
+        if entry and entry.expires > time.monotonic():
+            return entry.response
+
+        if key not in self._in_flight:
+            generation = self._generation.get(key, 0)
+            self._in_flight[key] = asyncio.ensure_future(
+                self._execute(key, timeout, generation))
+        # a cancelled caller must not kill the process of the others
+        return await asyncio.shield(self._in_flight[key])
+
+    async def _execute(self, key: tuple[str, ...], timeout: float,
+                       generation: int) -> SysCmdExec.Response:
+        try:
+            response = await SysCmdExec.aio_run(list(key), timeout)
+        finally:
+            # invalidate() may have dropped or replaced the entry
+            if self._in_flight.get(key) is asyncio.current_task():
+                del self._in_flight[key]
+        # the output is stale if the cache was invalidated meanwhile
+        if response.success and generation == self._generation.get(key, 0):
+            expires = time.monotonic() + self.ttl[key]
+            self._entries[key] = CommandCache.Entry(response, expires)
+        return response
+
+    def invalidate(self, *commands: list[str]) -> None:
+        """
+        Drop the cached output of `commands`, 
+        or of every command if none is given.
+        """
+        keys = [tuple(args) for args in commands] or list(self.ttl)
+        for key in keys:
+            self._entries.pop(key, None)
+            # later callers must not join a process started before
+            self._in_flight.pop(key, None)
+            self._generation[key] = self._generation.get(key, 0) + 1
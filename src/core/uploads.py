@@ -0,0 +1,343 @@
+"""Resumable Uploads."""
+import os
+import time
+import errno
+import fcntl
+import shutil
+import asyncio
+import hashlib
+import logging
+import secrets
+from pathlib import Path
+from contextlib import ExitStack, contextmanager, suppress
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from starlette.requests import ClientDisconnect
+
+from src.core.statestore import StateStore
+from src.core.filesys import publish_file
+
+logger = logging.getLogger(__name__)
+
+# a part file without state can be a creation in progress
+ORPHAN_AGE_NS = 3600 * 10 ** 9
+
+
+def _write_chunks(fd: int, chunks: list[bytes], hasher: Any) -> None:
+    for chunk in chunks:
+        hasher.update(chunk)
+        data = memoryview(chunk)
+        while data:
+            data = data[os.write(fd, data):]
+
+
+class ResumableUploads:
+    """
+    Files uploaded in any number of requests, like the tus protocol:
+    an upload is created with its length, data is appended at the
+    received offset, which can be queried to resume after a dropped
+    connection or a restart.
+
+    Data is appended to `<id>.part` in `directory`, the state is
+    kept in the state store. The received offset only advances once
+    the data is synced to disk, anything written past it is dropped
+    by the next append. A complete upload is moved to `target`,
+    its state is kept for `completed_expiry` seconds, so a client
+    that missed the last response can still see the final offset.
+
+    The data is hashed with SHA-256 while it is written, the hash
+    of an upload is kept in memory between its requests and only
+    recomputed from the partial file by another process or after
+    a restart.
+    """
+
+    # seconds after which an upload without progress is removed on start
+    expiry = 7 * 24 * 3600.0
+    # seconds a complete upload is still reported
+    completed_expiry = 3600.0
+    buffer_size = 1024 ** 2
+    # bytes after which a long request syncs and saves the offset
+    checkpoint_size = 64 * 1024 ** 2
+
+    def __init__(self, store: StateStore, directory: Path, target: Path,
+                 publish: Callable[[Path, Path, str], None] = publish_file
+                 ) -> None:
+        """Initialize a new ResumableUploads instance.
+
+        Args:
+            store (StateStore): keeps the state of the uploads.
+
+            directory (Path): directory of the partial files.
+
+            target (Path): destination directory of complete files.
+
+            publish (Callable[[Path, Path, str], None], optional):
+                moves a complete file into `target`, see
+                `MultipartFileWriter`. Defaults to `publish_file`.
+        """
+        self.store = store
+        self.directory = directory
+        self.target = target
+        self.publish = publish
+        self._hashes: dict[str, tuple[int, Any]] = {}
+
+    def _part(self, upload_id: str) -> Path:
+        return self.directory/f"{upload_id}.part"
+
+    @contextmanager
+    def _locked(self, upload_id: str) -> Iterator[int]:
+        """Open the partial file of an upload with an exclusive lock,
+        a single request writes to an upload across all workers.
+
+        Raises:
+            FileNotFoundError: the upload doesn't exist.
+            BlockingIOError: another request holds the lock.
+        """
+        if not upload_id.isalnum():
+            raise FileNotFoundError("Upload not found")
+        fd = os.open(self._part(upload_id), os.O_WRONLY | os.O_CLOEXEC)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            yield fd
+        finally:
+            os.close(fd)
+
+    def get(self, upload_id: str) -> dict[str, Any] | None:
+        """The state of an upload, None if it doesn't exist."""
+        return self.store.upload(upload_id)
+
+    def _finished(self, upload: dict[str, Any]) -> bool:
+        """Whether a complete upload was already moved to `target`."""
+        return (upload["received"] == upload["length"]
+                and not self._part(upload["id"]).exists())
+
+    def create(self, name: str, length: int,
+               mime_type: str | None = None) -> dict[str, Any]:
+        """Create an upload of `length` bytes, saved as `name`.
+        An empty upload is complete at once.
+
+        Raises:
+            OSError: (ENOSPC) there isn't enough free space.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._remove_finished()
+        if shutil.disk_usage(self.directory).free < length:
+            raise OSError(errno.ENOSPC, "Not enough free space")
+        upload = {"id": secrets.token_hex(16), "name": name,
+                  "length": length, "received": 0,
+                  "mime_type": mime_type, "updated_ns": time.time_ns()}
+        # the file first, state without a file would never expire
+        os.close(os.open(self._part(upload["id"]),
+                         os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        with self.store.transaction() as transaction:
+            transaction.save_upload(upload)
+        if length == 0:
+            self._finalize(upload, hashlib.sha256().hexdigest())
+        return upload
+
+    def _hash_prefix(self, upload_id: str, length: int) -> Any:
+        hasher = hashlib.sha256()
+        with open(self._part(upload_id), "rb") as file:
+            while length > 0 and (chunk := file.read(
+                    min(self.buffer_size, length))):
+                hasher.update(chunk)
+                length -= len(chunk)
+        return hasher
+
+    async def append(self, upload_id: str, offset: int,
+                     chunks: AsyncIterator[bytes]) -> dict[str, Any]:
+        """Append the data of a request at the received offset.
+        If the client disconnects, the data received until then
+        is kept. The upload is finalized once it is complete.
+
+        Args:
+            upload_id (str): the upload.
+
+            offset (int): the offset the client sends from.
+
+            chunks (AsyncIterator[bytes]): the request body.
+
+        Raises:
+            FileNotFoundError: the upload doesn't exist.
+
+            BlockingIOError: another request appends to the upload.
+
+            ValueError:
+                the offset isn't the received offset
+                or the data exceeds the upload length.
+
+        Returns:
+            dict[str, Any]: the new state of the upload.
+        """
+        upload = self.get(upload_id)
+        if upload is not None and self._finished(upload):
+            return await self._append_finished(upload, offset, chunks)
+        with ExitStack() as stack:
+            try:
+                fd = stack.enter_context(self._locked(upload_id))
+            except FileNotFoundError:
+                # a concurrent request finalized the upload meanwhile
+                upload = self.get(upload_id)
+                if upload is not None and self._finished(upload):
+                    return await self._append_finished(upload, offset,
+                                                       chunks)
+                raise
+            # read under the lock, another worker may have appended
+            upload = self.get(upload_id)
+            if upload is None:
+                raise FileNotFoundError("Upload not found")
+            if self._finished(upload):
+                # the file was opened before it was moved
+                return await self._append_finished(upload, offset, chunks)
+            if offset != upload["received"]:
+                raise ValueError("Upload-Offset doesn't match "
+                                 "the received offset")
+            await asyncio.to_thread(os.ftruncate, fd, offset)
+            os.lseek(fd, offset, os.SEEK_SET)
+            # a hash that saw data past the offset is dropped
+            cached = self._hashes.pop(upload_id, None)
+            if cached and cached[0] == offset:
+                hasher = cached[1]
+            else:
+                hasher = await asyncio.to_thread(self._hash_prefix,
+                                                 upload_id, offset)
+            upload = await self._receive(fd, upload, chunks, hasher)
+            if upload["received"] == upload["length"]:
+                await asyncio.to_thread(self._finalize, upload,
+                                        hasher.hexdigest())
+            else:
+                self._hashes[upload_id] = upload["received"], hasher
+        return upload
+
+    async def _append_finished(self, upload: dict[str, Any], offset: int,
+                               chunks: AsyncIterator[bytes]
+                               ) -> dict[str, Any]:
+        """Answer a request to a finished upload with its state,
+        e.g. the last request again, its response was lost.
+        """
+        if offset != upload["received"]:
+            raise ValueError("Upload-Offset doesn't match "
+                             "the received offset")
+        async for chunk in chunks:
+            if chunk:
+                raise ValueError("Data exceeds the upload length")
+        return upload
+
+    async def _receive(self, fd: int, upload: dict[str, Any],
+                       chunks: AsyncIterator[bytes],
+                       hasher: Any) -> dict[str, Any]:
+        received = written = upload["received"]
+        pending: list[bytes] = []
+        try:
+            async for chunk in chunks:
+                if received + len(chunk) > upload["length"]:
+                    # nothing past the last checkpoint is kept
+                    raise ValueError("Data exceeds the upload length")
+                pending.append(chunk)
+                received += len(chunk)
+                checkpoint = (received - upload["received"]
+                              >= self.checkpoint_size)
+                if checkpoint or received - written >= self.buffer_size:
+                    await asyncio.to_thread(_write_chunks, fd, pending,
+                                            hasher)
+                    pending, written = [], received
+                if checkpoint:
+                    upload = await asyncio.to_thread(
+                        self._checkpoint, fd, upload["id"], received)
+        except ClientDisconnect:
+            # keep what arrived, the client resumes from there
+            pass
+        await asyncio.to_thread(_write_chunks, fd, pending, hasher)
+        return await asyncio.to_thread(self._checkpoint, fd,
+                                       upload["id"], received)
+
+    def _checkpoint(self, fd: int, upload_id: str,
+                    received: int) -> dict[str, Any]:
+        os.fsync(fd)
+        with self.store.transaction() as transaction:
+            upload = transaction.upload(upload_id)
+            if upload is None:
+                raise FileNotFoundError("Upload not found")
+            upload |= {"received": received, "updated_ns": time.time_ns()}
+            transaction.save_upload(upload)
+        return upload
+
+    def _finalize(self, upload: dict[str, Any], digest: str) -> None:
+        part = self._part(upload["id"])
+        path = self.target/upload["name"]
+        try:
+            self.publish(part, path, digest)
+        except FileNotFoundError:
+            # moved before a crash, only the state was left
+            if not path.exists():
+                raise
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+            shutil.move(part, path)
+        with self.store.transaction() as transaction:
+            # removed after `completed_expiry`
+            transaction.save_upload(upload | {"updated_ns": time.time_ns()})
+
+    def _remove_finished(self) -> None:
+        """Remove the state of uploads finished
+        more than `completed_expiry` seconds ago."""
+        deadline = time.time_ns() - self.completed_expiry * 10 ** 9
+        for upload in self.store.uploads():
+            if upload["updated_ns"] < deadline and self._finished(upload):
+                with self.store.transaction() as transaction:
+                    transaction.delete_upload(upload["id"])
+
+    def cancel(self, upload_id: str) -> None:
+        """Remove an upload and its data.
+
+        Raises:
+            FileNotFoundError: the upload doesn't exist.
+            BlockingIOError: a request appends to the upload.
+        """
+        with self._locked(upload_id):
+            self._hashes.pop(upload_id, None)
+            with self.store.transaction() as transaction:
+                if not transaction.delete_upload(upload_id):
+                    raise FileNotFoundError("Upload not found")
+            self._part(upload_id).unlink()
+
+    def recover(self) -> None:
+        """Finalize uploads completed before a crash, remove
+        expired and finished uploads and orphaned partial files."""
+        uploads = {upload["id"]: upload for upload in self.store.uploads()}
+        now = time.time_ns()
+        self._remove_finished()
+        for upload in uploads.values():
+            try:
+                if self._finished(upload):
+                    continue
+                if upload["received"] == upload["length"]:
+                    with self._locked(upload["id"]):
+                        self._finalize(upload, self._hash_prefix(
+                            upload["id"], upload["length"]).hexdigest())
+                elif now - upload["updated_ns"] > self.expiry * 10 ** 9:
+                    logger.info("Removing expired upload of %s",
+                                upload["name"])
+                    self.cancel(upload["id"])
+            except FileNotFoundError:
+                with self.store.transaction() as transaction:
+                    transaction.delete_upload(upload["id"])
+            except BlockingIOError:
+                # resumed by another worker meanwhile
+                continue
+            except OSError:
+                logger.exception("Failed to recover the upload of %s",
+                                 upload["name"])
+        with suppress(FileNotFoundError), os.scandir(self.directory) as it:
+            for item in it:
+                stem = item.name.removesuffix(".part")
+                if stem == item.name or stem in uploads:
+                    continue
+                with suppress(OSError):
+                    if now - item.stat().st_mtime_ns > ORPHAN_AGE_NS:
+                        os.unlink(item.path)
+
+    async def start(self) -> None:
+        """Recover the uploads left by the last run."""
+        await asyncio.to_thread(self.recover)
@@ -6,6 +6,8 @@ import argparse
 from pathlib import Path
 from dataclasses import dataclass
 
+from src.core.vlcrc_pool import RCConnection, RCConnectionPool, PoolBusyError
+
 
 class ArgsNamespace(argparse.Namespace):
     """
@@ -19,21 +21,9 @@ class ArgsNamespace(argparse.Namespace):
     command: str
 
 
-class VLCRemoteControl:
-    """Control VLC media player via Remote Control interface."""
-
-    def __init__(self, host: str, port: int, timeout: float = 0.1) -> None:
-        """Initialize VLCRemoteControl.
-
-        Args:
-            host (str): Hostname or IP address of the VLC instance.
-            port (int): Port number of the VLC RC interface.
-            timeout (float, optional): 
-                Socket connection timeout in seconds. Defaults to 0.1.
-        """
-        self.host = host
-        self.port = port
-        self.timeout = timeout
+class BaseRemoteControl:
+    """Response types and parsers shared by the VLC RC clients."""
+    # pylint: disable=too-few-public-methods
 
     @dataclass
     class AudioDevice:
@@ -57,6 +47,85 @@ class VLCRemoteControl:
             result.extend(list(filter(None, item.split("\r\n"))))
         return list(dict.fromkeys(result))
 
+    def _parse_response(self, command: str, response_data: list[str]
+                        ) -> "BaseRemoteControl.Response":
+        """Build a Response object from the raw response data."""
+        for record in response_data:
+            if "unknown command" in record.lower():
+                data = [f"Unknown command `{command.split()[0]}`"]
+                return BaseRemoteControl.Response(False, data)
+
+        result = self._filter_response(response_data)
+        return BaseRemoteControl.Response(True, result)
+
+    def _unavailable(self, error: Exception) -> "BaseRemoteControl.Response":
+        data = [f"VLC Remote Control is unavailable: {error}"]
+        return BaseRemoteControl.Response(False, data)
+
+    def _parse_volume(self, response: "BaseRemoteControl.Response") -> int:
+        """Extract the volume level from the `volume` response."""
+        for item in response.data:
+            match = re.search(r"audio volume:\s*(\d+)", item)
+            if match:
+                return int(match.group(1))
+        return -1
+
+    def _parse_adev(self, response: "BaseRemoteControl.Response"
+                    ) -> list[AudioDevice]:
+        """Extract audio devices from the `adev` response."""
+        devices: list[BaseRemoteControl.AudioDevice] = []
+        for item in response.data:
+            if item[:2] == "| ":
+                tmp = item[2:].split(" - ", 1)
+                device = BaseRemoteControl.AudioDevice(tmp[0], tmp[1])
+                if device.id:
+                    devices.append(device)
+        return devices
+
+
+class VLCRemoteControl(BaseRemoteControl):
+    """Control VLC media player via Remote Control interface."""
+
+    def __init__(self, host: str, port: int, timeout: float = 0.1,
+                 persistent: bool = False, pool_size: int = 1) -> None:
+        """Initialize VLCRemoteControl.
+
+        Args:
+            host (str): Hostname or IP address of the VLC instance.
+            port (int): Port number of the VLC RC interface.
+            timeout (float, optional): 
+                Socket connection timeout in seconds. Defaults to 0.1.
+            persistent (bool, optional): 
+                Keep connections open between commands 
+                instead of connecting for every command. 
+                Defaults to False.
+            pool_size (int, optional): 
+                Maximum number of persistent connections. 
+                Defaults to 1.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool = (RCConnectionPool(self._connect, pool_size)
+                     if persistent else None)
+
+    def _connect(self) -> RCConnection:
+        return RCConnection(self.host, self.port, self.timeout)
+
+    def _send_once(self, command: str) -> list[str]:
+        """Send a command over a new connection and read until EOF."""
+        response_data: list[str] = []
+        address = (self.host, self.port)
+        with socket.create_connection(address, self.timeout) as rc_socket:
+            rc_socket.sendall(str(command).encode() + b"\n")
+            rc_socket.shutdown(1)
+            while True:
+                response = rc_socket.recv(4096).decode()
+                if not response:
+                    break
+                response_data.append(response)
+        return response_data
+
     def _send(self, command: str) -> "VLCRemoteControl.Response":
         """Send a command to VLC and receive the response.
 
@@ -68,28 +137,20 @@ class VLCRemoteControl:
                 A Response object containing 
                 the success status and response data.
         """
-        response_data: list[str] = []
-        address = (self.host, self.port)
         try:
-            with socket.create_connection(address, self.timeout) as rc_socket:
-                rc_socket.sendall(str(command).encode() + b"\n")
-                rc_socket.shutdown(1)
-                while True:
-                    response = rc_socket.recv(4096).decode()
-                    if not response:
-                        break
-                    response_data.append(response)
-        except (TimeoutError, ConnectionRefusedError, socket.error) as error:
-            data = [f"VLC Remote Control is unavailable: {error}"]
-            return VLCRemoteControl.Response(False, data)
-
-        for record in response_data:
-            if "unknown command" in record.lower():
-                data = [f"Unknown command `{command.split()[0]}`"]
-                return VLCRemoteControl.Response(False, data)
-
-        result = self._filter_response(response_data)
-        return VLCRemoteControl.Response(True, result)
+            if self.pool:
+                response_data = self.pool.send(command)
+            else:
+                response_data = self._send_once(command)
+        except (TimeoutError, ConnectionRefusedError, socket.error,
+                PoolBusyError) as error:
+            return self._unavailable(error)
+        return self._parse_response(command, response_data)
+
+    def close(self) -> None:
+        """Close persistent connections, if any."""
+        if self.pool:
+            self.pool.close()
 
     def exec(self, command: str) -> "VLCRemoteControl.Response":
         """Execute given command 'as is'."""
@@ -165,6 +226,17 @@ class VLCRemoteControl:
         response = self._send("pause")
         return response.success
 
+    def seek(self, position: int) -> bool:
+        """Seek to the specified position in seconds.
+
+        Raises:
+            ValueError: If the position is negative.
+        """
+        if position < 0:
+            raise ValueError("Position must not be negative")
+        response = self._send(f"seek {position}")
+        return response.success
+
     def get_volume(self) -> int:
         """Get the current audio volume.
 
@@ -174,11 +246,7 @@ class VLCRemoteControl:
                 or -1 if the volume could not be retrieved.
         """
         response = self._send("volume")
-        for item in response.data:
-            match = re.search(r"audio volume:\s*(\d+)", item)
-            if match:
-                return int(match.group(1))
-        return -1
+        return self._parse_volume(response)
 
     def set_volume(self, value: int) -> bool:
         """Set the audio volume.
@@ -197,17 +265,10 @@ class VLCRemoteControl:
         response = self._send(f"volume {value}")
         return response.success
 
-    def get_adev(self) -> list[AudioDevice]:
+    def get_adev(self) -> list[BaseRemoteControl.AudioDevice]:
         """Get a list of available audio devices"""
-        devices: list[VLCRemoteControl.AudioDevice] = []
         response = self._send("adev")
-        for item in response.data:
-            if item[:2] == "| ":
-                tmp = item[2:].split(" - ", 1)
-                device = VLCRemoteControl.AudioDevice(tmp[0], tmp[1])
-                if device.id:
-                    devices.append(device)
-        return devices
+        return self._parse_adev(response)
 
     def set_adev(self, device_id: str) -> bool:
         """Set the active audio device."""
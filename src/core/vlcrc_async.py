@@ -0,0 +1,251 @@
+"""Asyncio VLC Remote Control."""
+from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from src.core.vlcrc import BaseRemoteControl
+from src.core.circuit import CircuitBreaker
+from src.core.vlcrc_pool import (AsyncRCConnection, AsyncRCConnectionPool,
+                                PoolBusyError)
+
+
+class AsyncVLCRemoteControl(BaseRemoteControl):
+    """
+    Control VLC media player via Remote Control interface 
+    using asyncio streams. Same API as `VLCRemoteControl`, 
+    but every command is a coroutine.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 0.1,
+                 pool_size: int = 1, failure_threshold: int = 3) -> None:
+        """Initialize AsyncVLCRemoteControl.
+
+        Args:
+            host (str): Hostname or IP address of the VLC instance.
+            port (int): Port number of the VLC RC interface.
+            timeout (float, optional): 
+                Socket connection timeout in seconds. Defaults to 0.1.
+            pool_size (int, optional): 
+                Maximum number of persistent connections. 
+                Defaults to 1.
+            failure_threshold (int, optional): 
+                Consecutive connection failures after which commands 
+                fail fast until VLC is reachable again. Defaults to 3.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool = AsyncRCConnectionPool(self._connect, pool_size)
+        self.breaker = CircuitBreaker(self._probe, failure_threshold)
+
+    async def _connect(self) -> AsyncRCConnection:
+        return await AsyncRCConnection.open(self.host, self.port,
+                                            self.timeout)
+
+    async def _probe(self) -> bool:
+        """Check whether VLC accepts connections again."""
+        try:
+            connection = await self.pool.connect()
+        except OSError:
+            return False
+        self.pool.offer(connection)
+        return True
+
+    async def _send(self, command: str) -> "BaseRemoteControl.Response":
+        """Send a command to VLC and receive the response.
+
+        Args:
+            command (str): The VLC RC command to send.
+
+        Returns:
+            Response: 
+                A Response object containing 
+                the success status and response data.
+        """
+        try:
+            response_data = await self.breaker.call(self._exchange, command)
+        except (OSError, PoolBusyError) as error:
+            # a busy pool is not a failure of VLC
+            return self._unavailable(error)
+        return self._parse_response(command, response_data)
+
+    async def _exchange(self, command: str) -> list[str]:
+        return await self.pool.send(command)
+
+    def close(self) -> None:
+        """Close persistent connections."""
+        self.pool.close()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["AsyncRCSession"]:
+        """Run several commands over a single RC connection.
+
+        The connection is held for the whole block, 
+        so no other command can interleave with the session.
+
+            async with vlc_rc.session() as session:
+                await session.clear()
+                await session.play()
+        """
+        try:
+            connection, reused = await self.breaker.call(self.pool.acquire)
+        except (OSError, PoolBusyError) as error:
+            yield AsyncRCSession(self, None, False, error)
+            return
+        session = AsyncRCSession(self, connection, reused)
+        try:
+            yield session
+        finally:
+            self.pool.release(session.connection)
+
+    async def exec(self, command: str) -> "BaseRemoteControl.Response":
+        """Execute given command 'as is'."""
+        return await self._send(command)
+
+    async def add(self, file: Path) -> bool:
+        """Add a file to the playlist.
+
+        Raises:
+            FileNotFoundError: 
+                If the specified file does not exist or is a directory.
+        """
+        if not file.exists() or file.is_dir():
+            raise FileNotFoundError
+        response = await self._send(f"add {file.as_uri()}")
+        return response.success
+
+    async def play(self) -> bool:
+        """Play the current stream."""
+        response = await self._send("play")
+        return response.success
+
+    async def stop(self) -> bool:
+        """Stop the current stream."""
+        response = await self._send("stop")
+        return response.success
+
+    async def next(self) -> bool:
+        """Go to the next item in the playlist."""
+        response = await self._send("next")
+        return response.success
+
+    async def prev(self) -> bool:
+        """Go to the previous item in the playlist."""
+        response = await self._send("prev")
+        return response.success
+
+    async def goto(self, index: int) -> bool:
+        """Go to the specified playlist index (starting from 1).
+
+        Raises:
+            ValueError: If the index is less than or equal to 0.
+        """
+        if index <= 0:
+            raise ValueError("Index must be greater than zero")
+        response = await self._send(f"goto {index}")
+        return response.success
+
+    async def clear(self) -> bool:
+        """Clear the playlist."""
+        response = await self._send("clear")
+        return response.success
+
+    async def status(self) -> "BaseRemoteControl.Response":
+        """Get the current playlist status. """
+        return await self._send("status")
+
+    async def pause(self) -> bool:
+        """Toggle pause/play. """
+        response = await self._send("pause")
+        return response.success
+
+    async def seek(self, position: int) -> bool:
+        """Seek to the specified position in seconds.
+
+        Raises:
+            ValueError: If the position is negative.
+        """
+        if position < 0:
+            raise ValueError("Position must not be negative")
+        response = await self._send(f"seek {position}")
+        return response.success
+
+    async def get_volume(self) -> int:
+        """Get the current audio volume (0-320), 
+        or -1 if the volume could not be retrieved."""
+        response = await self._send("volume")
+        return self._parse_volume(response)
+
+    async def set_volume(self, value: int) -> bool:
+        """Set the audio volume (0-320).
+
+        Raises:
+            ValueError: If the volume is outside the range of 0-320.
+        """
+        if not 0 <= value <= 320:
+            raise ValueError("Value must be between 0 and 320")
+        response = await self._send(f"volume {value}")
+        return response.success
+
+    async def get_adev(self) -> list[BaseRemoteControl.AudioDevice]:
+        """Get a list of available audio devices"""
+        response = await self._send("adev")
+        return self._parse_adev(response)
+
+    async def set_adev(self, device_id: str) -> bool:
+        """Set the active audio device."""
+        response = await self._send(f"adev {device_id}")
+        return response.success
+
+    async def quit(self) -> bool:
+        """Quit VLC."""
+        response = await self._send("quit")
+        return response.success
+
+
+class AsyncRCSession(AsyncVLCRemoteControl):
+    """
+    `AsyncVLCRemoteControl` bound to a single connection.
+    Created by `AsyncVLCRemoteControl.session()`.
+    """
+    # pylint: disable=super-init-not-called
+
+    def __init__(self, client: AsyncVLCRemoteControl,
+                 connection: AsyncRCConnection | None, reused: bool,
+                 error: Exception | str | None = None) -> None:
+        self.pool = client.pool
+        self.breaker = client.breaker
+        self.connection = connection
+        self.error = error
+        self._reused = reused
+
+    async def _send(self, command: str) -> "BaseRemoteControl.Response":
+        if self.connection is None:
+            return self._unavailable(self.error)
+        return await super()._send(command)
+
+    async def _exchange(self, command: str) -> list[str]:
+        """
+        Send a command over the session connection. 
+        A stale pooled connection is replaced once, 
+        before the first successful command.
+        """
+        try:
+            response_data = await self.connection.send(command)
+        except OSError:
+            self.connection.close()
+            if not self._reused:
+                raise
+            self._reused = False
+            self.connection = await self.pool.connect()
+            response_data = await self.connection.send(command)
+        self._reused = False
+        return response_data
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["AsyncRCSession"]:
+        yield self
+
+    def close(self) -> None:
+        if self.connection:
+            self.connection.close()
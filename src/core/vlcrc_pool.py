@@ -0,0 +1,422 @@
+"""VLC Remote Control Connection Pools."""
+import time
+import asyncio
+import socket
+import threading
+from typing import Awaitable, Callable
+
+RC_PROMPT = b"> "
+
+
+class PoolBusyError(Exception):
+    """
+    No pooled connection became free in time. 
+    Not an `OSError`: the pool is busy with other commands, 
+    VLC itself may well be available.
+    """
+
+
+class RCConnection:
+    """
+    A long-lived connection to the VLC Remote Control interface.
+
+    Responses are framed by the RC prompt ("> ") instead of 
+    by the socket close, so the connection can be reused 
+    for any number of commands.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 0.1,
+                 read_timeout: float = 1.0) -> None:
+        """Open a connection and consume the RC greeting.
+
+        Args:
+            host (str): Hostname or IP address of the VLC instance.
+            port (int): Port number of the VLC RC interface.
+            timeout (float, optional): 
+                Socket connection timeout in seconds. Defaults to 0.1.
+            read_timeout (float, optional): 
+                Maximum time in seconds to wait for the prompt 
+                after a command. Defaults to 1.0.
+
+        Raises:
+            OSError: If the connection could not be established.
+        """
+        self.read_timeout = read_timeout
+        self.socket = socket.create_connection((host, port), timeout)
+        self.socket.settimeout(read_timeout)
+        self.closed = False
+        try:
+            self._read_until_prompt()
+        except OSError:
+            self.socket.close()
+            raise
+
+    def _read_until_prompt(self) -> list[str]:
+        """Read data until the RC prompt or EOF. The prompt is stripped."""
+        data = b""
+        while True:
+            chunk = self.socket.recv(4096)
+            if not chunk:
+                self.close()
+                break
+            data += chunk
+            if data == RC_PROMPT or data.endswith(b"\n" + RC_PROMPT):
+                data = data[:-len(RC_PROMPT)]
+                break
+        return [data.decode(errors="replace")]
+
+    def _drain(self) -> None:
+        """Discard unsolicited output (e.g. status change messages)."""
+        self.socket.setblocking(False)
+        try:
+            while self.socket.recv(4096):
+                pass
+            self.close()
+        except BlockingIOError:
+            self.socket.settimeout(self.read_timeout)
+
+    def send(self, command: str) -> list[str]:
+        """Send a command and return its raw response. 
+        The connection is closed if the exchange is interrupted.
+
+        Raises:
+            OSError: If the connection is broken.
+        """
+        if self.closed:
+            raise ConnectionError("Connection is closed")
+        self._drain()
+        if self.closed:
+            raise ConnectionError("Connection closed by VLC")
+        try:
+            self.socket.sendall(str(command).encode() + b"\n")
+            return self._read_until_prompt()
+        except BaseException:
+            # an unread response would answer the next command
+            self.close()
+            raise
+
+    def close(self) -> None:
+        self.closed = True
+        self.socket.close()
+
+
+class RCConnectionPool:
+    """
+    A small pool of `RCConnection` objects with reconnect-on-failure.
+
+    The VLC RC interface serves one client at a time, so by default 
+    the pool keeps a single connection and serializes commands. 
+    Idle connections are closed after `idle_timeout` seconds 
+    to let other clients (e.g. `init_vlc_audio.py`) in.
+    """
+
+    def __init__(self, connect: Callable[[], RCConnection], size: int = 1,
+                 read_timeout: float = 1.0,
+                 idle_timeout: float = 5.0) -> None:
+        """Initialize RCConnectionPool.
+
+        Args:
+            connect (Callable[[], RCConnection]): 
+                Opens a new connection to VLC.
+            size (int, optional): 
+                Maximum number of connections. Defaults to 1.
+            read_timeout (float, optional): 
+                Maximum time in seconds to wait 
+                for a free connection. Defaults to 1.0.
+            idle_timeout (float, optional): 
+                Close connections unused for this many seconds. 
+                Defaults to 5.0.
+        """
+        self.connect = connect
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle: list[tuple[RCConnection, float]] = []
+        self._reaper: threading.Timer | None = None
+
+    def _schedule_reap(self, delay: float) -> None:
+        """Start the reaper timer unless it is already running.
+        Must be called with `_lock` held."""
+        if self._reaper is None:
+            self._reaper = threading.Timer(delay, self._reap)
+            self._reaper.daemon = True
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        """Close connections that have been idle for too long."""
+        now = time.monotonic()
+        deadline = now - self.idle_timeout
+        with self._lock:
+            self._reaper = None
+            expired = [c for c, t in self._idle if t <= deadline]
+            self._idle = [(c, t) for c, t in self._idle if t > deadline]
+            if self._idle:
+                oldest = min(t for _, t in self._idle)
+                self._schedule_reap(oldest - deadline)
+        for connection in expired:
+            connection.close()
+
+    def acquire(self) -> tuple[RCConnection, bool]:
+        """
+        Get an idle connection or open a new one.
+        The second value is True if the connection was reused.
+
+        Raises:
+            PoolBusyError: If no connection became free in time.
+            OSError: If no connection could be opened.
+        """
+        # held until `release`
+        # pylint: disable-next=consider-using-with
+        if not self._slots.acquire(timeout=self.read_timeout):
+            raise PoolBusyError("VLC Remote Control is busy")
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()[0], True
+        try:
+            return self.connect(), False
+        except OSError:
+            self._slots.release()
+            raise
+
+    def release(self, connection: RCConnection) -> None:
+        """Return a connection to the pool."""
+        with self._lock:
+            if not connection.closed:
+                self._idle.append((connection, time.monotonic()))
+                self._schedule_reap(self.idle_timeout)
+        self._slots.release()
+
+    def send(self, command: str) -> list[str]:
+        """Send a command, retrying once on a fresh connection
+        if a pooled connection turned out to be stale.
+
+        Raises:
+            PoolBusyError: If no connection became free in time.
+            OSError: If VLC is unavailable.
+        """
+        connection, reused = self.acquire()
+        try:
+            try:
+                return connection.send(command)
+            except OSError:
+                connection.close()
+                if not reused:
+                    raise
+            connection = self.connect()
+            try:
+                return connection.send(command)
+            except OSError:
+                connection.close()
+                raise
+        finally:
+            self.release(connection)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            connection.close()
+
+
+class AsyncRCConnection:
+    """
+    A long-lived asyncio streams connection 
+    to the VLC Remote Control interface.
+    Responses are framed by the RC prompt ("> ").
+    """
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 read_timeout: float = 1.0) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.read_timeout = read_timeout
+
+    @classmethod
+    async def open(cls, host: str, port: int, timeout: float = 0.1,
+                   read_timeout: float = 1.0) -> "AsyncRCConnection":
+        """Open a connection and consume the RC greeting.
+
+        Raises:
+            OSError: If the connection could not be established.
+        """
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), timeout)
+        except asyncio.TimeoutError as error:
+            raise TimeoutError("Connection timed out") from error
+        connection = cls(reader, writer, read_timeout)
+        try:
+            await connection._read_until_prompt()
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing() or self.reader.at_eof()
+
+    async def _read_chunks(self) -> bytes:
+        data = b""
+        while True:
+            chunk = await self.reader.read(4096)
+            if not chunk:
+                self.close()
+                break
+            data += chunk
+            if data == RC_PROMPT or data.endswith(b"\n" + RC_PROMPT):
+                data = data[:-len(RC_PROMPT)]
+                break
+        return data
+
+    async def _read_until_prompt(self) -> list[str]:
+        """Read data until the RC prompt or EOF. The prompt is stripped.
+        Unsolicited status change messages are dropped."""
+        try:
+            data = await asyncio.wait_for(self._read_chunks(),
+                                          self.read_timeout)
+        except asyncio.TimeoutError as error:
+            self.close()
+            raise TimeoutError("VLC Remote Control timed out") from error
+        lines = data.decode(errors="replace").split("\r\n")
+        return ["\r\n".join(line for line in lines
+                              if not line.startswith("status change:"))]
+
+    async def send(self, command: str) -> list[str]:
+        """Send a command and return its raw response. 
+        The connection is closed if the exchange is interrupted.
+
+        Raises:
+            OSError: If the connection is broken.
+        """
+        if self.closed:
+            raise ConnectionError("Connection is closed")
+        try:
+            self.writer.write(str(command).encode() + b"\n")
+            await self.writer.drain()
+            return await self._read_until_prompt()
+        except BaseException:
+            # also on cancellation, an unread response
+            # would answer the next command
+            self.close()
+            raise
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AsyncRCConnectionPool:
+    """
+    Asyncio counterpart of `RCConnectionPool`. 
+    Waiting for a free connection does not block the event loop.
+    """
+
+    def __init__(self,
+                 connect: Callable[[], Awaitable[AsyncRCConnection]],
+                 size: int = 1, read_timeout: float = 1.0,
+                 idle_timeout: float = 5.0) -> None:
+        """Initialize AsyncRCConnectionPool.
+
+        Args:
+            connect (Callable[[], Awaitable[AsyncRCConnection]]): 
+                Opens a new connection to VLC. 
+                Also used to bypass the pool.
+            size (int, optional): 
+                Maximum number of connections. Defaults to 1.
+            read_timeout (float, optional): 
+                Maximum time in seconds to wait 
+                for a free connection. Defaults to 1.0.
+            idle_timeout (float, optional): 
+                Close connections unused for this many seconds. 
+                Defaults to 5.0.
+        """
+        self.connect = connect
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[tuple[AsyncRCConnection, float]] = []
+        self._reaper: asyncio.TimerHandle | None = None
+
+    def _schedule_reap(self, delay: float) -> None:
+        if self._reaper is None:
+            loop = asyncio.get_running_loop()
+            self._reaper = loop.call_later(delay, self._reap)
+
+    def _reap(self) -> None:
+        """Close connections that have been idle for too long."""
+        self._reaper = None
+        deadline = time.monotonic() - self.idle_timeout
+        for connection, _ in [i for i in self._idle if i[1] <= deadline]:
+            connection.close()
+        self._idle = [i for i in self._idle if i[1] > deadline]
+        if self._idle:
+            self._schedule_reap(min(t for _, t in self._idle) - deadline)
+
+    async def acquire(self) -> tuple[AsyncRCConnection, bool]:
+        """
+        Get an idle connection or open a new one.
+        The second value is True if the connection was reused.
+
+        Raises:
+            PoolBusyError: If no connection became free in time.
+            OSError: If no connection could be opened.
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.read_timeout)
+        except asyncio.TimeoutError as error:
+            raise PoolBusyError("VLC Remote Control is busy") from error
+        while self._idle:
+            connection = self._idle.pop()[0]
+            if not connection.closed:
+                return connection, True
+        try:
+            return await self.connect(), False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: AsyncRCConnection) -> None:
+        """Return a connection to the pool."""
+        if not connection.closed:
+            self._idle.append((connection, time.monotonic()))
+            self._schedule_reap(self.idle_timeout)
+        self._slots.release()
+
+    async def send(self, command: str) -> list[str]:
+        """Send a command, retrying once on a fresh connection
+        if a pooled connection turned out to be stale.
+
+        Raises:
+            PoolBusyError: If no connection became free in time.
+            OSError: If VLC is unavailable.
+        """
+        connection, reused = await self.acquire()
+        try:
+            try:
+                return await connection.send(command)
+            except OSError:
+                connection.close()
+                if not reused:
+                    raise
+            connection = await self.connect()
+            return await connection.send(command)
+        finally:
+            self.release(connection)
+
+    def offer(self, connection: AsyncRCConnection) -> None:
+        """Keep a connection opened with `connect` for later use, 
+        or close it if the pool already has enough idle connections."""
+        if self._slots.locked() or self._idle:
+            connection.close()
+            return
+        self._idle.append((connection, time.monotonic()))
+        self._schedule_reap(self.idle_timeout)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            connection.close()
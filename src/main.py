@@ -11,6 +11,7 @@ from src.api.media_files.router import router as media_files
 from src.api.media_node.router import router as media_node
 from src.api.media_player.router import router as media_player
 from src.api.playlists.router import router as playlists
+from src.api.provisioning.router import router as provisioning
 from src.api.web_browser.router import router as web_browser
 
 app = FastAPI(docs_url=None, redoc_url=None)
@@ -20,6 +21,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Location", "Upload-Offset", "Upload-Length"],
 )
 app.mount("/static",
           StaticFiles(directory=AppDir.STATIC.value, html=True),
@@ -35,10 +37,12 @@ app.include_router(media_files)
 app.include_router(media_node)
 app.include_router(media_player)
 app.include_router(playlists)
+app.include_router(provisioning)
 app.include_router(web_browser)
 
+
 if __name__ == "__main__":
     uvicorn.run(app="src.main:app",
                 host=app_config.host, port=app_config.port,
-                reload=app_config.reload,
+                workers=app_config.workers, reload=app_config.reload,
                 log_level=logging.DEBUG if app_config.debug else logging.INFO)
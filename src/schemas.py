@@ -4,6 +4,7 @@ from pydantic import BaseModel
 class AppConfigSchema(BaseModel):
     host: str = "0.0.0.0"
     port: int = 5000
+    workers: int = 1
     reload: bool = False
     debug: bool = False
     openapi: bool = False
@@ -0,0 +1,29 @@
+"""Media player state polling against `FakeVLCServer`.
+
+    python -m pytest tests
+"""
+import asyncio
+
+from benchmarks.fake_vlc import FakeVLCServer
+from src.core.vlcrc import VLCRemoteControl
+from src.core.vlcrc_async import AsyncVLCRemoteControl
+from src.api.media_player.poller import PlayerStatePoller
+
+
+def test_poller_lets_other_clients_in() -> None:
+    async def run() -> None:
+        async with FakeVLCServer(port=0) as server:
+            rc = AsyncVLCRemoteControl(server.host, server.port, timeout=1.0)
+            poller = PlayerStatePoller(rc, interval=0.05)
+            poller.start()
+            await asyncio.sleep(0.2)
+            # a one-shot client like `init_vlc_audio.py` or the
+            # vlcrc command line, the fake server is single client
+            other = VLCRemoteControl(server.host, server.port, timeout=0.5)
+            volume = await asyncio.to_thread(other.get_volume)
+            await poller.stop()
+            rc.close()
+            assert volume == 256
+            assert poller.snapshot.available
+
+    asyncio.run(run())
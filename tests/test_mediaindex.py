@@ -0,0 +1,47 @@
+"""Media index with a blob store.
+
+    python -m pytest tests
+"""
+import os
+import asyncio
+import hashlib
+from pathlib import Path
+
+from src.core.statestore import StateStore
+from src.core.blobstore import BlobStore
+from src.core.mediaindex import MediaIndex
+
+
+def test_file_is_adopted_once_written(tmp_path: Path) -> None:
+    async def run() -> None:
+        media, blobs = tmp_path/"media", BlobStore(tmp_path/"blobs")
+        media.mkdir()
+        index = MediaIndex(StateStore(tmp_path/"state.db"), media, blobs,
+                           debounce=0.01)
+        await index.start()
+        with open(media/"clip.mp4", "wb") as file:
+            file.write(b"first part")
+            file.flush()
+            await asyncio.sleep(0.3)
+            # still open for writing
+            assert index.get("clip.mp4").sha256 is None
+            assert os.stat(media/"clip.mp4").st_mode & 0o222
+            file.write(b", second part")
+        await asyncio.sleep(0.3)
+        await index.stop()
+        digest = hashlib.sha256(b"first part, second part").hexdigest()
+        assert index.get("clip.mp4").sha256 == digest
+        assert (blobs.path(digest)).samefile(media/"clip.mp4")
+
+    asyncio.run(run())
+
+
+def test_adopt_checks_the_linked_content(tmp_path: Path) -> None:
+    blobs = BlobStore(tmp_path/"blobs")
+    path = tmp_path/"clip.mp4"
+    path.write_bytes(b"changed after hashing")
+    path.chmod(0o644)
+    digest = hashlib.sha256(b"hashed content").hexdigest()
+    assert not blobs.adopt(path, digest, path.stat())
+    assert blobs.stat(digest) is None
+    assert path.stat().st_mode & 0o777 == 0o644
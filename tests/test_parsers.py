@@ -0,0 +1,97 @@
+"""Parsers of system tool output, against captures in `tests/captures`.
+
+    python -m pytest tests
+"""
+from pathlib import Path
+
+from src.api.media_node.parsers import (split_terse, parse_sinks,
+                                        parse_volume, parse_wifi_interfaces,
+                                        parse_saved_connections,
+                                        parse_wireless_uuids,
+                                        parse_wifi_networks, parse_xrandr,
+                                        parse_display_config,
+                                        display_config_args)
+from src.api.media_node.schemas import (DisplayConfig, DisplayPosition,
+                                        DisplayResolution)
+
+CAPTURES_DIR = Path(__file__).parent/"captures"
+
+
+def capture(name: str) -> str:
+    return (CAPTURES_DIR/name).read_text("utf-8")
+
+
+def test_split_terse() -> None:
+    assert split_terse(r"a\:b:c\\:") == ["a:b", "c\\", ""]
+    assert split_terse("wlan0:wifi:connected:") == [
+        "wlan0", "wifi", "connected", ""]
+
+
+def test_parse_sinks() -> None:
+    sinks, default, volume = parse_sinks(capture("pacmd_list_sinks.txt"))
+    assert [(sink.id, sink.name) for sink in sinks] == [
+        (0, "alsa_output.platform-bcm2835_audio.analog-stereo"),
+        (1, "alsa_output.platform-fef00700.hdmi.hdmi-stereo")]
+    assert default == sinks[1]
+    # the volume of the default sink, not of the first one
+    assert volume == 45
+    assert parse_sinks("0 sink(s) available.\n") == ([], None, None)
+
+
+def test_parse_volume() -> None:
+    assert parse_volume(capture("pactl_get_sink_volume.txt")) == 45
+    assert parse_volume("") is None
+
+
+def test_parse_wifi_interfaces() -> None:
+    interfaces = parse_wifi_interfaces(capture("nmcli_device_status.txt"))
+    assert [(i.name, i.status) for i in interfaces] == [
+        ("wlan0", "connected")]
+
+
+def test_parse_saved_connections() -> None:
+    output = capture("nmcli_connection_show.txt")
+    connections = parse_saved_connections(output)
+    assert [(c.ssid, c.interface) for c in connections] == [
+        ("Office", "wlan0"), ("Cafe:Guest", "")]
+    assert parse_wireless_uuids(output) == {
+        "4f0b7d8e-5c3e-4b7a-9d42-1f0e6b3c2a11": "Office",
+        "9b8a7c6d-5e4f-4321-8765-43210fedcba9": "Cafe:Guest"}
+
+
+def test_parse_wifi_networks() -> None:
+    networks = parse_wifi_networks(capture("nmcli_wifi_list.txt"))
+    assert [n.ssid for n in networks] == [
+        "Office", "Office", "Cafe:Guest", ""]
+    assert [n.connected for n in networks] == [True, False, False, False]
+    office = networks[0]
+    assert (office.bssid, office.chan, office.rate, office.signal) == (
+        "A4:2B:B0:C1:D2:E3", 36, "270 Mbit/s", 82)
+    assert [n.security for n in networks] == [
+        ["WPA2"], ["WPA2"], [], ["WPA2", "802.1X"]]
+
+
+def test_parse_xrandr() -> None:
+    displays = parse_xrandr(capture("xrandr.txt"))
+    # HDMI-3 has no active mode, DP-1 is disconnected
+    assert [d.name for d in displays] == ["HDMI-1", "HDMI-2"]
+    first, second = displays[0], displays[1]
+    assert first.primary and not second.primary
+    assert (first.rotation, first.reflect) == ("normal", "normal")
+    assert (second.rotation, second.reflect) == ("left", "X axis")
+    assert first.resolutions == [
+        "1920x1080", "1680x1050", "1280x720", "1920x1080i"]
+    assert (second.resolution.width, second.resolution.height) == (
+        1080, 1920)
+    assert (second.position.x, second.position.y) == (1920, 0)
+
+
+def test_display_config_round_trip() -> None:
+    display = DisplayConfig(
+        name="HDMI-2", resolution=DisplayResolution(width=1920,
+                                                    height=1080),
+        rotation="left", position=DisplayPosition(x=1920, y=0),
+        reflect="x", primary=True)
+    line = " ".join(display_config_args(display))
+    assert parse_display_config(line) == display
+    assert parse_display_config("sudo xrandr --primary") is None
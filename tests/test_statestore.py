@@ -0,0 +1,75 @@
+"""State store settings and their INI exports.
+
+    python -m pytest tests
+"""
+import configparser
+from pathlib import Path
+
+from src.core.statestore import StateStore
+
+
+def read_ini(path: Path) -> dict[str, dict[str, str]]:
+    config = configparser.ConfigParser()
+    config.optionxform = lambda option: option
+    config.read(path)
+    return {name: dict(section) for name, section in config.items()}
+
+
+def test_overwrite_config_round_trip(tmp_path: Path) -> None:
+    store = StateStore(tmp_path/"state.db")
+    path = tmp_path/"area.ini"
+    settings = store.settings("area", path, {
+        "DEFAULT": {"volume": 50},
+        "old": {"name": "removed"},
+    })
+    assert set(read_ini(path)) == {"DEFAULT", "old"}
+
+    settings.save({"DEFAULT": {"volume": 75}, "new": {"name": "kept"}},
+                  overwrite_config=True)
+    expected = {"DEFAULT": {"volume": "75"},
+                "new": {"volume": "75", "name": "kept"}}
+    assert read_ini(path) == expected
+    assert settings.load() == {"DEFAULT": {"volume": "75"},
+                               "new": {"name": "kept"}}
+    # a new instance reads the same state back
+    assert store.settings("area", path).load() == settings.load()
+
+
+def test_edited_ini_is_imported(tmp_path: Path) -> None:
+    store = StateStore(tmp_path/"state.db")
+    path = tmp_path/"area.ini"
+    settings = store.settings("area", path, {"DEFAULT": {"volume": 50}})
+    version = settings.version
+    path.write_text("[DEFAULT]\nvolume = 80\n\n[extra]\nname = x\n")
+    assert settings.load_section() == {"volume": "80"}
+    assert settings.load(convert_values=True) == {
+        "DEFAULT": {"volume": 80}, "extra": {"name": "x"}}
+    assert settings.version == version + 1
+
+    path.unlink()
+    assert settings.load_section() == {"volume": "80"}
+    assert read_ini(path)["DEFAULT"] == {"volume": "80"}
+
+
+def test_exports_of_other_workers_are_not_imported(tmp_path: Path) -> None:
+    store = StateStore(tmp_path/"state.db")
+    path = tmp_path/"area.ini"
+    first = store.settings("area", path, {"DEFAULT": {"volume": 50}})
+    second = store.settings("area", path)
+    first.save_section({"volume": 60})
+    version = first.version
+    assert second.load_section() == {"volume": "60"}
+    assert first.load_section() == {"volume": "60"}
+    assert second.version == first.version == version
+
+
+def test_edit_before_a_save_is_kept(tmp_path: Path) -> None:
+    store = StateStore(tmp_path/"state.db")
+    path = tmp_path/"area.ini"
+    settings = store.settings("area", path, {"DEFAULT": {"volume": 50}})
+    settings.save_section({"volume": 60})
+    path.write_text("[DEFAULT]\nvolume = 60\nname = edited\n")
+    settings.save_section({"volume": 70})
+    expected = {"volume": "70", "name": "edited"}
+    assert settings.load_section() == expected
+    assert read_ini(path)["DEFAULT"] == expected
@@ -0,0 +1,71 @@
+"""Resumable uploads.
+
+    python -m pytest tests
+"""
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+
+from src.core.statestore import StateStore
+from src.core.uploads import ResumableUploads
+
+
+async def body(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+def test_complete_upload_is_still_reported(tmp_path: Path) -> None:
+    async def run() -> None:
+        target = tmp_path/"media"
+        target.mkdir()
+        uploads = ResumableUploads(StateStore(tmp_path/"state.db"),
+                                   tmp_path/"uploads", target)
+        upload = uploads.create("clip.mp4", 6)
+        await uploads.append(upload["id"], 0, body(b"abc"))
+        await uploads.append(upload["id"], 3, body(b"def"))
+        assert (target/"clip.mp4").read_bytes() == b"abcdef"
+        assert uploads.get(upload["id"])["received"] == 6
+
+        # the client retries the last request
+        state = await uploads.append(upload["id"], 6, body())
+        assert state["received"] == state["length"] == 6
+
+        uploads.recover()
+        assert uploads.get(upload["id"]) is not None
+        uploads.completed_expiry = 0
+        uploads.recover()
+        assert uploads.get(upload["id"]) is None
+
+    asyncio.run(run())
+
+
+def test_finalized_meanwhile_is_reported(tmp_path: Path) -> None:
+    async def run() -> None:
+        target = tmp_path/"media"
+        target.mkdir()
+        uploads = ResumableUploads(StateStore(tmp_path/"state.db"),
+                                   tmp_path/"uploads", target)
+        upload = uploads.create("clip.mp4", 6)
+        await uploads.append(upload["id"], 0, body(b"abc"))
+        stale = uploads.get(upload["id"])
+        await uploads.append(upload["id"], 3, body(b"def"))
+        get = uploads.get
+
+        def checked_before_finalize() -> None:
+            # the first read of the state precedes the move of the file
+            states = iter([stale])
+            uploads.get = lambda upload_id: next(states, None) or get(
+                upload_id)
+
+        checked_before_finalize()
+        with pytest.raises(ValueError):
+            await uploads.append(upload["id"], 3, body(b"def"))
+        checked_before_finalize()
+        state = await uploads.append(upload["id"], 6, body())
+        assert state["received"] == state["length"] == 6
+        assert (target/"clip.mp4").read_bytes() == b"abcdef"
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""VLC Remote Control clients against `FakeVLCServer`.
+
+    python -m pytest tests
+"""
+import socket
+import asyncio
+from contextlib import suppress
+
+import pytest
+
+from benchmarks.fake_vlc import FakeVLCServer
+from src.core.circuit import CircuitState
+from src.core.vlcrc_pool import RCConnection
+from src.core.vlcrc_async import AsyncVLCRemoteControl
+
+
+def test_busy_pool_does_not_open_circuit() -> None:
+    async def run() -> None:
+        async with FakeVLCServer(port=0) as server:
+            rc = AsyncVLCRemoteControl(server.host, server.port,
+                                       timeout=1.0, failure_threshold=2)
+            rc.pool.read_timeout = 0.05
+            async with rc.session() as session:
+                # more concurrent commands than pooled connections
+                responses = await asyncio.gather(
+                    *(rc.status() for _ in range(5)))
+                assert not any(r.success for r in responses)
+                assert all("busy" in r.data[0] for r in responses)
+                assert rc.breaker.state == CircuitState.CLOSED
+                assert rc.breaker.failures == 0
+                assert await session.play()
+            assert (await rc.status()).success
+            rc.close()
+
+    asyncio.run(run())
+
+
+def test_interrupted_command_discards_connection() -> None:
+    async def run() -> None:
+        async with FakeVLCServer(port=0, delay=0.1) as server:
+            rc = AsyncVLCRemoteControl(server.host, server.port, timeout=1.0)
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(rc.exec("get_length"), 0.05)
+            # the late answer to `get_length` must not be read as this one
+            response = await rc.exec("get_time")
+            assert response.data == ["0"]
+            rc.close()
+
+    asyncio.run(run())
+
+
+def test_failed_greeting_closes_socket(monkeypatch) -> None:
+    async def run() -> None:
+        async with FakeVLCServer(port=0) as server:
+            opened = []
+            create_connection = socket.create_connection
+
+            def record(*args):
+                opened.append(create_connection(*args))
+                return opened[-1]
+
+            def time_out(_):
+                raise TimeoutError("timed out")
+
+            monkeypatch.setattr(socket, "create_connection", record)
+            monkeypatch.setattr(RCConnection, "_read_until_prompt",
+                                time_out)
+            with pytest.raises(TimeoutError):
+                await asyncio.to_thread(RCConnection, server.host,
+                                        server.port)
+            assert opened[0].fileno() == -1
+
+    asyncio.run(run())